@@ -0,0 +1,90 @@
+"""Response cache with stale-while-revalidate, and single-flight request coalescing."""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+class CachedResponse(BaseModel):
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: str
+    stored_at: float
+
+    @classmethod
+    def build(cls, status_code: int, headers: List[Tuple[str, str]], body: bytes) -> "CachedResponse":
+        etag = next((value for name, value in headers if name.lower() == "etag"), None)
+        if etag is None:
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            headers = headers + [("etag", etag)]
+        return cls(status_code=status_code, headers=headers, body=body, etag=etag, stored_at=time.time())
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    return "*" in candidates or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
+
+
+class ResponseCache:
+    """LRU of backend responses. Entries older than ``ttl + stale_ttl`` are never served."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str, ttl: float, stale_ttl: float) -> Tuple[Optional[CachedResponse], bool]:
+        """The cached response (or None) and whether it is stale."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        age = entry.age()
+        if age >= ttl + stale_ttl:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return entry, age >= ttl
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """At most one in-flight call per key; concurrent callers await the same result."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Result of ``fn`` and whether it was shared with an earlier caller."""
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            # Shielded so one cancelled client does not cancel the call for everyone else.
+            return await asyncio.shield(future), True
+
+        self.calls += 1
+        future = asyncio.ensure_future(fn())
+        self._calls[key] = future
+        future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future), False
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
@@ -0,0 +1,67 @@
+"""Backends and per-route policies for the gateway."""
+import os
+import re
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+BACKENDS: Dict[str, str] = {
+    "fundamental_analysis": os.getenv("FINNIE_FUNDAMENTAL_ANALYSIS_URL", "http://fundamental_analysis:8000"),
+    "stock_selection": os.getenv("FINNIE_STOCK_SELECTION_URL", "http://stock_selection:8000"),
+    "ai_agent": os.getenv("FINNIE_AI_AGENT_URL", "http://ai_agent:8000"),
+}
+
+# Keep-alive pool per backend.
+MAX_CONNECTIONS = int(os.getenv("FINNIE_GATEWAY_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("FINNIE_GATEWAY_MAX_KEEPALIVE", "20"))
+BACKEND_TIMEOUT = float(os.getenv("FINNIE_GATEWAY_TIMEOUT", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("FINNIE_GATEWAY_CACHE_ENTRIES", "4096"))
+
+
+class Route(BaseModel):
+    """Policy for requests to ``service`` whose method and backend path match."""
+    service: str
+    methods: List[str]
+    path: str
+    # Token bucket per client: sustained requests per second and burst size.
+    rate: float
+    burst: int
+    # Seconds a response is served from cache, then served stale while it is refetched.
+    cache_ttl: float = 0
+    stale_ttl: float = 0
+    # Collapse identical concurrent requests (same method, path, query, body and credentials) into one backend call.
+    coalesce: bool = True
+    # Pass the response through as it arrives (server-sent events); never cached or coalesced.
+    stream: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.service} {','.join(self.methods)} {self.path}"
+
+    def matches(self, service: str, method: str, path: str) -> bool:
+        return service == self.service and method in self.methods and re.fullmatch(self.path, path) is not None
+
+
+# First match wins.
+ROUTES: List[Route] = [
+    Route(service="fundamental_analysis", methods=["GET"], path=r"/analyses/[^/]+/events", rate=1, burst=5, coalesce=False, stream=True),
+    # Queuing an analysis is expensive; identical concurrent submissions share one backend call.
+    Route(service="fundamental_analysis", methods=["POST"], path=r"/analyses", rate=0.2, burst=5),
+    Route(service="fundamental_analysis", methods=["GET"], path=r"/analyses/[^/]+", rate=5, burst=20, cache_ttl=2, stale_ttl=10),
+    Route(service="fundamental_analysis", methods=["GET"], path=r"/health", rate=5, burst=10, cache_ttl=1),
+    Route(service="stock_selection", methods=["GET"], path=r"/.*", rate=5, burst=20, cache_ttl=60, stale_ttl=300),
+    # Job status is polled while it changes; keep it as fresh as the analyses route.
+    Route(service="ai_agent", methods=["GET"], path=r"/jobs/[^/]+", rate=5, burst=20, cache_ttl=2, stale_ttl=10),
+    Route(service="ai_agent", methods=["GET"], path=r"/.*", rate=5, burst=20, cache_ttl=5, stale_ttl=30),
+]
+DEFAULT_ROUTE = dict(methods=["GET", "POST", "PUT", "PATCH", "DELETE"], path=r"/.*", rate=2, burst=10, coalesce=False)
+
+
+def match_route(service: str, method: str, path: str) -> Optional[Route]:
+    if service not in BACKENDS:
+        return None
+    for route in ROUTES:
+        if route.matches(service, method, path):
+            return route
+    return Route(service=service, **DEFAULT_ROUTE)
@@ -0,0 +1,198 @@
+"""Async reverse proxy in front of the Finnie services.
+
+``/{service}/{path}`` is forwarded to ``{backend}/{path}`` over a pooled
+keep-alive client per backend. Each route (see ``config.ROUTES``) has its own
+per-client rate limit. Identical concurrent requests are collapsed into one
+backend call, so a burst of clients asking for the same ticker costs a
+single analysis. Cacheable GET responses get an ETag and are served fresh,
+then stale while one background request refreshes them.
+
+Requests carrying credentials (Authorization or Cookie) are only coalesced
+with requests carrying the same credentials, and their responses are cached
+only when the backend marks them ``public``. Responses marked ``private``,
+``no-store`` or varying on headers outside the key are never cached.
+
+Run with:
+    uvicorn api_gateway.main:app
+"""
+import asyncio
+import hashlib
+import math
+from contextlib import asynccontextmanager
+from typing import Dict, List, Set, Tuple
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from . import config
+from .cache import CachedResponse, ResponseCache, SingleFlight, etag_matches
+from .ratelimit import RateLimiter
+
+
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host", "content-length",
+}
+# httpx decodes compressed bodies, so the encoding header no longer applies to what we return.
+DROPPED_RESPONSE_HEADERS = HOP_BY_HOP | {"content-encoding"}
+# Headers that identify the caller; they are part of the key, so one client's response never reaches another.
+CREDENTIAL_HEADERS = ("authorization", "cookie")
+# Request headers already in the key (or normalized away), so a response varying on them can be cached.
+KEYED_HEADERS = {"accept", "accept-encoding"}
+# Conditional headers are answered here, never forwarded: a coalesced response is shared by many clients.
+DROPPED_REQUEST_HEADERS = HOP_BY_HOP | {"if-none-match", "if-modified-since"}
+
+cache = ResponseCache(max_entries=config.CACHE_MAX_ENTRIES)
+flights = SingleFlight()
+limiter = RateLimiter()
+clients: Dict[str, httpx.AsyncClient] = {}
+_revalidations: Set[asyncio.Task] = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    limits = httpx.Limits(max_connections=config.MAX_CONNECTIONS, max_keepalive_connections=config.MAX_KEEPALIVE_CONNECTIONS)
+    for service, url in config.BACKENDS.items():
+        clients[service] = httpx.AsyncClient(base_url=url, limits=limits, timeout=config.BACKEND_TIMEOUT)
+    try:
+        yield
+    finally:
+        for client in clients.values():
+            await client.aclose()
+        clients.clear()
+
+
+app = FastAPI(title="Finnie gateway", lifespan=lifespan)
+
+
+def cache_key(service: str, request: Request, body: bytes) -> str:
+    parts = [request.method, service, request.url.path, request.url.query, request.headers.get("accept", "")]
+    if body:
+        parts.append(hashlib.blake2b(body, digest_size=16).hexdigest())
+    if has_credentials(request):
+        credentials = "\n".join(request.headers.get(name, "") for name in CREDENTIAL_HEADERS)
+        parts.append("credentials:" + hashlib.blake2b(credentials.encode("utf-8"), digest_size=16).hexdigest())
+    return "\n".join(parts)
+
+
+def has_credentials(request: Request) -> bool:
+    return any(name in request.headers for name in CREDENTIAL_HEADERS)
+
+
+def storable(request: Request, backend: httpx.Response) -> bool:
+    """Whether a shared cache may keep the response (RFC 9111 section 3)."""
+    if backend.status_code != 200:
+        return False
+    directives = {directive.strip().split("=", 1)[0].lower() for directive in backend.headers.get("cache-control", "").split(",")}
+    if directives & {"no-store", "private", "no-cache"}:
+        return False
+    if has_credentials(request) and not directives & {"public", "s-maxage"}:
+        return False
+    vary = {name.strip().lower() for value in backend.headers.get_list("vary") for name in value.split(",") if name.strip()}
+    return vary <= KEYED_HEADERS
+
+
+def forward_headers(request: Request) -> List[Tuple[str, str]]:
+    headers = [(name, value) for name, value in request.headers.items() if name.lower() not in DROPPED_REQUEST_HEADERS]
+    if request.client is not None:
+        forwarded = request.headers.get("x-forwarded-for")
+        headers.append(("x-forwarded-for", f"{forwarded}, {request.client.host}" if forwarded else request.client.host))
+    return headers
+
+
+def respond(cached: CachedResponse, request: Request, cache_status: str) -> Response:
+    headers = {name: value for name, value in cached.headers if name.lower() not in DROPPED_RESPONSE_HEADERS}
+    headers["x-cache"] = cache_status
+    headers["age"] = str(int(cached.age()))
+    if cached.status_code == 200 and etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers={"etag": cached.etag, "x-cache": cache_status})
+    return Response(content=cached.body, status_code=cached.status_code, headers=headers)
+
+
+async def fetch(service: str, request: Request, path: str, body: bytes, key: str, cacheable: bool) -> CachedResponse:
+    backend = await clients[service].request(
+        request.method,
+        "/" + path,
+        params=request.query_params,
+        headers=forward_headers(request),
+        content=body or None,
+    )
+    response = CachedResponse.build(backend.status_code, list(backend.headers.items()), backend.content)
+    if cacheable and storable(request, backend):
+        cache.put(key, response)
+    return response
+
+
+def revalidate(key: str, call) -> None:
+    async def run():
+        try:
+            await flights.do(key, call)
+        except Exception as e:
+            print(f"Error revalidating {key.splitlines()[2]}: {e}")
+
+    # Held so the task is not garbage collected before it finishes.
+    task = asyncio.create_task(run())
+    _revalidations.add(task)
+    task.add_done_callback(_revalidations.discard)
+
+
+@app.get("/_gateway/stats")
+async def stats():
+    return {
+        "cache_entries": len(cache),
+        "backend_calls": flights.calls,
+        "coalesced_requests": flights.shared,
+    }
+
+
+@app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def proxy(service: str, path: str, request: Request):
+    route = config.match_route(service, request.method, "/" + path)
+    if route is None:
+        return JSONResponse({"detail": f"Unknown service {service}"}, status_code=404)
+
+    client = request.client.host if request.client is not None else "unknown"
+    allowed, retry_after = limiter.check(route.key, client, route.rate, route.burst)
+    if not allowed:
+        return JSONResponse({"detail": "Rate limit exceeded"}, status_code=429, headers={"Retry-After": str(math.ceil(retry_after))})
+
+    if route.stream:
+        return await stream(service, request, path)
+
+    body = await request.body()
+    key = cache_key(service, request, body)
+    cacheable = request.method == "GET" and route.cache_ttl > 0
+
+    def call():
+        return fetch(service, request, path, body, key, cacheable)
+
+    if cacheable:
+        cached, stale = cache.get(key, route.cache_ttl, route.stale_ttl)
+        if cached is not None:
+            if stale and not flights.in_flight(key):
+                revalidate(key, call)
+            return respond(cached, request, "STALE" if stale else "HIT")
+
+    try:
+        if route.coalesce:
+            response, shared = await flights.do(key, call)
+        else:
+            response, shared = await call(), False
+    except httpx.HTTPError as e:
+        print(f"Error proxying {request.method} /{service}/{path}: {e}")
+        return JSONResponse({"detail": f"Backend {service} unavailable"}, status_code=502)
+    return respond(response, request, "COALESCED" if shared else "MISS")
+
+
+async def stream(service: str, request: Request, path: str) -> Response:
+    client = clients[service]
+    outbound = client.build_request(request.method, "/" + path, params=request.query_params, headers=forward_headers(request))
+    try:
+        backend = await client.send(outbound, stream=True)
+    except httpx.HTTPError as e:
+        print(f"Error proxying stream /{service}/{path}: {e}")
+        return JSONResponse({"detail": f"Backend {service} unavailable"}, status_code=502)
+    headers = {name: value for name, value in backend.headers.items() if name.lower() not in DROPPED_RESPONSE_HEADERS}
+    return StreamingResponse(backend.aiter_bytes(), status_code=backend.status_code, headers=headers, background=BackgroundTask(backend.aclose))
@@ -0,0 +1,41 @@
+"""Per-client token buckets, one set per route."""
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> Tuple[bool, float]:
+        """Spend a token if one is available; otherwise return the seconds until one is."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Buckets keyed by (route, client), bounded so an address scan cannot grow it without limit."""
+
+    def __init__(self, max_clients: int = 100_000):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def check(self, route_key: str, client: str, rate: float, burst: int) -> Tuple[bool, float]:
+        key = (route_key, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take()
@@ -0,0 +1,410 @@
+"""Job broker for the analysis workers.
+
+``Broker`` is the queue interface the submitters and workers use; ``connect``
+picks the backend from the target:
+
+- ``SQLiteBroker`` keeps the jobs as rows in one SQLite file (WAL mode). WAL
+  needs shared memory between the processes, so the file must be on a local
+  disk and only processes on that host may open it; never put it on a
+  network filesystem (NFS, SMB), where locking is unreliable.
+- ``HTTPBroker`` talks to a ``SQLiteBroker`` served over HTTP by this
+  service's API (``main.py``), so workers on every node pull from one queue.
+
+A worker claims a job by taking a lease on it and keeps the lease alive with
+heartbeats while the crew runs. If the worker dies, the lease expires and the
+next submit, lookup or claim puts the job back in the queue, up to
+``max_attempts`` tries. Results, errors and task progress are written back to
+the job row for the submitter to read.
+
+Routing prefers warm caches. Each worker reports the symbols whose data it
+already holds, and a claim takes the oldest job for one of its own symbols
+first. Jobs for symbols that another live worker holds are left to that
+worker for ``affinity_wait`` seconds before anyone may take them.
+
+Usage:
+    python broker.py submit AAPL MSFT --wait
+    python broker.py --broker http://ai_agent:8000 submit AAPL
+    python broker.py status <job id>
+    python broker.py stats
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+
+DEFAULT_BROKER_PATH = os.path.join(os.path.expanduser("~"), ".cache", "finnie", "broker.sqlite")
+BROKER_PATH = os.getenv("FINNIE_BROKER_PATH", DEFAULT_BROKER_PATH)
+# Broker URL (http://host:port) served by main.py; when set, it is used instead of the local file.
+BROKER = os.getenv("FINNIE_BROKER_URL") or BROKER_PATH
+# Seconds an HTTP broker call may take.
+HTTP_TIMEOUT = float(os.getenv("FINNIE_BROKER_HTTP_TIMEOUT", "10"))
+# Seconds a claimed job stays leased without a heartbeat.
+LEASE_SECONDS = float(os.getenv("FINNIE_BROKER_LEASE", "60"))
+MAX_ATTEMPTS = int(os.getenv("FINNIE_BROKER_MAX_ATTEMPTS", "3"))
+# Seconds a job for a symbol another worker holds waits for that worker before any worker may take it.
+AFFINITY_WAIT = float(os.getenv("FINNIE_BROKER_AFFINITY_WAIT", "30"))
+# A worker that has not sent a heartbeat for this long no longer attracts jobs.
+WORKER_TTL = float(os.getenv("FINNIE_BROKER_WORKER_TTL", "90"))
+
+QUEUED = "queued"
+LEASED = "leased"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = {SUCCEEDED, FAILED}
+
+
+class BrokerJob(BaseModel):
+    id: str
+    symbol: str
+    status: str
+    attempts: int
+    max_attempts: int
+    worker: Optional[str] = None
+    lease_expires: Optional[float] = None
+    created_at: float
+    updated_at: float
+    result: Optional[str] = None
+    error: Optional[str] = None
+    progress: List[Dict[str, Any]] = []
+
+
+class Broker(ABC):
+    """The job queue shared by submitters and workers."""
+
+    @abstractmethod
+    def submit(self, symbol: str) -> BrokerJob:
+        """Queue an analysis of ``symbol``, or return the job already queued or running for it."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[BrokerJob]:
+        """Current state of the job; None if there is no such job."""
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll: float = 1.0) -> Optional[BrokerJob]:
+        """Poll until the job finishes (or ``timeout`` passes); returns its last state."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.status in FINISHED or (deadline is not None and time.time() >= deadline):
+                return job
+            time.sleep(poll)
+
+    @abstractmethod
+    def register(self, worker_id: str, symbols: Iterable[str] = ()) -> None:
+        """Record that the worker is alive and which symbols' data its caches hold."""
+
+    @abstractmethod
+    def unregister(self, worker_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def claim(self, worker_id: str, symbols: Iterable[str] = ()) -> Optional[BrokerJob]:
+        """Lease the next job for this worker, preferring the symbols it holds; None when nothing is claimable."""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the worker's lease on the job; False if the lease was lost (the job was given to another worker)."""
+
+    @abstractmethod
+    def add_progress(self, job_id: str, worker_id: str, task: str, status: str) -> None:
+        pass
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: str) -> bool:
+        """Publish the job's result; False if the worker no longer held the lease."""
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a failed attempt: the job is queued again until it runs out of attempts."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs last updated more than ``older_than`` seconds ago."""
+
+
+class SQLiteBroker(Broker):
+    """The queue in a SQLite file on this host's local disk."""
+
+    def __init__(self, path: str = BROKER_PATH, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS,
+                 affinity_wait: float = AFFINITY_WAIT, worker_ttl: float = WORKER_TTL):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.affinity_wait = affinity_wait
+        self.worker_ttl = worker_ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, symbol TEXT, status TEXT, attempts INTEGER, max_attempts INTEGER, "
+                "worker TEXT, lease_expires REAL, created_at REAL, updated_at REAL, "
+                "result TEXT, error TEXT, progress TEXT)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            db.execute("CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, heartbeat_at REAL, symbols TEXT)")
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; transactions are explicit (BEGIN IMMEDIATE takes the write lock up front).
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def submit(self, symbol: str) -> BrokerJob:
+        """Queue an analysis of ``symbol``, or return the job already queued or running for it."""
+        symbol = symbol.upper()
+        now = time.time()
+        with self._transaction() as db:
+            self._expire(db, now)
+            row = db.execute(
+                "SELECT * FROM jobs WHERE symbol = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1", (symbol, QUEUED, LEASED)
+            ).fetchone()
+            if row is not None:
+                return _job(row)
+            job_id = uuid.uuid4().hex
+            db.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, 0, ?, NULL, NULL, ?, ?, NULL, NULL, '[]')",
+                (job_id, symbol, QUEUED, self.max_attempts, now, now),
+            )
+            return _job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def get(self, job_id: str) -> Optional[BrokerJob]:
+        """Current state of the job, after requeuing expired leases so a dead worker's job does not read as running."""
+        with self._transaction() as db:
+            self._expire(db, time.time())
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def register(self, worker_id: str, symbols: Iterable[str] = ()) -> None:
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, ?)", (worker_id, time.time(), json.dumps(sorted(set(symbols)))))
+
+    def unregister(self, worker_id: str) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def claim(self, worker_id: str, symbols: Iterable[str] = ()) -> Optional[BrokerJob]:
+        """Lease the next job for this worker, preferring the symbols it holds; None when nothing is claimable."""
+        now = time.time()
+        warm = set(symbols)
+        with self._transaction() as db:
+            self._expire(db, now)
+            db.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, ?)", (worker_id, now, json.dumps(sorted(warm))))
+
+            held_elsewhere = set()
+            for row in db.execute("SELECT symbols FROM workers WHERE id != ? AND heartbeat_at >= ?", (worker_id, now - self.worker_ttl)):
+                held_elsewhere.update(json.loads(row["symbols"]))
+
+            chosen = None
+            queued = db.execute("SELECT id, symbol, created_at FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+            for row in queued:
+                if row["symbol"] in warm:
+                    chosen = row
+                    break
+            if chosen is None:
+                for row in queued:
+                    if row["symbol"] not in held_elsewhere or now - row["created_at"] >= self.affinity_wait:
+                        chosen = row
+                        break
+            if chosen is None:
+                return None
+
+            db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (LEASED, worker_id, now + self.lease_seconds, now, chosen["id"]),
+            )
+            return _job(db.execute("SELECT * FROM jobs WHERE id = ?", (chosen["id"],)).fetchone())
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the worker's lease on the job; False if the lease was lost (the job was given to another worker)."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat_at = ? WHERE id = ?", (now, worker_id))
+            updated = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, worker_id, LEASED),
+            ).rowcount
+        return updated == 1
+
+    def add_progress(self, job_id: str, worker_id: str, task: str, status: str) -> None:
+        with self._transaction() as db:
+            row = db.execute("SELECT progress FROM jobs WHERE id = ? AND worker = ? AND status = ?", (job_id, worker_id, LEASED)).fetchone()
+            if row is None:
+                return
+            progress = json.loads(row["progress"])
+            progress.append({"task": task, "status": status, "at": time.time()})
+            db.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def complete(self, job_id: str, worker_id: str, result: str) -> bool:
+        """Publish the job's result; False if the worker no longer held the lease."""
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (SUCCEEDED, result, time.time(), job_id, worker_id, LEASED),
+            ).rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a failed attempt: the job is queued again until it runs out of attempts."""
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = ?", (job_id, worker_id, LEASED)).fetchone()
+            if row is None:
+                return False
+            status = FAILED if row["attempts"] >= row["max_attempts"] else QUEUED
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_expires = NULL, progress = '[]', updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            return True
+
+    def _expire(self, db: sqlite3.Connection, now: float) -> None:
+        """Requeue (or, out of attempts, fail) jobs whose worker stopped sending heartbeats."""
+        for row in db.execute("SELECT id, worker, attempts, max_attempts FROM jobs WHERE status = ? AND lease_expires < ?", (LEASED, now)).fetchall():
+            print(f"Lease on job {row['id']} held by {row['worker']} expired")
+            status = FAILED if row["attempts"] >= row["max_attempts"] else QUEUED
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_expires = NULL, progress = '[]', updated_at = ? WHERE id = ?",
+                (status, f"worker {row['worker']} stopped responding", now, row["id"]),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._db()
+        counts = {row["status"]: row["count"] for row in db.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")}
+        live = db.execute("SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?", (time.time() - self.worker_ttl,)).fetchone()[0]
+        return {"jobs": counts, "live_workers": live}
+
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs last updated more than ``older_than`` seconds ago."""
+        with self._transaction() as db:
+            return db.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND updated_at < ?",
+                (*sorted(FINISHED), time.time() - older_than),
+            ).rowcount
+
+
+class HTTPBroker(Broker):
+    """Client for a broker served over HTTP by ``main.py``; leases are timed by the server's clock."""
+
+    def __init__(self, url: str, timeout: float = HTTP_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        """The decoded JSON response; None for a 404."""
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        return json.loads(body) if body else None
+
+    def submit(self, symbol: str) -> BrokerJob:
+        return BrokerJob(**self._request("POST", "/jobs", {"symbol": symbol}))
+
+    def get(self, job_id: str) -> Optional[BrokerJob]:
+        job = self._request("GET", f"/jobs/{job_id}")
+        return BrokerJob(**job) if job is not None else None
+
+    def register(self, worker_id: str, symbols: Iterable[str] = ()) -> None:
+        self._request("PUT", f"/workers/{worker_id}", {"symbols": sorted(set(symbols))})
+
+    def unregister(self, worker_id: str) -> None:
+        self._request("DELETE", f"/workers/{worker_id}")
+
+    def claim(self, worker_id: str, symbols: Iterable[str] = ()) -> Optional[BrokerJob]:
+        job = self._request("POST", f"/workers/{worker_id}/claim", {"symbols": sorted(set(symbols))})
+        return BrokerJob(**job) if job is not None else None
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        return self._request("POST", f"/jobs/{job_id}/heartbeat", {"worker": worker_id})["ok"]
+
+    def add_progress(self, job_id: str, worker_id: str, task: str, status: str) -> None:
+        self._request("POST", f"/jobs/{job_id}/progress", {"worker": worker_id, "task": task, "status": status})
+
+    def complete(self, job_id: str, worker_id: str, result: str) -> bool:
+        return self._request("POST", f"/jobs/{job_id}/complete", {"worker": worker_id, "result": result})["ok"]
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._request("POST", f"/jobs/{job_id}/fail", {"worker": worker_id, "error": error})["ok"]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/stats")
+
+    def prune(self, older_than: float) -> int:
+        return self._request("POST", "/prune", {"older_than": older_than})["deleted"]
+
+
+def connect(target: str = BROKER) -> Broker:
+    """An ``HTTPBroker`` for an http(s) URL, else a ``SQLiteBroker`` on the local file at that path."""
+    if target.startswith(("http://", "https://")):
+        return HTTPBroker(target)
+    return SQLiteBroker(target)
+
+
+def _job(row: sqlite3.Row) -> BrokerJob:
+    return BrokerJob(**{**dict(row), "progress": json.loads(row["progress"] or "[]")})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit analyses to the worker pool and inspect the broker.")
+    parser.add_argument("--broker", default=BROKER, help="Broker URL, or database path on this host")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit")
+    submit.add_argument("symbols", nargs="+")
+    submit.add_argument("--wait", action="store_true", help="Wait for the results and print them")
+    status = commands.add_parser("status")
+    status.add_argument("job_id")
+    commands.add_parser("stats")
+    args = parser.parse_args()
+
+    broker = connect(args.broker)
+    if args.command == "submit":
+        jobs = [broker.submit(symbol) for symbol in args.symbols]
+        for job in jobs:
+            print(f"{job.symbol}: {job.id}")
+        if args.wait:
+            for job in jobs:
+                job = broker.wait(job.id)
+                print(f"--- {job.symbol} ({job.status})")
+                print(job.result if job.status == SUCCEEDED else job.error)
+    elif args.command == "status":
+        job = broker.get(args.job_id)
+        print(job.model_dump_json(indent=2) if job else f"No job {args.job_id}")
+    else:
+        print(json.dumps(broker.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
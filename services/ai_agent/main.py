@@ -0,0 +1,83 @@
+"""HTTP API serving the job broker to submitters and to workers on every node.
+
+The broker file stays on this node's local disk; workers elsewhere reach it
+with ``python worker.py --broker http://<this host>:8000``. Leases are timed
+by this node's clock, so worker clocks need not agree.
+
+Run from the repository root with:
+    uvicorn main:app --app-dir services/ai_agent --host 0.0.0.0 --port 8000
+"""
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import Body, FastAPI, HTTPException, Request
+
+from broker import BROKER_PATH, BrokerJob, SQLiteBroker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.broker = SQLiteBroker(BROKER_PATH)
+    yield
+
+
+app = FastAPI(title="Finnie analysis broker", lifespan=lifespan)
+
+
+# Handlers are plain functions: FastAPI runs them on its thread pool, and the broker keeps one connection per thread.
+@app.post("/jobs", response_model=BrokerJob)
+def submit(request: Request, symbol: str = Body(embed=True)):
+    return request.app.state.broker.submit(symbol)
+
+
+@app.get("/jobs/{job_id}", response_model=BrokerJob)
+def get(request: Request, job_id: str):
+    job = request.app.state.broker.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+
+@app.put("/workers/{worker_id}", status_code=204)
+def register(request: Request, worker_id: str, symbols: List[str] = Body(default=[], embed=True)):
+    request.app.state.broker.register(worker_id, symbols)
+
+
+@app.delete("/workers/{worker_id}", status_code=204)
+def unregister(request: Request, worker_id: str):
+    request.app.state.broker.unregister(worker_id)
+
+
+@app.post("/workers/{worker_id}/claim", response_model=Optional[BrokerJob])
+def claim(request: Request, worker_id: str, symbols: List[str] = Body(default=[], embed=True)):
+    return request.app.state.broker.claim(worker_id, symbols)
+
+
+@app.post("/jobs/{job_id}/heartbeat")
+def heartbeat(request: Request, job_id: str, worker: str = Body(embed=True)):
+    return {"ok": request.app.state.broker.heartbeat(job_id, worker)}
+
+
+@app.post("/jobs/{job_id}/progress", status_code=204)
+def add_progress(request: Request, job_id: str, worker: str = Body(), task: str = Body(), status: str = Body()):
+    request.app.state.broker.add_progress(job_id, worker, task, status)
+
+
+@app.post("/jobs/{job_id}/complete")
+def complete(request: Request, job_id: str, worker: str = Body(), result: str = Body()):
+    return {"ok": request.app.state.broker.complete(job_id, worker, result)}
+
+
+@app.post("/jobs/{job_id}/fail")
+def fail(request: Request, job_id: str, worker: str = Body(), error: str = Body()):
+    return {"ok": request.app.state.broker.fail(job_id, worker, error)}
+
+
+@app.get("/stats")
+def stats(request: Request):
+    return request.app.state.broker.stats()
+
+
+@app.post("/prune")
+def prune(request: Request, older_than: float = Body(embed=True)):
+    return {"deleted": request.app.state.broker.prune(older_than)}
@@ -0,0 +1,182 @@
+"""Analysis worker: pulls jobs from the broker and runs the crew on them.
+
+Each slot claims one job at a time, runs ``run_analysis`` on it and publishes
+the result (or the error) back to the broker. While the crew runs, a
+heartbeat thread keeps the job's lease alive. If the lease is lost (the
+worker stalled long enough for the job to go to another worker), the result
+is dropped rather than overwriting the other attempt.
+
+Scale out by starting workers on more nodes, all pointed at the broker API
+(``main.py``) of the node that holds the queue; workers on that node may
+open its file directly. Every claim reports the symbols the worker's caches
+hold, so repeat analyses of a symbol go back to the worker that already has
+its data.
+
+Usage:
+    python worker.py --slots 2
+    python worker.py --broker http://ai_agent:8000 --slots 2
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from broker import BROKER, Broker, BrokerJob, connect
+
+# The crew and its tools live in the fundamental_analysis service and import each other by plain module name.
+AGENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fundamental_analysis", "app", "agents")
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
+
+
+# Seconds between heartbeats; well inside the lease so one slow write does not lose it.
+HEARTBEAT_INTERVAL = float(os.getenv("FINNIE_WORKER_HEARTBEAT", "10"))
+# Seconds to wait before claiming again when the queue is empty.
+IDLE_POLL = float(os.getenv("FINNIE_WORKER_POLL", "2"))
+# Symbols reported as warm on each claim: this process's recent analyses, then its freshest cached data.
+WARM_SYMBOLS = 64
+# Seconds a finished analysis keeps its symbol warm; matches the market data cache's "info" TTL.
+RECENT_TTL = float(os.getenv("FINNIE_WORKER_RECENT_TTL", str(6 * 3600)))
+
+
+def run_crew(symbol: str, progress: Callable) -> str:
+    # Imported on first use: crewai and the tool stack are slow to import.
+    from crew import run_analysis
+    result = run_analysis(symbol, concurrent=True, progress=progress)
+    return getattr(result, "raw", str(result))
+
+
+def task_label(task) -> str:
+    return getattr(task, "name", None) or task.description[:60]
+
+
+class Worker:
+    def __init__(self, broker: Broker, run: Callable[[str, Callable], str] = run_crew, slots: int = 1,
+                 worker_id: Optional[str] = None, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.broker = broker
+        self.run = run
+        self.slots = max(1, slots)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.heartbeat_interval = heartbeat_interval
+        self.stopping = threading.Event()
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warm_symbols(self) -> List[str]:
+        """Symbols whose data this process holds: recent analyses, then fresh entries in its in-memory market data cache.
+
+        The on-disk cache is shared by every worker on the host, so it says nothing about which of them is warm.
+        """
+        now = time.time()
+        with self._lock:
+            symbols = [symbol for symbol, finished_at in reversed(self._recent.items()) if now - finished_at < RECENT_TTL]
+        # Not imported here: a worker that has not run the crew yet holds no market data.
+        market_data = sys.modules.get("tools.market_data")
+        if market_data is not None:
+            try:
+                symbols += market_data.get_cache().resident("info", WARM_SYMBOLS)
+            except Exception as e:
+                print(f"Error reading cached symbols: {e}")
+        return list(dict.fromkeys(symbols))[:WARM_SYMBOLS]
+
+    def _remember(self, symbol: str) -> None:
+        with self._lock:
+            self._recent[symbol] = time.time()
+            self._recent.move_to_end(symbol)
+            while len(self._recent) > WARM_SYMBOLS:
+                self._recent.popitem(last=False)
+
+    def serve(self) -> None:
+        """Run the slots until ``stop``; each finishes its current job first."""
+        self.broker.register(self.worker_id, self.warm_symbols())
+        threads = [threading.Thread(target=self._slot, name=f"slot-{i}", daemon=True) for i in range(self.slots)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self.broker.unregister(self.worker_id)
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+    def _slot(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                job = self.broker.claim(self.worker_id, self.warm_symbols())
+            except Exception as e:
+                print(f"Error claiming a job: {e}")
+                job = None
+            if job is None:
+                self.stopping.wait(IDLE_POLL)
+                continue
+            self.process(job)
+
+    def process(self, job: BrokerJob) -> None:
+        print(f"{self.worker_id} analysing {job.symbol} (job {job.id}, attempt {job.attempts})")
+        lost = threading.Event()
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.heartbeat_interval):
+                try:
+                    if not self.broker.heartbeat(job.id, self.worker_id):
+                        lost.set()
+                        return
+                except Exception as e:
+                    print(f"Error sending heartbeat for job {job.id}: {e}")
+
+        def progress(task, status):
+            try:
+                self.broker.add_progress(job.id, self.worker_id, task_label(task), status)
+            except Exception as e:
+                print(f"Error recording progress for job {job.id}: {e}")
+
+        beat = threading.Thread(target=heartbeat, name=f"heartbeat-{job.id[:8]}", daemon=True)
+        beat.start()
+        start = time.perf_counter()
+        try:
+            result = self.run(job.symbol, progress)
+        except Exception as e:
+            print(f"Error analysing {job.symbol}: {e}")
+            if not lost.is_set():
+                self.broker.fail(job.id, self.worker_id, str(e))
+            return
+        finally:
+            done.set()
+            beat.join()
+
+        self._remember(job.symbol)
+        if lost.is_set() or not self.broker.complete(job.id, self.worker_id, result):
+            print(f"Lost the lease on job {job.id}; dropping its result")
+            return
+        print(f"{self.worker_id} finished {job.symbol} in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analysis jobs from the broker.")
+    parser.add_argument("--broker", default=BROKER, help="Broker URL (see main.py), or database path on this host")
+    parser.add_argument("--slots", type=int, default=int(os.getenv("FINNIE_WORKER_SLOTS", "1")), help="Jobs this process runs at once")
+    parser.add_argument("--prewarm", nargs="*", metavar="SYMBOL", help="Load the crew (and these symbols' data) before claiming jobs")
+    args = parser.parse_args()
+
+    if args.prewarm is not None:
+        from startup import prewarm
+        prewarm(args.prewarm)
+
+    worker = Worker(connect(args.broker), slots=args.slots)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    print(f"Worker {worker.worker_id} serving {args.broker} with {worker.slots} slot(s)")
+    worker.serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Batch analysis over a watchlist, streaming one JSON Lines record per finished symbol.
+
+Usage:
+    python batch.py watchlist.txt --output reports.jsonl --workers 4
+
+Workers are threads, so they share the market data cache and the LLM client.
+Symbols that already have a successful record in the output file are skipped,
+which lets an interrupted batch resume where it stopped.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Set
+
+from crew import run_analysis
+
+
+DEFAULT_WORKERS = int(os.getenv("FINNIE_BATCH_WORKERS", "4"))
+
+
+def read_watchlist(path: str) -> List[str]:
+    """Symbols from a file with one ticker per line; blank lines and ``#`` comments are ignored."""
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            symbol = line.split("#", 1)[0].strip().upper()
+            if symbol:
+                symbols.append(symbol)
+    return list(dict.fromkeys(symbols))
+
+
+def completed_symbols(output_path: str) -> Set[str]:
+    """Symbols with a successful record in an existing output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run.
+                continue
+            if record.get("status") == "ok":
+                done.add(record["symbol"])
+    return done
+
+
+def _analyse(symbol: str, concurrent: bool) -> dict:
+    start = time.perf_counter()
+    try:
+        result = run_analysis(symbol, concurrent=concurrent)
+        record = {"symbol": symbol, "status": "ok", "report": getattr(result, "raw", str(result))}
+    except Exception as e:
+        record = {"symbol": symbol, "status": "error", "error": str(e)}
+    record["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(symbols: Iterable[str], output_path: str, workers: int = DEFAULT_WORKERS, resume: bool = True, concurrent: bool = True) -> Iterator[dict]:
+    """Analyse ``symbols`` on a bounded thread pool, appending and yielding each record as soon as it completes."""
+    skip = completed_symbols(output_path) if resume else set()
+    queue = iter([symbol for symbol in symbols if symbol not in skip])
+    # Keep only a small window of symbols in flight so thousands of entries never sit in the pool at once.
+    window = max(1, workers) * 2
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, open(output_path, "a" if resume else "w") as out:
+        running = set()
+        while True:
+            while len(running) < window:
+                symbol = next(queue, None)
+                if symbol is None:
+                    break
+                running.add(pool.submit(_analyse, symbol, concurrent))
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis crew over a watchlist and stream JSON Lines reports.")
+    parser.add_argument("watchlist", help="File with one ticker symbol per line.")
+    parser.add_argument("-o", "--output", default="reports.jsonl", help="JSON Lines output file (appended to when resuming).")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="Symbols analysed at the same time.")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping symbols already in the output file.")
+    parser.add_argument("--sequential", action="store_true", help="Run each symbol's crew tasks one after another.")
+    args = parser.parse_args()
+
+    symbols = read_watchlist(args.watchlist)
+    for record in run_batch(symbols, args.output, workers=args.workers, resume=not args.no_resume, concurrent=not args.sequential):
+        print(f"{record['symbol']}: {record['status']} ({record['elapsed_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
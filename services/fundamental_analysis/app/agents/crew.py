@@ -1,141 +1,273 @@
-from crewai import Agent, Task, Crew, LLM
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 # from langchain_community.tools.yahoo_finance_news import YahooFinanceNewsTool
-from crewai_tools import SerperDevTool
 from dotenv import load_dotenv
-from tools import competitor_analysis, earnings_report_tool, risk_analysis_tool, sentiment_tools, technical_analysis_tool
+from tools import registry, tracing
 load_dotenv()
 
-def create_crew(stock_symbol):
-    llm = LLM(
-        model="ollama/gemma2:2b",
-        base_url="http://localhost:11434"
+# crewai (and litellm behind it) takes seconds to import; it is loaded when the first crew is built.
+if TYPE_CHECKING:
+    from crewai import Agent, Crew, Task
+
+# Upper bound on analyst tasks running at once; each one holds a request open against Ollama.
+MAX_CONCURRENCY = int(os.getenv("FINNIE_MAX_CONCURRENCY", "5"))
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+LLM_MODEL = os.getenv("FINNIE_LLM_MODEL", "ollama/gemma2:2b")
+OLLAMA_URL = os.getenv("FINNIE_OLLAMA_URL", "http://localhost:11434")
+# Keep-alive connections to the Ollama server shared by every LLM call in the process.
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("FINNIE_OLLAMA_MAX_CONNECTIONS", "16"))
+
+
+@lru_cache(maxsize=1)
+def get_llm():
+    """One LLM client per process, shared by every crew (and every batch worker thread).
+
+    Responses are cached on disk, so re-running an unchanged task on the same day skips the model.
+    """
+    from llm_cache import CachedLLM
+
+    _pool_llm_connections()
+    return CachedLLM(
+        model=LLM_MODEL,
+        base_url=OLLAMA_URL
     )
-    
-    # Agents
-    
-    # Analyst
-    analyst = Agent(
+
+
+def _pool_llm_connections():
+    # litellm opens a new HTTP client per call unless it is given a shared session.
+    try:
+        import httpx
+        import litellm
+    except ImportError:
+        return
+    limits = httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_MAX_CONNECTIONS)
+    litellm.client_session = httpx.Client(limits=limits, timeout=None)
+    litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=None)
+
+
+AGENTS = {
+    "analyst": dict(
         role="Financial Analyst",
         goal="Interpret gathered stock data to provide actionable investment insights and recommendations.",
         backstory="You're a seasoned financial analyst known for making accurate market predictions by synthesizing complex financial data, intrinsic value, industry trends, and company fundamentals.",
-        tools=[competitor_analysis.CompetitorTool(), earnings_report_tool.EarningsCallTool(), risk_analysis_tool.RiskTool()],
-        llm=llm
-    )
-
-    # Sentiment
-    sentiment = Agent(
+        tools=["competitor", "earnings", "risk"],
+    ),
+    "sentiment": dict(
         role="Market Sentiment Analyst",
         goal="Analyze news articles, social media, and earnings call transcripts to gauge market sentiment on a stock.",
         backstory="You're an expert in financial sentiment analysis, skilled in identifying bullish and bearish trends from news, social media, and investor sentiment.",
-        tools=[SerperDevTool(), sentiment_tools.SentimentTool()],
-        llm=llm
-    )
-
-    # Risk Assessor
-    risk_assessor = Agent(
+        tools=["search", "sentiment"],
+    ),
+    "risk_assessor": dict(
         role="Risk Assessment Specialist",
         goal="Evaluate the risks associated with a stock, including volatility, financial stability, and market conditions.",
         backstory="You're a highly skilled risk analyst with expertise in identifying financial, macroeconomic, and market risks that could impact investment decisions.",
-        tools=[risk_analysis_tool.RiskTool()],
-        llm=llm
-    )
-
-    # Insider Trading Analyst
-    insider_trading_analyst = Agent(
+        tools=["risk"],
+    ),
+    "insider_trading_analyst": dict(
         role="Insider & Institutional Trading Analyst",
         goal="Analyze insider transactions and institutional investments to assess market confidence in a stock.",
         backstory="You're a market expert skilled in tracking insider trades and institutional investments to gauge investor confidence.",
-        tools=[SerperDevTool()],
-        llm=llm
-    )
-
-    # Macroeconomic & Industry Analyst
-    macro_industry_analyst = Agent(
+        tools=["search"],
+    ),
+    "macro_industry_analyst": dict(
         role="Macroeconomic & Industry Analyst",
         goal="Assess macroeconomic factors and industry trends that influence stock performance.",
         backstory="You're a macroeconomic strategist with expertise in economic indicators, sector performance, and global market trends.",
-        tools=[SerperDevTool()],
-        llm=llm
-    )
-
-    # Technical Analyst
-    technical_analyst = Agent(
+        tools=["search"],
+    ),
+    "technical_analyst": dict(
         role="Technical Analyst",
         goal="Analyze stock price movements, chart patterns, and indicators to identify trading opportunities.",
         backstory="You're a technical analysis expert skilled in identifying market trends using chart patterns, indicators, and historical price data.",
-        tools=[technical_analysis_tool.TechnicalAnalysis()],
-        llm=llm
-    )
+        tools=["technical"],
+    ),
+}
 
-    # Tasks
-
-    # Analyst Task
-    analyst_task = Task(
-        description="Synthesize financial data, industry trends, and valuation metrics to provide a comprehensive investment recommendation for the stock.",
+# Task templates, in execution order; ``context`` names the tasks whose output a task consumes.
+TASKS = {
+    "analyst": dict(
+        agent="analyst",
+        description="Synthesize financial data, industry trends, and valuation metrics to provide a comprehensive investment recommendation for {stock_symbol}.",
         expected_output="A detailed investment report with insights on stock valuation, growth potential, and potential risks.",
-        agent=analyst
-    )
-
-    # Sentiment Analysis Task
-    sentiment_task = Task(
-        description="Gather and analyze news articles, social media discussions, and earnings call transcripts to determine the market sentiment for the stock.",
+    ),
+    "sentiment": dict(
+        agent="sentiment",
+        description="Gather and analyze news articles, social media discussions, and earnings call transcripts to determine the market sentiment for {stock_symbol}.",
         expected_output="A sentiment report categorizing the market outlook as bullish, bearish, or neutral with supporting evidence.",
-        agent=sentiment
-    )
-
-    # Risk Assessment Task
-    risk_task = Task(
-        description="Evaluate the financial, market, and macroeconomic risks associated with investing in the stock, including volatility and liquidity risks.",
+    ),
+    "risk": dict(
+        agent="risk_assessor",
+        description="Evaluate the financial, market, and macroeconomic risks associated with investing in {stock_symbol}, including volatility and liquidity risks.",
         expected_output="A risk assessment report detailing factors such as volatility, debt levels, and macroeconomic concerns.",
-        agent=risk_assessor
-    )
-
-    # Insider Trading & Institutional Holdings Task
-    insider_trading_task = Task(
-        description="Analyze insider transactions and institutional investor activity to determine confidence in the stock from major stakeholders.",
+    ),
+    "insider_trading": dict(
+        agent="insider_trading_analyst",
+        description="Analyze insider transactions and institutional investor activity in {stock_symbol} to determine confidence in the stock from major stakeholders.",
         expected_output="A report summarizing insider buying/selling activity and institutional investment trends.",
-        agent=insider_trading_analyst
-    )
-
-    # Macroeconomic & Industry Analysis Task
-    macro_task = Task(
-        description="Assess macroeconomic factors such as interest rates, inflation, and industry trends to determine their impact on the stock’s performance.",
+    ),
+    "macro": dict(
+        agent="macro_industry_analyst",
+        description="Assess macroeconomic factors such as interest rates, inflation, and industry trends to determine their impact on {stock_symbol}'s performance.",
         expected_output="A macroeconomic and industry analysis report highlighting key external factors influencing the stock.",
-        agent=macro_industry_analyst
-    )
-
-    # Technical Analysis Task
-    technical_task = Task(
-        description="Perform technical analysis on the stock’s price movement using chart patterns, moving averages, RSI, and MACD indicators to identify trading opportunities.",
+    ),
+    "technical": dict(
+        agent="technical_analyst",
+        description="Perform technical analysis on {stock_symbol}'s price movement using chart patterns, moving averages, RSI, and MACD indicators to identify trading opportunities.",
         expected_output="A technical analysis report with support/resistance levels, trend insights, and trading signals.",
-        agent=technical_analyst
-    )
-
-    # Final Decision Task
-    final_decision_task = Task(
-        description="Compile insights from sentiment analysis, risk assessment, insider trading, macroeconomic trends, and technical analysis to provide a final investment recommendation.",
+    ),
+    "final_decision": dict(
+        agent="analyst",
+        description="Compile insights from the fundamental analysis, sentiment analysis, risk assessment, insider trading, macroeconomic trends, and technical analysis of {stock_symbol} to provide a final investment recommendation.",
         expected_output="A comprehensive investment report summarizing all analyses, with a final buy, hold, or sell recommendation.",
-        agent=analyst,
-        dependencies=[sentiment_task, risk_task, insider_trading_task, macro_task, technical_task]
-    )
+        # The analyst report is included so the analyst agent never runs two tasks of one crew at once.
+        context=["analyst", "sentiment", "risk", "insider_trading", "macro", "technical"],
+    ),
+}
 
-    crew = Crew(
-        agents=[analyst, sentiment, risk_assessor],
-        tasks=[sentiment_task, risk_task, final_decision_task],
-        process="sequential"
-    )
 
-    return crew
+class CrewFactory:
+    """Builds the LLM and agents once and hands out per-run crews with fresh tasks.
+
+    Tools come from the shared registry, which imports each one when the first agent using it is built.
+
+    crewai agents keep per-task executor state, so one agent set is never used by two
+    runs at the same time: finished runs return their set to a pool for the next run.
+    """
+
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm()
+        self._idle: List[Dict[str, "Agent"]] = []
+        self._lock = threading.Lock()
+
+    def _build_agents(self) -> Dict[str, "Agent"]:
+        from crewai import Agent
+
+        return {
+            name: Agent(**{**spec, "tools": [registry.get_tool(tool) for tool in spec["tools"]]}, llm=self.llm)
+            for name, spec in AGENTS.items()
+        }
+
+    def checkout(self) -> Dict[str, "Agent"]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._build_agents()
+
+    def release(self, agents: Dict[str, "Agent"]) -> None:
+        with self._lock:
+            self._idle.append(agents)
+
+    def create_crew(self, stock_symbol: str, agents: Optional[Dict[str, "Agent"]] = None) -> "Crew":
+        """A crew over ``agents``; without them it gets its own agent set, outside the pool (use ``crew`` to pool)."""
+        from crewai import Crew, Task
+
+        agents = agents or self._build_agents()
+        tasks = {}
+        for name, spec in TASKS.items():
+            tasks[name] = Task(
+                description=spec["description"].format(stock_symbol=stock_symbol),
+                expected_output=spec["expected_output"],
+                agent=agents[spec["agent"]],
+                name=name,
+                context=[tasks[dep] for dep in spec.get("context", [])],
+            )
+
+        return Crew(
+            agents=list(agents.values()),
+            tasks=list(tasks.values()),
+            process="sequential"
+        )
+
+    @contextmanager
+    def crew(self, stock_symbol: str):
+        """A crew for one run; its agents go back to the pool afterwards."""
+        agents = self.checkout()
+        try:
+            yield self.create_crew(stock_symbol, agents)
+        finally:
+            self.release(agents)
+
+
+@lru_cache(maxsize=1)
+def get_factory() -> CrewFactory:
+    return CrewFactory()
+
+
+def create_crew(stock_symbol):
+    """Unpooled crew for callers that keep it; each call builds a new agent set, so prefer ``get_factory().crew``."""
+    return get_factory().create_crew(stock_symbol)
+
+
+def task_dependencies(tasks: List["Task"]) -> Dict[int, List["Task"]]:
+    """Map each task (by id) to the tasks in its context that are part of ``tasks``."""
+    members = {id(task) for task in tasks}
+    graph = {}
+    for task in tasks:
+        context = task.context if isinstance(task.context, list) else []
+        graph[id(task)] = [dep for dep in context if id(dep) in members]
+    return graph
+
+
+def _execute_task(task: "Task", dependencies: List["Task"]):
+    context = CONTEXT_DIVIDER.join(dep.output.raw for dep in dependencies if dep.output is not None)
+    with tracing.span(f"task {task.name}", **{"task.name": task.name, "agent.role": task.agent.role}):
+        return task.execute_sync(agent=task.agent, context=context or None, tools=task.agent.tools)
+
+
+def run_concurrently(crew: "Crew", max_concurrency: Optional[int] = None, progress: Optional[Callable[["Task", str], None]] = None):
+    """Run the crew's tasks as a DAG: independent tasks run in parallel, each task starts once its context is done.
+
+    ``progress`` is called with each task and "started", "finished" or "failed".
+    Returns the output of the last task in the crew, like ``Crew.kickoff``.
+    """
+    notify = progress or (lambda task, status: None)
+    graph = task_dependencies(crew.tasks)
+    pending = {id(task): task for task in crew.tasks}
+    finished = set()
+    outputs = {}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency or MAX_CONCURRENCY) as pool:
+        running = {}
+        while pending or running:
+            for key, task in list(pending.items()):
+                if all(id(dep) in finished for dep in graph[key]):
+                    running[pool.submit(tracing.bind(_execute_task), task, graph[key])] = task
+                    del pending[key]
+                    notify(task, "started")
+            if not running:
+                raise ValueError("Crew tasks have a dependency cycle.")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                if future.exception() is not None:
+                    notify(task, "failed")
+                outputs[id(task)] = future.result()
+                finished.add(id(task))
+                notify(task, "finished")
+
+    return outputs[id(crew.tasks[-1])]
 
 
-def run_analysis(stock_symbol):
-    crew = create_crew(stock_symbol)
-    result = crew.kickoff()
-    return result
+def run_analysis(stock_symbol, concurrent=True, max_concurrency=None, progress=None):
+    """Run the crew for one symbol; the whole run is one trace (see ``tracing.last_trace``)."""
+    with tracing.span(f"analysis {stock_symbol}", **{"analysis.symbol": stock_symbol, "analysis.concurrent": concurrent}):
+        with get_factory().crew(stock_symbol) as crew:
+            if concurrent:
+                return run_concurrently(crew, max_concurrency, progress=progress)
+            result = crew.kickoff()
+            return result
 
 
 def main():
     print(run_analysis("GOOGL"))
+    print(tracing.summary(tracing.last_trace()))
 
 
 if __name__ == "__main__":
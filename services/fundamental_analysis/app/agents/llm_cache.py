@@ -0,0 +1,145 @@
+"""On-disk response cache for the crew's LLM.
+
+Responses are keyed by a hash of the model settings, the full prompt (which
+carries the task description and any tool output the agent has seen) and the
+trading date, i.e. the latest NYSE session, taken from the exchange calendar so
+every process derives the same key without a network call. Re-running an
+analysis within one trading session (including over a weekend or holiday)
+replays unchanged tasks from the cache; a task whose tool output changed
+misses and calls the model.
+The store is size-bounded with least-recently-used eviction.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from crewai import LLM
+from tools import benchmarks, compaction, tracing
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "finnie", "llm_cache.sqlite")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def prompt_fingerprint(model: str, messages: Any, settings: Optional[Dict[str, Any]] = None, day: Optional[str] = None) -> str:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "settings": settings or {},
+        "day": day or benchmarks.last_session_date(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def count_tokens(model: str, messages: Any = None, text: Optional[str] = None) -> int:
+    """Token count with the model's tokenizer when litellm knows it, else a character estimate."""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    try:
+        import litellm
+        return int(litellm.token_counter(model=model, messages=messages, text=text))
+    except Exception:
+        return compaction.estimate_tokens(text if text is not None else json.dumps(messages, default=str))
+
+
+class ResponseCache:
+    """SQLite-backed key/value store bounded by total response size."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, size, time.time()))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+class CachedLLM(LLM):
+    """An ``LLM`` that answers repeated prompts from a ``ResponseCache``."""
+
+    def __init__(self, *args, cache: Optional[ResponseCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.response_cache = cache or ResponseCache(
+            path=os.getenv("FINNIE_LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_bytes=int(os.getenv("FINNIE_LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        with tracing.span("llm call", kind="client", **{"llm.model": self.model}) as span:
+            response, hit = self._call(messages, tools, callbacks, available_functions, **kwargs)
+            span.set(**{"cache.hit": hit})
+            if tracing.ENABLED:
+                span.set(**{
+                    "llm.prompt_tokens": count_tokens(self.model, messages),
+                    "llm.completion_tokens": count_tokens(self.model, text=response if isinstance(response, str) else str(response)),
+                })
+            return response
+
+    def _call(self, messages, tools, callbacks, available_functions, **kwargs):
+        # Native function calling executes tools inside the call, so its result cannot be replayed.
+        if tools:
+            return super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs), False
+
+        settings = {
+            "temperature": getattr(self, "temperature", None),
+            "stop": getattr(self, "stop", None),
+            "max_tokens": getattr(self, "max_tokens", None),
+        }
+        key = prompt_fingerprint(self.model, messages, settings)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached, True
+
+        response = super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+        if isinstance(response, str):
+            self.response_cache.put(key, response)
+        return response, False
@@ -0,0 +1,101 @@
+"""Startup timing and pre-warming for workers.
+
+Usage:
+    python startup.py --measure              # time each import / first-use step in a fresh process
+    python startup.py --prewarm AAPL MSFT    # load everything a crew run needs, plus these symbols' data
+
+``prewarm`` is also what the API runs at boot (FINNIE_PREWARM=1) or on
+``POST /prewarm``, so an autoscaled worker pays the import and cache-loading
+cost before its first job instead of during it.
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+def _steps() -> List[Tuple[str, Callable[[], object]]]:
+    def crew():
+        return importlib.import_module("crew")
+
+    def tools():
+        from tools import registry
+        for name in sorted({tool for spec in crew().AGENTS.values() for tool in spec["tools"]}):
+            registry.get_tool(name)
+
+    def stores():
+        from tools import indicators, market_data, price_store, statements
+        market_data.get_cache()
+        market_data.yfinance()
+        price_store.get_store()
+        statements.get_store()
+        indicators.get_engine()
+
+    def sentiment():
+        from tools import sentiment_engine
+        sentiment_engine.get_engine().score(["warm up"])
+
+    def agents():
+        factory = crew().get_factory()
+        factory.release(factory.checkout())
+
+    return [
+        ("import crew", crew),
+        ("build llm", lambda: crew().get_llm()),
+        ("import tools", tools),
+        ("open stores", stores),
+        ("load sentiment engine", sentiment),
+        ("build agents", agents),
+    ]
+
+
+def measure() -> Dict[str, float]:
+    """Seconds spent in each startup step, in order; only meaningful in a fresh process."""
+    timings = {}
+    for label, step in _steps():
+        start = time.perf_counter()
+        step()
+        timings[label] = time.perf_counter() - start
+    return timings
+
+
+def prewarm(symbols: Iterable[str] = ()) -> Dict[str, float]:
+    """Run every startup step, then bring the symbols' prices, statements and indicators up to date."""
+    timings = measure()
+    symbols = [symbol.upper() for symbol in symbols]
+    if symbols:
+        from tools import benchmarks, indicators, price_store, statements
+
+        start = time.perf_counter()
+        benchmarks.get_benchmark().close()
+        price_store.get_store().update_many(symbols)
+        statements.get_store().load(symbols)
+        indicators.get_engine().refresh_many(symbols)
+        timings["load symbol data"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup time or pre-warm this process's caches.")
+    parser.add_argument("symbols", nargs="*", help="Symbols whose data to load when pre-warming")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--measure", action="store_true")
+    mode.add_argument("--prewarm", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print the timings as JSON")
+    args = parser.parse_args()
+
+    process_start = time.perf_counter()
+    timings = measure() if args.measure else prewarm(args.symbols)
+    timings["total"] = time.perf_counter() - process_start
+    if args.json:
+        json.dump(timings, sys.stdout, indent=2)
+        print()
+        return
+    for label, seconds in timings.items():
+        print(f"{label:24} {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Process-wide benchmark index series (e.g. the S&P 500) shared by the tools.
+
+Each benchmark is loaded once, then extended by fetching only the bars after
+the last cached date. Callers get read-only views over the cached closes.
+
+``last_session_date`` works out the current trading session from the NYSE
+holiday calendar instead, for callers that must not depend on a fetch.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+from pandas.tseries.offsets import CustomBusinessDay
+from . import market_data
+
+
+SP500 = "^GSPC"
+EXCHANGE_TZ = "America/New_York"
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """Full-day NYSE closures; one-off closures (e.g. national days of mourning) are not modelled."""
+
+    rules = [
+        # A Saturday New Year's Day is not observed on the Friday before.
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-06-19", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+SESSION = CustomBusinessDay(calendar=NYSEHolidayCalendar())
+
+
+def daily_close(frame: pd.DataFrame) -> pd.Series:
+    """Close prices indexed by tz-naive calendar date, so series from ``history`` and ``download`` line up."""
+    close = frame["Close"]
+    if isinstance(close, pd.DataFrame):
+        # yf.download returns one column per ticker even for a single symbol.
+        close = close.iloc[:, 0]
+    index = pd.DatetimeIndex(close.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    close = pd.Series(close.to_numpy(), index=index.normalize(), name=close.name)
+    return close[~close.index.duplicated(keep="last")].dropna()
+
+
+class BenchmarkSeries:
+    """Daily closes for one benchmark, refreshed incrementally."""
+
+    def __init__(self, symbol: str, period: str = "10y", refresh_interval: int = 15 * market_data.MINUTE):
+        self.symbol = symbol
+        self.period = period
+        self.refresh_interval = refresh_interval
+        self._close: Optional[pd.Series] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def close(self, start=None) -> pd.Series:
+        """Read-only view of the closes, optionally from ``start`` onwards."""
+        self._refresh()
+        if start is None:
+            return self._close
+        start = pd.Timestamp(start)
+        if start.tz is not None:
+            start = start.tz_localize(None)
+        return self._close.loc[start.normalize():]
+
+    def returns(self, start=None) -> pd.Series:
+        return self.close(start).pct_change().dropna()
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._close is not None and time.time() - self._checked_at < self.refresh_interval:
+                return
+            try:
+                if self._close is None:
+                    combined = daily_close(market_data.get_history(self.symbol, period=self.period))
+                else:
+                    start = self._close.index[-1] + pd.Timedelta(days=1)
+                    frame = market_data.get_history_since(self.symbol, start)
+                    combined = self._close
+                    if frame is not None and not frame.empty:
+                        combined = pd.concat([combined, daily_close(frame)])
+                        combined = combined[~combined.index.duplicated(keep="last")]
+            except Exception as e:
+                if self._close is None:
+                    raise
+                print(f"Error extending benchmark {self.symbol}, serving cached series: {e}")
+                combined = self._close
+
+            values = combined.to_numpy(dtype=float, copy=True)
+            values.flags.writeable = False
+            self._close = pd.Series(values, index=combined.index, name=self.symbol, copy=False)
+            self._checked_at = time.time()
+
+
+_benchmarks: Dict[str, BenchmarkSeries] = {}
+_benchmarks_lock = threading.Lock()
+
+
+def get_benchmark(symbol: str = SP500) -> BenchmarkSeries:
+    with _benchmarks_lock:
+        if symbol not in _benchmarks:
+            _benchmarks[symbol] = BenchmarkSeries(symbol)
+        return _benchmarks[symbol]
+
+
+def last_session_date(now: Optional[pd.Timestamp] = None) -> str:
+    """ISO date of the latest NYSE session to have opened, i.e. the date of the index's latest daily bar."""
+    now = pd.Timestamp.now(tz=EXCHANGE_TZ) if now is None else pd.Timestamp(now)
+    if now.tz is not None:
+        now = now.tz_convert(EXCHANGE_TZ).tz_localize(None)
+    day = now.normalize()
+    if now - day < SESSION_OPEN:
+        day -= pd.Timedelta(days=1)
+    # Rolling back by zero sessions lands on the latest session on or before ``day``.
+    return SESSION.rollback(day).date().isoformat()
@@ -0,0 +1,127 @@
+"""Shared sector/industry context for the tools.
+
+Each normalized sector or industry key maps to one ``CategoryContext``: its
+top companies, research report titles and their precomputed sentiment. The
+contexts live in the market data cache, so every tool and every process on
+the host reuses them, and a background thread can rebuild them before they
+expire.
+"""
+import threading
+import time
+from typing import List, Optional
+
+import pandas as pd
+from pydantic import BaseModel
+from . import market_data, sentiment_engine
+
+
+SECTOR = "sector"
+INDUSTRY = "industry"
+
+
+def format_category(text: str) -> str:
+    """Yahoo's sector/industry key for a display name, e.g. "Consumer Electronics" -> "consumer-electronics"."""
+    if "-" not in text:
+        try:
+            res = []
+            for word in text.split():
+                if word != "-" and word != "&":
+                    res.append(word.lower())
+            return "-".join(res)
+        except Exception as e:
+            print(f"Error formatting category: {e}")
+            return "unknown"
+    return text
+
+
+class CategoryContext(BaseModel):
+    kind: str
+    key: str
+    top_companies: List[str]
+    report_titles: List[str]
+    sentiment_score: float
+    refreshed_at: float
+
+
+class CategoryRegistry:
+    """Builds category contexts once and serves them from the shared cache until they expire."""
+
+    def get(self, kind: str, name: str) -> CategoryContext:
+        key = format_category(name)
+        return market_data.get_cache().get(key, f"{kind}_context", lambda: self._build(kind, key))
+
+    def sector(self, name: str) -> CategoryContext:
+        return self.get(SECTOR, name)
+
+    def industry(self, name: str) -> CategoryContext:
+        return self.get(INDUSTRY, name)
+
+    def refresh(self, kind: str, key: str) -> CategoryContext:
+        """Rebuild a context from freshly fetched data and replace the cached one."""
+        cache = market_data.get_cache()
+        cache.invalidate(key, f"{kind}_top_companies")
+        cache.invalidate(key, f"{kind}_research_reports")
+        context = self._build(kind, key)
+        cache.put((key.upper(), f"{kind}_context", "", ""), context)
+        return context
+
+    def refresh_all(self) -> int:
+        """Rebuild every context any process has cached so far; returns how many were rebuilt."""
+        refreshed = 0
+        for kind in (SECTOR, INDUSTRY):
+            for key in market_data.get_cache().symbols(f"{kind}_context"):
+                try:
+                    self.refresh(kind, key.lower())
+                    refreshed += 1
+                except Exception as e:
+                    print(f"Error refreshing {kind} {key}: {e}")
+        return refreshed
+
+    def start_refresh_thread(self, interval: Optional[float] = None) -> threading.Thread:
+        """Rebuild all known contexts on a schedule, by default shortly before they expire."""
+        interval = interval or market_data.get_cache().ttl(f"{SECTOR}_context") * 0.9
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.refresh_all()
+
+        thread = threading.Thread(target=loop, name="category-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def _build(self, kind: str, key: str) -> CategoryContext:
+        get_top_companies = getattr(market_data, f"get_{kind}_top_companies")
+        get_reports = getattr(market_data, f"get_{kind}_research_reports")
+        top_companies, titles, failures = [], [], []
+
+        try:
+            frame = get_top_companies(key)
+            if frame is not None:
+                top_companies = list(pd.DataFrame(frame)['name'].to_dict().keys())
+        except Exception as e:
+            failures.append(e)
+        try:
+            titles = [report.get('reportTitle', "") for report in get_reports(key)]
+        except Exception as e:
+            failures.append(e)
+
+        # Nothing usable: raise so the empty result is not cached for the whole TTL.
+        if len(failures) == 2:
+            raise failures[0]
+
+        return CategoryContext(
+            kind=kind,
+            key=key,
+            top_companies=top_companies,
+            report_titles=titles,
+            sentiment_score=sentiment_engine.get_engine().mean_score(titles),
+            refreshed_at=time.time(),
+        )
+
+
+_registry = CategoryRegistry()
+
+
+def get_registry() -> CategoryRegistry:
+    return _registry
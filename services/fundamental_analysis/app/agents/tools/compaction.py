@@ -0,0 +1,170 @@
+"""Token-budgeted digests of tool output for the agents' prompts.
+
+Tools decorate ``_run`` with ``compact_output``. The raw result is passed to
+the tool's ``digest`` method (growth rates, ratios and top-k evidence computed
+in code), then normalized (rounded numbers, empty fields dropped), trimmed to
+the tool's token budget and serialized as compact JSON. Token counts before
+and after are recorded per tool so the reduction can be measured.
+"""
+import functools
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+from pydantic import BaseModel
+from . import tracing
+
+
+ENABLED = os.getenv("FINNIE_COMPACT_TOOL_OUTPUT", "1") != "0"
+DEFAULT_TOKEN_BUDGET = 300
+# Per-tool budgets, keyed by the tool's ``name``.
+TOKEN_BUDGETS: Dict[str, int] = {
+    "Earnings Call Analysis Tool": 250,
+    "Stock Competitor Analysis Tool": 350,
+    "Sentiment Analysis Tool": 350,
+    "Risk Analysis Tool": 60,
+    "Technical Analysis Tool": 120,
+}
+SIGNIFICANT_DIGITS = 3
+EMPTY_VALUES = (None, "", "N/A", "None", "nan")
+
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and numbers)."""
+    return math.ceil(len(text) / 4)
+
+
+def format_number(value: float) -> Any:
+    """Round to a few significant digits; abbreviate large magnitudes (1234567890 -> "1.23B")."""
+    if not math.isfinite(value):
+        return None
+    magnitude = abs(value)
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if magnitude >= threshold:
+            return f"{value / threshold:.{SIGNIFICANT_DIGITS}g}{suffix}"
+    if value == int(value) and magnitude < 1e6:
+        return int(value)
+    return float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+
+
+def percent(value: Optional[float]) -> Optional[str]:
+    if value is None or not math.isfinite(value):
+        return None
+    return f"{value * 100:.{SIGNIFICANT_DIGITS}g}%"
+
+
+def growth(current: Optional[float], previous: Optional[float]) -> Optional[str]:
+    if current is None or previous is None or not previous or not math.isfinite(current) or not math.isfinite(previous):
+        return None
+    return percent((current - previous) / abs(previous))
+
+
+def normalize(value: Any) -> Any:
+    """Plain JSON-able structure with rounded numbers and empty fields dropped."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        items = ((str(k), normalize(v)) for k, v in value.items())
+        return {k: v for k, v in items if v not in EMPTY_VALUES and v != {} and v != []}
+    if isinstance(value, (list, tuple)):
+        return [v for v in (normalize(v) for v in value) if v not in EMPTY_VALUES]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return format_number(float(value))
+    if isinstance(value, str):
+        try:
+            return format_number(float(value))
+        except ValueError:
+            return value
+    return str(value)
+
+
+def to_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def fit_to_budget(value: Any, budget: int) -> Any:
+    """Drop trailing list items, then halve the longest strings, until the JSON fits the budget."""
+    while estimate_tokens(to_json(value)) > budget:
+        longest_list = _largest(value, list, key=lambda v: len(v) > 1)
+        if longest_list is not None:
+            longest_list.pop()
+            continue
+        longest_text = _largest_string(value)
+        if longest_text is None or len(longest_text[0][longest_text[1]]) <= 16:
+            break
+        container, key = longest_text
+        text = container[key]
+        container[key] = text[: len(text) // 2].rstrip() + "…"
+    return value
+
+
+def _largest(value: Any, kind: type, key) -> Optional[Any]:
+    best = None
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, kind) and key(node) and (best is None or len(to_json(node)) > len(to_json(best))):
+            best = node
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return best
+
+
+def _largest_string(value: Any):
+    best = None
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        children = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else ()
+        for key, child in children:
+            if isinstance(child, str) and (best is None or len(child) > len(best[0][best[1]])):
+                best = (node, key)
+            elif isinstance(child, (dict, list)):
+                stack.append(child)
+    return best
+
+
+def compact(tool_name: str, raw: Any, digest: Any) -> str:
+    """Normalize and budget a digest, recording token counts for the raw and compacted output."""
+    budget = TOKEN_BUDGETS.get(tool_name, DEFAULT_TOKEN_BUDGET)
+    output = to_json(fit_to_budget(normalize(digest), budget))
+    tokens_before, tokens_after = estimate_tokens(str(raw)), estimate_tokens(output)
+    record(tool_name, tokens_before, tokens_after)
+    tracing.annotate(**{"tool.tokens_before": tokens_before, "tool.tokens_after": tokens_after})
+    return output
+
+
+def record(tool_name: str, tokens_before: int, tokens_after: int) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(tool_name, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+        entry["calls"] += 1
+        entry["tokens_before"] += tokens_before
+        entry["tokens_after"] += tokens_after
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Per-tool call count and total estimated tokens before and after compaction."""
+    with _stats_lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def compact_output(run):
+    """Decorator for ``BaseTool._run``: return the tool's budgeted digest instead of the raw result."""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        raw = run(self, *args, **kwargs)
+        if not ENABLED:
+            return raw
+        digest = self.digest(raw) if hasattr(self, "digest") else raw
+        return compact(self.name, raw, digest)
+    return wrapper
@@ -1,8 +1,21 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type, List
-import yfinance as yf
+from typing import Dict, Type, List
 import pandas as pd
+from . import categories, compaction, market_data, tracing
+from .fetch_client import gather
+
+MAX_COMPETITORS = 5
+
+INFO_FIELDS = {
+    "marketCap": "marketCap",
+    "net_profit_margin": "profitMargins",
+    "return_on_equity": "returnOnEquity",
+    "sales_per_share": "revenuePerShare",
+    "long_term_debt_to_equity": "debtToEquity",
+    "eps_5year_forecast": "earningsGrowth",
+}
+
 
 class CompetitorToolInput(BaseModel):
     """Input schema for StockCompetitorAnalysisTool."""
@@ -19,63 +32,77 @@ class StockInfo(BaseModel):
 
 class Competitor(BaseModel):
     tickers: List[str]
+    industry: List[str] = []
+    sector: List[str] = []
 
 
 class CompetitorTool(BaseTool):
     name: str = "Stock Competitor Analysis Tool"
     description: str = "Analyzes a stock's sector and industry, finds competitors, and computes sector/industry averages."
     args_schema: Type[BaseModel] = CompetitorToolInput
-    
+
+    @tracing.tool_span
+    @compaction.compact_output
     def _run(self, stock_symbol) -> dict:
-        info = yf.Ticker(stock_symbol).info
+        info = market_data.get_info(stock_symbol)
         sector = info.get('sector')
         industry = info.get('industry')
 
-        main_stock_info = self.getStockInfo(stock_symbol)
-        competitors = self.getCompetitors(industry, sector).tickers
-        
+        main_stock_info = self.getStockInfo(stock_symbol, info)
+        competitors = self.getCompetitors(industry, sector)
+
+        # Only the top peers of each list are looked up; a peer that fails or times out is left out.
+        peers = list(dict.fromkeys(competitors.industry[:MAX_COMPETITORS] + competitors.sector[:MAX_COMPETITORS]))
+        peers = [peer for peer in peers if peer != stock_symbol.upper()]
+        peer_infos = market_data.get_info_many(peers)
+        frame = self.getInfoFrame(peer_infos)
 
         results = {
             "main_stock": main_stock_info,
-            "competitors": [self.getStockInfo(c) for c in competitors[:5]]
+            "competitors": [self.getStockInfo(c, peer_infos[c]) for c in competitors.tickers if c in peer_infos][:MAX_COMPETITORS],
+            "industry_average": self.getAverage(f"{industry} average", frame, competitors.industry),
+            "sector_average": self.getAverage(f"{sector} average", frame, competitors.sector),
         }
 
         return results
 
-    def getStockInfo(self, stock_symbol) -> StockInfo:
-        stock = yf.Ticker(stock_symbol)
-        info = stock.info
+    def getStockInfo(self, stock_symbol, info: dict = None) -> StockInfo:
+        if info is None:
+            info = market_data.get_info(stock_symbol)
 
         return StockInfo(
             ticker=stock_symbol,
-            marketCap=str(info.get("marketCap", "N/A")),
-            net_profit_margin=str(info.get("profitMargins", "N/A")),
-            return_on_equity=str(info.get("returnOnEquity", "N/A")),
-            sales_per_share=str(info.get("revenuePerShare", "N/A")),
-            long_term_debt_to_equity=str(info.get("debtToEquity", "N/A")),
-            eps_5year_forecast=str(info.get("earningsGrowth", "N/A")),
+            **{field: str(info.get(key, "N/A")) for field, key in INFO_FIELDS.items()}
+        )
+
+    def getInfoFrame(self, infos: Dict[str, dict]) -> pd.DataFrame:
+        """One row per symbol, one numeric column per StockInfo field."""
+        frame = pd.DataFrame.from_dict(
+            {symbol: {field: info.get(key) for field, key in INFO_FIELDS.items()} for symbol, info in infos.items()},
+            orient="index",
+            columns=list(INFO_FIELDS),
         )
+        return frame.apply(pd.to_numeric, errors="coerce")
+
+    def getAverage(self, label: str, frame: pd.DataFrame, members: List[str]) -> StockInfo:
+        averages = frame.loc[frame.index.isin(members)].mean()
+        return StockInfo(
+            ticker=label,
+            **{field: "N/A" if pd.isna(value) else str(round(value, 4)) for field, value in averages.items()}
+        )
+
+    def getCompetitors(self, industry: str, sector: str) -> Competitor:
+        registry = categories.get_registry()
+        contexts = gather({
+            "industry": lambda: registry.industry(industry),
+            "sector": lambda: registry.sector(sector),
+        })
+        industry_competitors = contexts["industry"].top_companies if "industry" in contexts else []
+        sector_competitors = contexts["sector"].top_companies if "sector" in contexts else []
+
+        competitors = list(dict.fromkeys(industry_competitors + sector_competitors))
+
+        return Competitor(tickers=competitors, industry=industry_competitors, sector=sector_competitors)
 
-    def getCompetitors(self, industry: str, sector: str) -> List[Competitor]:
-        
-        industry_competitors = pd.DataFrame(yf.Industry(self.format_category(industry)).top_companies)
-        sector_competitors = yf.Sector(self.format_category(sector)).top_companies
-        industry_competitors = [key for key in industry_competitors['name'].to_dict().keys()]
-        sector_competitors = [key for key in sector_competitors['name'].to_dict().keys()]
-        
-        competitors = list(set(industry_competitors) | set(sector_competitors))
-
-        return Competitor(tickers=competitors)
-    
     def format_category(self, text: str) -> str:
-        if "-" not in text:
-            try:
-                res = []
-                for word in text.split():
-                    if word != "-" and word != "&":
-                        res.append(word.lower())
-                return "-".join(res)
-            except Exception as e:
-                print(f"Error formatting category: {e}")
-                return "unknown"
-        return text
+        return categories.format_category(text)
@@ -1,8 +1,9 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 from typing import Type
-import yfinance as yf
 from typing import Dict
+import pandas as pd
+from . import compaction, statements, tracing
 
 
 
@@ -46,14 +47,50 @@ class EarningsCallTool(BaseTool):
     description: str = "Fetches detailed earnings report data, including income statement, balance sheet, and cash flow statement."
     args_schema: Type[BaseModel] = EarningsCallToolInput
 
+    @tracing.tool_span
+    @compaction.compact_output
     def _run(self, stock_symbol: str) -> dict:
         """Main function to get earnings report data."""
         try:
             earnings_report = self.get_earning_report(stock_symbol)
+            error = statements.get_store().errors.get(stock_symbol.upper())
+            if error and not earnings_report["income_statement"]:
+                return {"error": f"Error fetching earnings data: {error}"}
             return earnings_report
         except Exception as e:
             return {"error": f"Error fetching earnings data: {str(e)}"}
 
+    def digest(self, report: dict) -> dict:
+        """Latest-year figures with year-over-year growth and ratios instead of every statement."""
+        if "error" in report:
+            return report
+        frame = statements.get_store().statements(report["stock_symbol"]).dropna(how="all")
+        if frame.empty:
+            error = statements.get_store().errors.get(report["stock_symbol"].upper())
+            return {"stock_symbol": report["stock_symbol"], "error": f"No statements available: {error}" if error else "No statements available."}
+
+        latest = frame.iloc[-1]
+        previous = frame.iloc[-2] if len(frame) > 1 else pd.Series(dtype=float)
+        return {
+            "stock_symbol": report["stock_symbol"],
+            "period": str(frame.index[-1].date()),
+            "revenue": latest["total_revenue"],
+            "revenue_growth": compaction.growth(latest["total_revenue"], previous.get("total_revenue")),
+            "net_income": latest["net_income"],
+            "net_income_growth": compaction.growth(latest["net_income"], previous.get("net_income")),
+            "gross_margin": compaction.percent(latest["gross_margin"]),
+            "operating_margin": compaction.percent(latest["operating_margin"]),
+            "net_margin": compaction.percent(latest["net_margin"]),
+            "free_cash_flow": latest["free_cash_flow"],
+            "free_cash_flow_growth": compaction.growth(latest["free_cash_flow"], previous.get("free_cash_flow")),
+            "fcf_margin": compaction.percent(latest["fcf_margin"]),
+            "current_ratio": latest["current_ratio"],
+            "liabilities_to_equity": latest["total_liabilities"] / latest["total_equity"] if latest["total_equity"] else None,
+            "buybacks": -latest["repurchase_of_stock"],
+            "end_cash": latest["end_cash_position"],
+            "years_reported": len(frame),
+        }
+
     def get_earning_report(self, stock_symbol: str) -> dict:
         """Get the full earnings report (income statement, balance sheet, cash flow)."""
         income_statement = self.get_income_statement(stock_symbol)
@@ -67,76 +104,23 @@ class EarningsCallTool(BaseTool):
             "cash_flow_statement": cash_flow_statement
         }
 
-    def get_income_statement(self, stock_symbol: str) -> IncomeStatement:
+    def get_income_statement(self, stock_symbol: str) -> Dict[str, IncomeStatement]:
         """Fetch the income statement for the given stock."""
-        ticker = yf.Ticker(stock_symbol)
-        income_statement_data = ticker.financials.to_dict()
-        income_statement_statments = {}
-        for date, data in income_statement_data.items():
-            formatted_date = str(date).split(" ")[0]
-            income_statement_statments[formatted_date] = self._parse_income_statement_item(data)
-        
-        return income_statement_statments
-        
-    
-
-    def _parse_income_statement_item(self, income_statement_data: Dict) -> IncomeStatement:
-        return IncomeStatement(
-            total_revenue = income_statement_data['Total Revenue'],
-            gross_profit = income_statement_data['Gross Profit'],
-            operating_income = income_statement_data['Operating Income'],
-            net_income = income_statement_data['Net Income'],
-            cost_of_revenue = income_statement_data['Cost Of Revenue'],
-        )
-
-
-
-    def get_balance_sheet(self, stock_symbol: str) -> BalanceSheet:
-        
-        ticker = yf.Ticker(stock_symbol)
-        balance_sheet_data = ticker.balance_sheet.to_dict()
-        balance_sheet_statments = {}
-        for date, data in balance_sheet_data.items():
-            formatted_date = str(date).split(" ")[0]
-            balance_sheet_statments[formatted_date] = self._parse_balance_sheet_item(data)
-        
-        return balance_sheet_statments
-        
-        
-    
-    def _parse_balance_sheet_item(self, balance_sheet_data: Dict) -> BalanceSheet:
-        
-        return BalanceSheet(
-            total_assets=balance_sheet_data['Total Assets'],
-            total_liabilities=balance_sheet_data['Total Liabilities Net Minority Interest'],
-            total_equity=balance_sheet_data['Total Equity Gross Minority Interest'],
-            current_assets=balance_sheet_data['Current Assets'],
-            current_liabilities=balance_sheet_data['Current Liabilities']
-        )
+        return self._statement_models(stock_symbol, IncomeStatement, statements.INCOME_FIELDS)
+
+    def get_balance_sheet(self, stock_symbol: str) -> Dict[str, BalanceSheet]:
+        """Fetch the balance sheet for the given stock."""
+        return self._statement_models(stock_symbol, BalanceSheet, statements.BALANCE_FIELDS)
 
     def get_cash_flow_statement(self, stock_symbol: str) -> Dict[str, CashFlowStatement]:
         """Fetch the cash flow statement for the given stock."""
-        ticker = yf.Ticker(stock_symbol)
-        cash_flow_data = ticker.cash_flow.to_dict()
-        
-        cash_flow_statements = {}
-        for date, data in cash_flow_data.items():
-            formatted_date = str(date).split(" ")[0]
-            cash_flow_statements[formatted_date] = self._parse_cash_flow_item(data)
-        
-        return cash_flow_statements
-
-    def _parse_cash_flow_item(self, cash_flow_data: Dict) -> CashFlowStatement:
-        """Parse raw cash flow data into a structured CashFlowStatement."""
-        return CashFlowStatement(
-            operating_cash_flow=cash_flow_data['Operating Cash Flow'],
-            investing_cash_flow=cash_flow_data['Investing Cash Flow'],
-            financing_cash_flow=cash_flow_data['Financing Cash Flow'],
-            free_cash_flow=cash_flow_data['Operating Cash Flow'] + cash_flow_data['Capital Expenditure'],
-            capital_expenditures=cash_flow_data['Capital Expenditure'],
-            repurchase_of_stock=cash_flow_data['Repurchase Of Capital Stock'],
-            long_term_debt_issuance=cash_flow_data['Issuance Of Debt'],
-            long_term_debt_repayment=cash_flow_data['Repayment Of Debt'],
-            end_cash_position=cash_flow_data['End Cash Position']
-        )
+        return self._statement_models(stock_symbol, CashFlowStatement, list(statements.CASH_FLOW_FIELDS) + ["free_cash_flow"])
 
+    def _statement_models(self, stock_symbol: str, model: Type[BaseModel], fields) -> Dict[str, BaseModel]:
+        """Per-date models built from the columnar store, newest period first."""
+        frame = statements.get_store().statements(stock_symbol)[list(model.model_fields)]
+        frame = frame.loc[frame[list(fields)].notna().any(axis=1)]
+        return {
+            str(date.date()): model(**row)
+            for date, row in zip(frame.index[::-1], frame.iloc[::-1].to_dict("records"))
+        }
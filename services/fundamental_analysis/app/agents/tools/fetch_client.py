@@ -0,0 +1,294 @@
+"""Throttled, retrying calls to the upstream data sources.
+
+Every request to an upstream (Yahoo Finance through yfinance, Serper for web
+search) goes through that upstream's ``Upstream``:
+
+- a token bucket shared by every thread keeps the request rate at the
+  upstream's limit; retries spend tokens too, so they cannot pile up into a
+  retry storm, and a rate-limit response pauses the whole bucket;
+- transient failures (rate limiting, 5xx, connection errors, timeouts) are
+  retried with full-jitter exponential backoff;
+- a circuit breaker fails fast with ``CircuitOpenError`` once an upstream
+  keeps failing, and lets a single probe through after a cool-down.
+
+Errors that are not transient (an unknown symbol, a parsing error) are
+raised immediately and do not count against the breaker.
+
+Calls made through ``gather`` carry its deadline: once the caller has given
+up, ``Upstream.call`` stops waiting for tokens, backing off and retrying and
+raises ``DeadlineExceeded``, so abandoned calls free their pool thread.
+"""
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from . import tracing
+
+
+class UpstreamError(Exception):
+    """An upstream call failed after its retries; ``__cause__`` is the last error."""
+
+    def __init__(self, upstream: str, message: str):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class CircuitOpenError(UpstreamError):
+    """The upstream's circuit breaker is open; the call was not attempted."""
+
+
+class DeadlineExceeded(UpstreamError):
+    """The caller's deadline passed before the call could be (re)tried."""
+
+
+# Upstream -> (requests per second, burst, max retries).
+UPSTREAM_LIMITS = {
+    "yahoo": (float(os.getenv("FINNIE_YAHOO_RATE", "5")), int(os.getenv("FINNIE_YAHOO_BURST", "10")), 4),
+    "serper": (float(os.getenv("FINNIE_SERPER_RATE", "5")), int(os.getenv("FINNIE_SERPER_BURST", "5")), 3),
+}
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+# Consecutive transient failures that open the breaker, and how long it stays open.
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+# Pause applied to the whole bucket when the upstream says we are rate limited.
+RATE_LIMIT_PAUSE = 5.0
+# Calls in flight at once across every ``gather`` in the process, and the seconds each may take.
+MAX_CONCURRENCY = 8
+REQUEST_TIMEOUT = 10.0
+RETRYABLE_ERRORS = {"YFRateLimitError", "RequestsError", "CurlError", "Timeout", "ConnectTimeout", "ReadTimeout"}
+# time.monotonic() after which the current call is abandoned; set per call by ``gather``.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("fetch_deadline", default=None)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return type(error).__name__ == "YFRateLimitError" or status_code(error) == 429 or "Too Many Requests" in str(error)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if is_rate_limit(error):
+        return True
+    status = status_code(error)
+    if status is not None:
+        return status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def backoff_delay(attempt: int, base: float = BASE_DELAY, cap: float = MAX_DELAY) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)], so retrying clients spread out."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Blocking token bucket shared by every thread calling one upstream."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> Optional[float]:
+        """Take a token, sleeping until one is available; returns the seconds waited, or None if none is available by ``deadline``."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + delay > deadline:
+                return None
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` (after a rate-limit response)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out; after the cool-down, only one probe at a time."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class Upstream:
+    def __init__(self, name: str, rate: float, burst: int, max_retries: int):
+        self.name = name
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker()
+        self.counts = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "rate_limited": 0}
+        self.throttled_seconds = 0.0
+        self._counts_lock = threading.Lock()
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._counts_lock:
+            if key == "throttled_seconds":
+                self.throttled_seconds += amount
+            else:
+                self.counts[key] += amount
+
+    def call(self, function: Callable, *args, **kwargs) -> Any:
+        """Call ``function`` under this upstream's rate limit, retries and circuit breaker, within the caller's deadline."""
+        self._count("calls")
+        deadline = _deadline.get()
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise CircuitOpenError(self.name, f"circuit open after {self.breaker.failures} consecutive failures")
+            waited = self.bucket.acquire(deadline)
+            if waited is None:
+                self._count("failures")
+                raise DeadlineExceeded(self.name, f"deadline passed waiting for a request slot (attempt {attempt + 1})")
+            if waited:
+                self._count("throttled_seconds", waited)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; the request itself was bad.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if is_rate_limit(e):
+                    self._count("rate_limited")
+                    self.bucket.pause(RATE_LIMIT_PAUSE)
+                if attempt == self.max_retries:
+                    self._count("failures")
+                    raise UpstreamError(self.name, f"{type(e).__name__}: {e} (after {attempt + 1} attempts)") from e
+                delay = backoff_delay(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    raise DeadlineExceeded(self.name, f"{type(e).__name__}: {e} (deadline passed after {attempt + 1} attempts)") from e
+                self._count("retries")
+                tracing.annotate(**{"upstream.retries": attempt + 1, "upstream.last_error": type(e).__name__})
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            return {**self.counts, "throttled_seconds": round(self.throttled_seconds, 3), "circuit": self.breaker.state}
+
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_upstream(name: str) -> Upstream:
+    with _upstreams_lock:
+        if name not in _upstreams:
+            rate, burst, max_retries = UPSTREAM_LIMITS[name]
+            _upstreams[name] = Upstream(name, rate, burst, max_retries)
+        return _upstreams[name]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _upstreams_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="fetch")
+        return _executor
+
+
+def _within(call: Callable[[], Any], deadline: float) -> Callable[[], Any]:
+    def run():
+        if time.monotonic() >= deadline:
+            raise DeadlineExceeded("gather", "deadline passed while queued")
+        # A nested gather keeps the earlier of the two deadlines.
+        outer = _deadline.get()
+        token = _deadline.set(deadline if outer is None else min(outer, deadline))
+        try:
+            return call()
+        finally:
+            _deadline.reset(token)
+    return run
+
+
+def gather(calls: Dict[Any, Callable[[], Any]], timeout: Optional[float] = None) -> Dict[Any, Any]:
+    """Run the calls concurrently and return the results that finished in time; failures are dropped.
+
+    Upstream calls still running at the timeout give up at their next
+    retry or wait, so they do not hold pool threads that later ``gather`` calls need.
+    """
+    if not calls:
+        return {}
+    timeout = REQUEST_TIMEOUT if timeout is None else timeout
+    # Calls beyond the concurrency cap queue behind the others, so give them proportionally longer.
+    rounds = math.ceil(len(calls) / MAX_CONCURRENCY)
+    deadline = time.monotonic() + timeout * rounds
+    futures = {_get_executor().submit(tracing.bind(_within(call, deadline))): key for key, call in calls.items()}
+    done, not_done = wait(futures, timeout=timeout * rounds)
+
+    results = {}
+    for future in done:
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            print(f"Error fetching {key}: {e}")
+    for future in not_done:
+        future.cancel()
+        print(f"Timed out fetching {futures[future]}")
+    return results
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {upstream.name: upstream.stats() for upstream in upstreams}
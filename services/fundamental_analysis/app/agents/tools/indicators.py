@@ -0,0 +1,310 @@
+"""Incremental technical indicators with O(1) state updates per bar.
+
+Each symbol keeps a ring buffer of its most recent closes plus running sums for
+the simple moving averages, a sliding Welford mean/variance for the Bollinger
+bands and running gain/loss sums for the RSI. New bars update every indicator
+without rescanning the history, and the state is persisted to SQLite so a
+daily refresh only has to process the bars that arrived since the last run.
+
+The ``rolling_*`` functions compute the same indicators for every bar of a
+(dates x symbols) array at once, for backtests and screens.
+"""
+import copy
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from . import benchmarks, market_data
+
+
+SMA_WINDOWS = (200, 500, 1000)
+BOLLINGER_WINDOW = 200
+BOLLINGER_WIDTH = 2
+RSI_PERIOD = 14
+# Running sums drift after many add/subtract steps; rebuild them from the ring buffer this often.
+RESYNC_EVERY = 2520
+# A restated close (e.g. after a split adjustment) invalidates the running state.
+RESTATEMENT_TOLERANCE = 1e-6
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(market_data.DEFAULT_CACHE_PATH), "indicators.sqlite")
+
+
+class IndicatorState:
+    """Rolling indicator state for one symbol."""
+
+    def __init__(self, sma_windows=SMA_WINDOWS, bollinger_window=BOLLINGER_WINDOW, rsi_period=RSI_PERIOD):
+        self.sma_windows = tuple(sma_windows)
+        self.bollinger_window = bollinger_window
+        self.rsi_period = rsi_period
+        self.capacity = max(max(self.sma_windows), bollinger_window, rsi_period + 1)
+
+        self.closes = np.zeros(self.capacity)
+        self.head = 0
+        self.count = 0
+        self.last_date: Optional[pd.Timestamp] = None
+        self.updates_since_resync = 0
+
+        self.sma_sums = {window: 0.0 for window in self.sma_windows}
+        self.bollinger_mean = 0.0
+        self.bollinger_m2 = 0.0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+
+    def _ago(self, bars: int) -> float:
+        """Close ``bars`` bars before the next slot to be written."""
+        return self.closes[(self.head - bars) % self.capacity]
+
+    def push(self, date: pd.Timestamp, close: float) -> None:
+        close = float(close)
+
+        for window in self.sma_windows:
+            self.sma_sums[window] += close
+            if self.count >= window:
+                self.sma_sums[window] -= self._ago(window)
+
+        # Sliding-window Welford: add the new close, drop the one leaving the window.
+        window = self.bollinger_window
+        if self.count < window:
+            n = self.count + 1
+            delta = close - self.bollinger_mean
+            self.bollinger_mean += delta / n
+            self.bollinger_m2 += delta * (close - self.bollinger_mean)
+        else:
+            leaving = self._ago(window)
+            old_mean = self.bollinger_mean
+            self.bollinger_mean += (close - leaving) / window
+            self.bollinger_m2 += (close - leaving) * (close - self.bollinger_mean + leaving - old_mean)
+
+        if self.count >= 1:
+            self._add_change(close - self._ago(1), 1.0)
+            if self.count > self.rsi_period:
+                self._add_change(self._ago(self.rsi_period) - self._ago(self.rsi_period + 1), -1.0)
+
+        self.closes[self.head] = close
+        self.head = (self.head + 1) % self.capacity
+        self.count += 1
+        self.last_date = date
+
+        self.updates_since_resync += 1
+        if self.updates_since_resync >= RESYNC_EVERY:
+            self.resync()
+
+    def _add_change(self, change: float, sign: float) -> None:
+        if change > 0:
+            self.gain_sum += sign * change
+        else:
+            self.loss_sum -= sign * change
+
+    def window(self, bars: int) -> np.ndarray:
+        """The last ``bars`` closes in chronological order."""
+        bars = min(bars, self.count, self.capacity)
+        index = (self.head - bars + np.arange(bars)) % self.capacity
+        return self.closes[index]
+
+    def resync(self) -> None:
+        """Recompute the running sums exactly from the ring buffer."""
+        for window in self.sma_windows:
+            self.sma_sums[window] = float(self.window(window).sum())
+        bollinger = self.window(self.bollinger_window)
+        self.bollinger_mean = float(bollinger.mean()) if len(bollinger) else 0.0
+        self.bollinger_m2 = float(((bollinger - self.bollinger_mean) ** 2).sum())
+        changes = np.diff(self.window(self.rsi_period + 1))
+        self.gain_sum = float(changes[changes > 0].sum())
+        self.loss_sum = float(-changes[changes < 0].sum())
+        self.updates_since_resync = 0
+
+    @property
+    def last_close(self) -> float:
+        return self._ago(1) if self.count else float("nan")
+
+    def sma(self, window: int) -> float:
+        return self.sma_sums[window] / window if self.count >= window else float("nan")
+
+    def rsi(self) -> float:
+        if self.count <= self.rsi_period:
+            return float("nan")
+        if self.loss_sum <= 0:
+            return 100.0
+        rs = self.gain_sum / self.loss_sum
+        return 100 - (100 / (1 + rs))
+
+    def bollinger_bands(self) -> Dict[str, float]:
+        window = self.bollinger_window
+        if self.count < window:
+            return {"upper_band": float("nan"), "lower_band": float("nan")}
+        std = float(np.sqrt(max(self.bollinger_m2, 0.0) / (window - 1)))
+        return {
+            "upper_band": self.bollinger_mean + std * BOLLINGER_WIDTH,
+            "lower_band": self.bollinger_mean - std * BOLLINGER_WIDTH,
+        }
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing ``window``-row sums down each column; NaN until the column has ``window`` valid rows in a row."""
+    valid = ~np.isnan(values)
+    zero = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zero, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    total = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        full = counts[window:] - counts[:-window] == window
+        total[window - 1:] = np.where(full, sums[window:] - sums[:-window], np.nan)
+    return total
+
+
+def rolling_sma(closes: np.ndarray, window: int) -> np.ndarray:
+    """``IndicatorState.sma`` for every bar of a (dates x symbols) close array."""
+    return rolling_sum(closes, window) / window
+
+
+def rolling_rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """``IndicatorState.rsi`` (simple-average gains and losses) for every bar of a (dates x symbols) close array."""
+    changes = np.full(closes.shape, np.nan)
+    changes[1:] = np.diff(closes, axis=0)
+    gains = rolling_sum(np.where(changes > 0, changes, np.where(np.isnan(changes), np.nan, 0.0)), period)
+    losses = rolling_sum(np.where(changes < 0, -changes, np.where(np.isnan(changes), np.nan, 0.0)), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(losses > 0, 100 - 100 / (1 + gains / losses), 100.0)
+    return np.where(np.isnan(gains), np.nan, rsi)
+
+
+def rolling_bollinger(closes: np.ndarray, window: int = BOLLINGER_WINDOW, width: float = BOLLINGER_WIDTH) -> Dict[str, np.ndarray]:
+    """``IndicatorState.bollinger_bands`` (plus the middle band) for every bar of a (dates x symbols) close array."""
+    # Sums of squares are taken around each column's first close, which keeps the variance from cancelling out.
+    first = np.argmax(~np.isnan(closes), axis=0)
+    reference = closes[first, np.arange(closes.shape[1])] if closes.ndim == 2 else closes[first]
+    shifted = closes - reference
+    shifted_mean = rolling_sum(shifted, window) / window
+    variance = (rolling_sum(shifted ** 2, window) - window * shifted_mean ** 2) / (window - 1)
+    std = np.sqrt(np.clip(variance, 0.0, None))
+    mean = shifted_mean + reference
+    return {"middle_band": mean, "upper_band": mean + std * width, "lower_band": mean - std * width}
+
+
+class IndicatorEngine:
+    """Per-symbol indicator states, persisted between runs."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_STATE_PATH):
+        self._states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self._db = self._open(path) if path else None
+
+    def _open(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS indicator_state (symbol TEXT PRIMARY KEY, payload BLOB)")
+            db.commit()
+            return db
+        except Exception as e:
+            print(f"Error opening indicator state at {path}, keeping state in memory: {e}")
+            return None
+
+    def get_state(self, symbol: str) -> Optional[IndicatorState]:
+        symbol = symbol.upper()
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None and self._db is not None:
+                row = self._db.execute("SELECT payload FROM indicator_state WHERE symbol = ?", (symbol,)).fetchone()
+                if row is not None:
+                    try:
+                        state = pickle.loads(row[0])
+                        self._states[symbol] = state
+                    except Exception as e:
+                        print(f"Error reading indicator state for {symbol}: {e}")
+            return state
+
+    @staticmethod
+    def connects(state: Optional[IndicatorState], closes: pd.Series) -> bool:
+        """Whether ``closes`` can be applied on top of ``state`` without replaying the history."""
+        if state is None or state.last_date is None:
+            return False
+        if state.last_date in closes.index:
+            # A changed close on the overlapping bar means the history was restated (e.g. split-adjusted).
+            overlap = closes.loc[state.last_date]
+            return abs(overlap - state.last_close) <= RESTATEMENT_TOLERANCE * max(abs(overlap), 1.0)
+        # Either the closes start after the state (a gap-free continuation) or they end before it (nothing new).
+        return not len(closes) or closes.index[0] > state.last_date or closes.index[-1] < state.last_date
+
+    def update(self, symbol: str, closes: pd.Series) -> IndicatorState:
+        """Feed daily closes (indexed by date); only bars after the last seen date are applied.
+
+        If the closes do not connect to the stored state, it is rebuilt from them.
+        Updates to one symbol are serialised, and bars are pushed into a copy that
+        replaces the stored state, so readers never see a half-applied update.
+        """
+        symbol = symbol.upper()
+        closes = closes.dropna()
+        with self._symbol_lock(symbol):
+            state = self.get_state(symbol)
+            if not self.connects(state, closes):
+                state = None
+
+            if state is None:
+                state = IndicatorState()
+                new_bars = closes.iloc[-state.capacity:]
+            else:
+                new_bars = closes.loc[closes.index > state.last_date]
+                if not len(new_bars):
+                    return state
+                state = copy.deepcopy(state)
+
+            for date, close in new_bars.items():
+                state.push(date, close)
+
+            with self._lock:
+                self._states[symbol] = state
+                if self._db is not None and len(new_bars):
+                    try:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO indicator_state VALUES (?, ?)",
+                            (symbol, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)),
+                        )
+                        self._db.commit()
+                    except Exception as e:
+                        print(f"Error saving indicator state for {symbol}: {e}")
+            return state
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def refresh(self, symbol: str) -> IndicatorState:
+        """Fetch only the bars since the last update (the full history on first use) and apply them."""
+        state = self.get_state(symbol)
+        if state is not None and state.last_date is not None:
+            frame = market_data.get_history_since(symbol, state.last_date)
+            if frame is None or frame.empty:
+                return state
+            closes = benchmarks.daily_close(frame)
+            if self.connects(state, closes):
+                return self.update(symbol, closes)
+        return self.update(symbol, benchmarks.daily_close(market_data.get_history(symbol, period="10y")))
+
+    def refresh_many(self, symbols: Iterable[str]) -> List[IndicatorState]:
+        states = []
+        for symbol in symbols:
+            try:
+                states.append(self.refresh(symbol))
+            except Exception as e:
+                print(f"Error refreshing indicators for {symbol}: {e}")
+        return states
+
+
+_engine: Optional[IndicatorEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> IndicatorEngine:
+    """Process-wide engine; the state file can be overridden with FINNIE_INDICATOR_PATH."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine(path=os.environ.get("FINNIE_INDICATOR_PATH", DEFAULT_STATE_PATH) or None)
+        return _engine
@@ -0,0 +1,359 @@
+"""Shared, cached access to yfinance data for the analysis tools.
+
+Every tool goes through this module instead of building its own ``yf.Ticker``.
+Results are kept in an in-process LRU backed by a SQLite file on disk, keyed by
+(symbol, dataset, period, interval) and expired with a per-dataset TTL. Cache
+misses go to Yahoo through the shared "yahoo" upstream (see ``fetch_client``),
+which rate-limits, retries and circuit-breaks them.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from . import fetch_client, tracing
+
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# How long each dataset stays fresh, in seconds.
+DATASET_TTLS: Dict[str, int] = {
+    "history": 15 * MINUTE,
+    "news": 30 * MINUTE,
+    "info": 6 * HOUR,
+    "industry_top_companies": 12 * HOUR,
+    "industry_research_reports": 12 * HOUR,
+    "sector_top_companies": 12 * HOUR,
+    "sector_research_reports": 12 * HOUR,
+    "sector_context": 12 * HOUR,
+    "industry_context": 12 * HOUR,
+    "financials": 7 * DAY,
+    "balance_sheet": 7 * DAY,
+    "cash_flow": 7 * DAY,
+}
+DEFAULT_TTL = 15 * MINUTE
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "finnie", "market_data.sqlite")
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class MarketDataCache:
+    """Two-level (memory LRU + SQLite) cache with per-dataset TTLs."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_entries: int = 512, ttls: Optional[Dict[str, int]] = None):
+        self.max_entries = max_entries
+        self.ttls = dict(DATASET_TTLS, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[CacheKey, threading.Lock] = {}
+        self._db = self._open(path) if path else None
+
+    def _open(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS market_data ("
+                "symbol TEXT, dataset TEXT, period TEXT, interval TEXT, "
+                "fetched_at REAL, payload BLOB, "
+                "PRIMARY KEY (symbol, dataset, period, interval))"
+            )
+            db.commit()
+            return db
+        except Exception as e:
+            print(f"Error opening market data cache at {path}, using memory only: {e}")
+            return None
+
+    def ttl(self, dataset: str) -> int:
+        return self.ttls.get(dataset, DEFAULT_TTL)
+
+    def get(self, symbol: str, dataset: str, fetch: Callable[[], Any], period: str = "", interval: str = "") -> Any:
+        """Return the cached value for the key, calling ``fetch`` only when it is missing or stale."""
+        key = (symbol.upper(), dataset, period or "", interval or "")
+        with tracing.span(f"fetch {dataset}", kind="client", **{"data.symbol": key[0], "data.dataset": dataset}) as span:
+            value = self._lookup(key)
+            if value is not None:
+                span.set(**{"cache.hit": True})
+                return value
+
+            # Only one thread fetches a given key; the others wait and reuse its result.
+            with self._key_lock(key):
+                value = self._lookup(key)
+                if value is not None:
+                    span.set(**{"cache.hit": True})
+                    return value
+                with self._lock:
+                    self.misses += 1
+                span.set(**{"cache.hit": False})
+                value = fetch()
+                if tracing.ENABLED:
+                    span.set(**{"data.bytes": tracing.payload_bytes(value)})
+                self.put(key, value)
+                return value
+
+    def peek(self, symbol: str, dataset: str, period: str = "", interval: str = "") -> Any:
+        """Return the fresh cached value for the key, or None without fetching."""
+        return self._lookup((symbol.upper(), dataset, period or "", interval or ""))
+
+    def put(self, key: CacheKey, value: Any, fetched_at: Optional[float] = None) -> None:
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            self._remember(key, fetched_at, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO market_data VALUES (?, ?, ?, ?, ?, ?)",
+                        (*key, fetched_at, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    print(f"Error writing market data cache for {key}: {e}")
+
+    def symbols(self, dataset: str) -> List[str]:
+        """Every symbol with an entry (fresh or not) for the dataset."""
+        with self._lock:
+            found = {key[0] for key in self._memory if key[1] == dataset}
+            if self._db is not None:
+                found.update(row[0] for row in self._db.execute("SELECT DISTINCT symbol FROM market_data WHERE dataset = ?", (dataset,)))
+        return sorted(found)
+
+    def resident(self, dataset: str, limit: Optional[int] = None) -> List[str]:
+        """Symbols with a fresh entry for the dataset in this process's memory, most recently used first."""
+        now = time.time()
+        ttl = self.ttl(dataset)
+        with self._lock:
+            found = dict.fromkeys(key[0] for key, (fetched_at, _) in reversed(self._memory.items()) if key[1] == dataset and now - fetched_at < ttl)
+        return list(found)[:limit]
+
+    def invalidate(self, symbol: Optional[str] = None, dataset: Optional[str] = None) -> None:
+        """Drop entries matching the symbol and/or dataset (everything when both are None)."""
+        symbol = symbol.upper() if symbol else None
+        with self._lock:
+            for key in list(self._memory):
+                if (symbol is None or key[0] == symbol) and (dataset is None or key[1] == dataset):
+                    del self._memory[key]
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM market_data WHERE (? IS NULL OR symbol = ?) AND (? IS NULL OR dataset = ?)",
+                    (symbol, symbol, dataset, dataset),
+                )
+                self._db.commit()
+
+    def _lookup(self, key: CacheKey) -> Any:
+        now = time.time()
+        ttl = self.ttl(key[1])
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] < ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT fetched_at, payload FROM market_data "
+                "WHERE symbol = ? AND dataset = ? AND period = ? AND interval = ?",
+                key,
+            ).fetchone()
+            if row is None or now - row[0] >= ttl:
+                return None
+            try:
+                value = pickle.loads(row[1])
+            except Exception as e:
+                print(f"Error reading market data cache for {key}: {e}")
+                return None
+            self._remember(key, row[0], value)
+            self.hits += 1
+            return value
+
+    def _remember(self, key: CacheKey, fetched_at: float, value: Any) -> None:
+        self._memory[key] = (fetched_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _key_lock(self, key: CacheKey) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+
+_cache: Optional[MarketDataCache] = None
+_cache_lock = threading.Lock()
+_tickers: Dict[str, Any] = {}
+# yfinance (requests, curl_cffi, ...) is imported on the first fetch; the offline benchmarks replace it.
+yf = None
+
+
+def get_cache() -> MarketDataCache:
+    """Process-wide cache; the on-disk location can be overridden with FINNIE_CACHE_PATH."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MarketDataCache(path=os.environ.get("FINNIE_CACHE_PATH", DEFAULT_CACHE_PATH) or None)
+        return _cache
+
+
+def set_cache(cache: MarketDataCache) -> None:
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def yfinance():
+    global yf
+    if yf is None:
+        import yfinance as module
+        yf = module
+    return yf
+
+
+def get_ticker(symbol: str) -> Any:
+    """One ``yf.Ticker`` per symbol per process."""
+    symbol = symbol.upper()
+    with _cache_lock:
+        if symbol not in _tickers:
+            _tickers[symbol] = yfinance().Ticker(symbol)
+        return _tickers[symbol]
+
+
+def _yahoo(function: Callable[[], Any]) -> Any:
+    return fetch_client.get_upstream("yahoo").call(function)
+
+
+def _copy(value: Any) -> Any:
+    # Callers add columns to the frames they get back, so never hand out the cached object itself.
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def get_info(symbol: str) -> dict:
+    return _copy(get_cache().get(symbol, "info", lambda: _yahoo(lambda: get_ticker(symbol).info) or {}))
+
+
+def get_info_many(symbols: List[str], timeout: Optional[float] = None) -> Dict[str, dict]:
+    """``get_info`` for many symbols at once; symbols that fail or time out are left out.
+
+    Yahoo serves ``info`` one symbol per request, so uncached symbols are fetched
+    concurrently within the Yahoo rate limit rather than grouped (price history is
+    grouped, see ``get_history_many``).
+    """
+    cache = get_cache()
+    infos: Dict[str, dict] = {}
+    missing = []
+    for symbol in dict.fromkeys(s.upper() for s in symbols):
+        cached = cache.peek(symbol, "info")
+        if cached is not None:
+            infos[symbol] = _copy(cached)
+        else:
+            missing.append(symbol)
+
+    if missing:
+        infos.update(fetch_client.gather({symbol: (lambda symbol=symbol: get_info(symbol)) for symbol in missing}, timeout))
+    return infos
+
+
+def get_history(symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+    return _copy(get_cache().get(
+        symbol, "history", lambda: _yahoo(lambda: get_ticker(symbol).history(period=period, interval=interval)),
+        period=period, interval=interval,
+    ))
+
+
+def get_history_many(symbols: List[str], period: Optional[str] = None, start=None) -> Dict[str, pd.DataFrame]:
+    """Uncached daily bars for many symbols from one multi-ticker download: the last ``period``, or from ``start`` on.
+
+    Symbols the download returns no bars for are left out.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    if not symbols:
+        return {}
+    if start is not None:
+        period = None
+        start = pd.Timestamp(start).strftime("%Y-%m-%d")
+    with tracing.span("fetch history_many", kind="client", **{"data.symbols": len(symbols), "data.dataset": "history", "cache.hit": False}) as span:
+        # Adjusted like ``Ticker.history``, so the bars match the per-symbol fetches.
+        batch = _yahoo(lambda: yfinance().download(
+            symbols, period=period, start=start, interval="1d", group_by="column", auto_adjust=True, actions=False, progress=False,
+        ))
+        if tracing.ENABLED:
+            span.set(**{"data.bytes": tracing.payload_bytes(batch)})
+
+    frames: Dict[str, pd.DataFrame] = {}
+    if batch is None or batch.empty:
+        return frames
+    for symbol in symbols:
+        if isinstance(batch.columns, pd.MultiIndex):
+            if symbol not in batch.columns.get_level_values(1):
+                continue
+            frame = batch.xs(symbol, axis=1, level=1)
+        elif len(symbols) == 1:
+            frame = batch
+        else:
+            continue
+        frame = frame.dropna(how="all")
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
+
+def get_history_since(symbol: str, start) -> pd.DataFrame:
+    """Uncached daily bars from ``start`` on, for the incremental refreshes of the local stores."""
+    with tracing.span("fetch history_since", kind="client", **{"data.symbol": symbol.upper(), "data.dataset": "history", "cache.hit": False}) as span:
+        frame = _yahoo(lambda: get_ticker(symbol).history(start=pd.Timestamp(start).strftime("%Y-%m-%d"), interval="1d"))
+        if tracing.ENABLED:
+            span.set(**{"data.bytes": tracing.payload_bytes(frame)})
+        return frame
+
+
+def get_financials(symbol: str) -> pd.DataFrame:
+    return _copy(get_cache().get(symbol, "financials", lambda: _yahoo(lambda: get_ticker(symbol).financials)))
+
+
+def get_balance_sheet(symbol: str) -> pd.DataFrame:
+    return _copy(get_cache().get(symbol, "balance_sheet", lambda: _yahoo(lambda: get_ticker(symbol).balance_sheet)))
+
+
+def get_cash_flow(symbol: str) -> pd.DataFrame:
+    return _copy(get_cache().get(symbol, "cash_flow", lambda: _yahoo(lambda: get_ticker(symbol).cash_flow)))
+
+
+def get_news(symbol: str) -> list:
+    return _copy(get_cache().get(symbol, "news", lambda: _yahoo(lambda: get_ticker(symbol).get_news()) or []))
+
+
+def get_latest_news(symbol: str, count: int = 20) -> list:
+    """Uncached news for the ingestion stage in ``news_index``, which keeps its own high-water mark per symbol."""
+    with tracing.span("fetch news_latest", kind="client", **{"data.symbol": symbol.upper(), "data.dataset": "news", "cache.hit": False}):
+        return _yahoo(lambda: get_ticker(symbol).get_news(count=count)) or []
+
+
+def get_industry_top_companies(industry_key: str) -> pd.DataFrame:
+    return _copy(get_cache().get(industry_key, "industry_top_companies", lambda: _yahoo(lambda: yfinance().Industry(industry_key).top_companies)))
+
+
+def get_industry_research_reports(industry_key: str) -> list:
+    return _copy(get_cache().get(industry_key, "industry_research_reports", lambda: _yahoo(lambda: yfinance().Industry(industry_key).research_reports) or []))
+
+
+def get_sector_top_companies(sector_key: str) -> pd.DataFrame:
+    return _copy(get_cache().get(sector_key, "sector_top_companies", lambda: _yahoo(lambda: yfinance().Sector(sector_key).top_companies)))
+
+
+def get_sector_research_reports(sector_key: str) -> list:
+    return _copy(get_cache().get(sector_key, "sector_research_reports", lambda: _yahoo(lambda: yfinance().Sector(sector_key).research_reports) or []))
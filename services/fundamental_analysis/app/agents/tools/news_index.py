@@ -0,0 +1,343 @@
+"""Incremental, deduplicated news index feeding the sentiment tool.
+
+An ingestion stage polls each watchlist symbol's news and records the newest
+publish time seen per symbol. Feeds list stories late and out of order, so
+a poll does not filter on that mark; articles are deduplicated by id and
+SimHash instead, and every article is processed exactly once:
+
+- an article already linked to the ticker is skipped, and one already in
+  the index (the same story listed under another ticker) is only linked to
+  the new ticker;
+- an article whose 64-bit SimHash is within ``MAX_DISTANCE`` bits of an
+  indexed one (a syndicated copy with a different id) is recorded as a
+  duplicate of it and linked to the same keys, without being scored again;
+- anything else is scored once with the shared sentiment engine.
+
+Articles are keyed by ticker and by the ticker's sector and industry, so
+the sentiment tool reads time-windowed aggregates locally instead of
+fetching and rescoring news on every call. Articles without a publish time
+are skipped, since they cannot be placed in any window.
+
+Usage:
+    python -m tools.news_index watchlist.txt --interval 300   # from the agents directory
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+from . import categories, market_data, sentiment_engine, tracing
+
+
+TICKER = "ticker"
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(market_data.DEFAULT_CACHE_PATH), "news.sqlite")
+# Articles per symbol requested on each poll.
+POLL_COUNT = 20
+# A symbol read by the sentiment tool is polled again once its last poll is this old.
+POLL_INTERVAL = market_data.DATASET_TTLS["news"]
+# Default aggregation window, in seconds.
+WINDOW = 7 * market_data.DAY
+# SimHash: Hamming distance at or below which two articles are the same story, and the number of
+# 8-bit bands used to find candidates (two hashes this close always agree on at least one band).
+# Summaries are short, so words rather than shingles are hashed; reworded copies land within a few bits.
+MAX_DISTANCE = 7
+BANDS = 8
+# Only articles published this close together are compared; syndicated copies follow within hours.
+DUPLICATE_WINDOW = 3 * market_data.DAY
+CONTEXT_ARTICLES = 5
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the text's words, as an unsigned int."""
+    tokens = sentiment_engine.TOKEN_RE.findall(text.lower()) or [""]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") for token in tokens], dtype=np.uint64)
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = (2 * bits.astype(np.int64) - 1).sum(axis=0)
+    return sum(1 << int(i) for i in np.flatnonzero(votes > 0))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(value: int) -> List[int]:
+    width = 64 // BANDS
+    return [(value >> (width * i)) & ((1 << width) - 1) for i in range(BANDS)]
+
+
+class Article(BaseModel):
+    id: str
+    title: str
+    summary: str
+    url: Optional[str] = None
+    published_at: float
+
+
+def parse_article(item: Dict[str, Any]) -> Optional[Article]:
+    """An article from a yfinance news item (the current ``content`` shape or the older flat one); None without text or a publish time."""
+    content = item.get("content", item)
+    title = content.get("title") or ""
+    summary = content.get("summary") or content.get("description") or ""
+    if not title and not summary:
+        return None
+    published = content.get("pubDate") or content.get("displayTime")
+    try:
+        published_at = datetime.fromisoformat(published.replace("Z", "+00:00")).timestamp() if published else float(content["providerPublishTime"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    url = (content.get("canonicalUrl") or {}).get("url") or content.get("link")
+    article_id = item.get("id") or content.get("id") or item.get("uuid") or hashlib.blake2b(f"{title}\n{summary}".encode("utf-8"), digest_size=16).hexdigest()
+    return Article(id=str(article_id), title=title, summary=summary, url=url, published_at=published_at)
+
+
+class NewsAggregate(BaseModel):
+    kind: str
+    key: str
+    since: float
+    articles: int
+    sentiment_score: float
+    # Summaries of the newest articles in the window.
+    context: List[str]
+
+
+class NewsIndex:
+    """SQLite index of scored, deduplicated articles keyed by ticker, sector and industry."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_INDEX_PATH):
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "id TEXT PRIMARY KEY, title TEXT, summary TEXT, url TEXT, published_at REAL, "
+            "simhash INTEGER, duplicate_of TEXT, sentiment REAL, ingested_at REAL);"
+            "CREATE TABLE IF NOT EXISTS simhash_bands (band INTEGER, value INTEGER, article_id TEXT);"
+            "CREATE INDEX IF NOT EXISTS simhash_bands_value ON simhash_bands (band, value);"
+            # Keys point at the canonical article, so a story counts once per key however often it is syndicated.
+            "CREATE TABLE IF NOT EXISTS article_keys (kind TEXT, key TEXT, article_id TEXT, published_at REAL, PRIMARY KEY (kind, key, article_id));"
+            "CREATE INDEX IF NOT EXISTS article_keys_time ON article_keys (kind, key, published_at);"
+            "CREATE TABLE IF NOT EXISTS watermarks (symbol TEXT PRIMARY KEY, published_at REAL, polled_at REAL);"
+        )
+        self._db.commit()
+
+    def watermark(self, symbol: str) -> Tuple[float, float]:
+        """(newest publish time ingested, last poll time) for the symbol; zeros if never polled."""
+        with self._lock:
+            row = self._db.execute("SELECT published_at, polled_at FROM watermarks WHERE symbol = ?", (symbol.upper(),)).fetchone()
+        return (row[0], row[1]) if row else (0.0, 0.0)
+
+    def ingest(self, symbol: str, articles: Iterable[Article], keys: Iterable[Tuple[str, str]] = ()) -> Dict[str, int]:
+        """Add the symbol's articles not already linked to it; returns counts of new, linked and duplicate articles.
+
+        New articles are scored without holding the index, then re-checked and inserted under the lock,
+        so a slow sentiment backend does not block other symbols' ingests or reads.
+        """
+        symbol = symbol.upper()
+        keys = [(TICKER, symbol)] + [key for key in keys if key[1]]
+        articles = sorted({article.id: article for article in articles}.values(), key=lambda article: article.published_at)
+        scores: Dict[str, float] = {}
+        while True:
+            with self._lock:
+                fresh, duplicates, links = self._triage(symbol, articles)
+                unscored = [article for article, _ in fresh if article.id not in scores]
+                if not unscored:
+                    return self._insert(symbol, articles, keys, fresh, duplicates, links, scores)
+            # Another ingest may index some of these meanwhile; the next pass re-checks before inserting.
+            values = sentiment_engine.get_engine().score([article.summary or article.title for article in unscored])
+            scores.update((article.id, float(value)) for article, value in zip(unscored, values))
+
+    def _triage(self, symbol: str, articles: List[Article]) -> Tuple[List[Tuple[Article, int]], List[Tuple[Article, int, str]], List[Tuple[str, float]]]:
+        """Split ``articles`` into new ones (with fingerprints), near-duplicates (with their original) and links to indexed stories."""
+        fresh: List[Tuple[Article, int]] = []
+        duplicates: List[Tuple[Article, int, str]] = []
+        links: List[Tuple[str, float]] = []
+        for article in articles:
+            row = self._db.execute("SELECT COALESCE(duplicate_of, id) FROM articles WHERE id = ?", (article.id,)).fetchone()
+            if row is not None:
+                if not self._db.execute("SELECT 1 FROM article_keys WHERE kind = ? AND key = ? AND article_id = ?", (TICKER, symbol, row[0])).fetchone():
+                    links.append((row[0], article.published_at))
+                continue
+            fingerprint = simhash(f"{article.title} {article.summary}")
+            original = self._near_duplicate(fingerprint, article.published_at) or next(
+                (other.id for other, f in fresh if hamming(f, fingerprint) <= MAX_DISTANCE and abs(other.published_at - article.published_at) <= DUPLICATE_WINDOW),
+                None,
+            )
+            if original is not None:
+                duplicates.append((article, fingerprint, original))
+            else:
+                fresh.append((article, fingerprint))
+        return fresh, duplicates, links
+
+    def _insert(
+        self,
+        symbol: str,
+        articles: List[Article],
+        keys: List[Tuple[str, str]],
+        fresh: List[Tuple[Article, int]],
+        duplicates: List[Tuple[Article, int, str]],
+        links: List[Tuple[str, float]],
+        scores: Dict[str, float],
+    ) -> Dict[str, int]:
+        counts = {"new": len(fresh), "linked": len(links), "duplicate": len(duplicates)}
+        now = time.time()
+        for article, fingerprint, original in duplicates:
+            self._db.execute(
+                "INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+                (article.id, article.title, article.summary, article.url, article.published_at, _signed(fingerprint), original, now),
+            )
+            links.append((original, article.published_at))
+        for article, fingerprint in fresh:
+            self._db.execute(
+                "INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (article.id, article.title, article.summary, article.url, article.published_at, _signed(fingerprint), scores[article.id], now),
+            )
+            self._db.executemany("INSERT INTO simhash_bands VALUES (?, ?, ?)", [(i, value, article.id) for i, value in enumerate(bands(fingerprint))])
+            links.append((article.id, article.published_at))
+
+        self._db.executemany(
+            "INSERT OR IGNORE INTO article_keys VALUES (?, ?, ?, ?)",
+            [(kind, key, article_id, published_at) for article_id, published_at in links for kind, key in keys],
+        )
+        row = self._db.execute("SELECT published_at FROM watermarks WHERE symbol = ?", (symbol,)).fetchone()
+        newest = max([article.published_at for article in articles] + [row[0] if row else 0.0])
+        self._db.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)", (symbol, newest, now))
+        self._db.commit()
+        return counts
+
+    def _near_duplicate(self, fingerprint: int, published_at: float) -> Optional[str]:
+        """The closest indexed story published around the same time, if within ``MAX_DISTANCE`` bits."""
+        candidates = set()
+        for i, value in enumerate(bands(fingerprint)):
+            candidates.update(self._db.execute(
+                "SELECT a.id, a.simhash FROM simhash_bands b JOIN articles a ON a.id = b.article_id "
+                "WHERE b.band = ? AND b.value = ? AND a.published_at BETWEEN ? AND ?",
+                (i, value, published_at - DUPLICATE_WINDOW, published_at + DUPLICATE_WINDOW),
+            ).fetchall())
+        matches = [(hamming(_unsigned(other), fingerprint), article_id) for article_id, other in candidates]
+        matches = [match for match in matches if match[0] <= MAX_DISTANCE]
+        return min(matches)[1] if matches else None
+
+    def aggregate(self, kind: str, key: str, window: float = WINDOW, now: Optional[float] = None) -> NewsAggregate:
+        """Mean sentiment of the key's distinct stories published in the last ``window`` seconds."""
+        since = (now or time.time()) - window
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT a.summary, a.title, a.sentiment FROM article_keys k JOIN articles a ON a.id = k.article_id "
+                "WHERE k.kind = ? AND k.key = ? AND k.published_at >= ? ORDER BY k.published_at DESC",
+                (kind, key, since),
+            ).fetchall()
+        scores = [row[2] for row in rows]
+        return NewsAggregate(
+            kind=kind,
+            key=key,
+            since=since,
+            articles=len(rows),
+            sentiment_score=float(np.mean(scores)) if scores else 0.0,
+            context=[row[0] or row[1] for row in rows[:CONTEXT_ARTICLES]],
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "articles": self._db.execute("SELECT COUNT(*) FROM articles WHERE duplicate_of IS NULL").fetchone()[0],
+                "duplicates": self._db.execute("SELECT COUNT(*) FROM articles WHERE duplicate_of IS NOT NULL").fetchone()[0],
+                "symbols": self._db.execute("SELECT COUNT(*) FROM watermarks").fetchone()[0],
+            }
+
+
+def category_keys(symbol: str) -> List[Tuple[str, str]]:
+    """The symbol's sector and industry keys, from its cached info."""
+    info = market_data.get_info(symbol)
+    return [
+        (kind, categories.format_category(info[field]))
+        for kind, field in ((categories.SECTOR, "sector"), (categories.INDUSTRY, "industry"))
+        if info.get(field)
+    ]
+
+
+def poll(symbol: str, index: Optional["NewsIndex"] = None) -> Dict[str, int]:
+    """Fetch the symbol's latest news and ingest whatever is not indexed for it yet."""
+    index = index or get_index()
+    with tracing.span("news poll", **{"data.symbol": symbol.upper()}) as span:
+        articles = [article for article in map(parse_article, market_data.get_latest_news(symbol, POLL_COUNT)) if article is not None]
+        try:
+            keys = category_keys(symbol)
+        except Exception as e:
+            print(f"Error looking up sector and industry for {symbol}: {e}")
+            keys = []
+        counts = index.ingest(symbol, articles, keys)
+        span.set(**{f"news.{name}": count for name, count in counts.items()})
+        return counts
+
+
+def poll_many(symbols: Iterable[str], index: Optional["NewsIndex"] = None) -> Dict[str, Dict[str, int]]:
+    results = {}
+    for symbol in symbols:
+        try:
+            results[symbol] = poll(symbol, index)
+        except Exception as e:
+            print(f"Error polling news for {symbol}: {e}")
+    return results
+
+
+def ensure_fresh(symbol: str, max_age: float = POLL_INTERVAL) -> None:
+    """Poll the symbol if nothing has done so in the last ``max_age`` seconds (e.g. no ingestion loop runs for it)."""
+    _, polled_at = get_index().watermark(symbol)
+    if time.time() - polled_at >= max_age:
+        poll(symbol)
+
+
+_index: Optional[NewsIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NewsIndex:
+    """Process-wide index; the file can be overridden with FINNIE_NEWS_PATH."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NewsIndex(path=os.environ.get("FINNIE_NEWS_PATH", DEFAULT_INDEX_PATH) or None)
+        return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll news for a watchlist into the local news index.")
+    parser.add_argument("watchlist", help="File with one ticker per line")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between polls of the whole watchlist")
+    parser.add_argument("--once", action="store_true", help="Poll every symbol once and exit")
+    args = parser.parse_args()
+
+    from batch import read_watchlist
+
+    symbols = read_watchlist(args.watchlist)
+    while True:
+        start = time.time()
+        totals = {"new": 0, "linked": 0, "duplicate": 0}
+        for counts in poll_many(symbols).values():
+            for name, count in counts.items():
+                totals[name] += count
+        print(f"Polled {len(symbols)} symbols in {time.time() - start:.1f}s: {totals}, index {get_index().stats()}")
+        if args.once:
+            return
+        time.sleep(max(args.interval - (time.time() - start), 0))
+
+
+if __name__ == "__main__":
+    main()
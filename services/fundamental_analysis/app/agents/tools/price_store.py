@@ -0,0 +1,251 @@
+"""Append-only, memory-mapped daily price history, one file per symbol.
+
+Each file is a flat array of fixed-width records (date as int64 nanoseconds,
+OHLC as float64, volume as int64). Refreshes append only the bars after the
+last stored date, and readers get zero-copy NumPy views over a memory map,
+so every worker process on a host shares one copy through the page cache.
+"""
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from . import market_data
+
+try:
+    import fcntl
+except ImportError:
+    # Non-POSIX hosts get no cross-process write lock.
+    fcntl = None
+
+
+RECORD = np.dtype([
+    ("date", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<i8"),
+])
+COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+INITIAL_PERIOD = "10y"
+# A restated bar (e.g. split adjustment) means the stored file is rewritten instead of appended to.
+RESTATEMENT_TOLERANCE = 1e-6
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(market_data.DEFAULT_CACHE_PATH), "prices")
+# Symbols accepted by the analysis API (app/schemas/analysis.py); anything else never becomes a file name.
+SYMBOL_RE = re.compile(r"[A-Za-z0-9.^=-]{1,12}")
+
+
+def to_records(frame: pd.DataFrame) -> np.ndarray:
+    """Convert a yfinance OHLCV frame to store records, one per calendar date."""
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame = frame.droplevel(1, axis=1)
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    index = index.normalize()
+
+    records = np.zeros(len(frame), dtype=RECORD)
+    records["date"] = index.as_unit("ns").asi8
+    for column, field in COLUMNS.items():
+        if column in frame:
+            values = frame[column].to_numpy(dtype=float)
+            records[field] = np.nan_to_num(values, nan=0).astype(np.int64) if field == "volume" else values
+    records = records[~np.isnan(records["close"])]
+    # Keep the last bar for a date if the source repeats it.
+    _, last = np.unique(records["date"][::-1], return_index=True)
+    return records[len(records) - 1 - last]
+
+
+class PriceStore:
+    """Per-symbol record files under ``root``, read through cached memory maps."""
+
+    def __init__(self, root: Optional[str] = DEFAULT_STORE_DIR, refresh_interval: Optional[int] = None):
+        self.root = root
+        self.refresh_interval = refresh_interval if refresh_interval is not None else market_data.DATASET_TTLS["history"]
+        self._maps: Dict[str, Tuple[Tuple[int, int], np.ndarray]] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, symbol: str) -> str:
+        # Symbols come from tool input and watchlist files; reject separators and other path syntax.
+        if not SYMBOL_RE.fullmatch(symbol) or set(symbol) == {"."}:
+            raise ValueError(f"Invalid ticker symbol: {symbol!r}")
+        return os.path.join(self.root, f"{symbol.upper()}.prices")
+
+    def records(self, symbol: str) -> np.ndarray:
+        """Read-only memory-mapped view of every stored bar (empty if none)."""
+        path = self.path(symbol)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return np.zeros(0, dtype=RECORD)
+        # Only whole records; a concurrent writer may have a partial one in flight.
+        count = stat.st_size // RECORD.itemsize
+        signature = (stat.st_ino, count)
+        with self._lock:
+            cached = self._maps.get(symbol.upper())
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            view = np.memmap(path, dtype=RECORD, mode="r", shape=(count,)) if count else np.zeros(0, dtype=RECORD)
+            self._maps[symbol.upper()] = (signature, view)
+            return view
+
+    def window(self, symbol: str, start=None, end=None) -> np.ndarray:
+        """Zero-copy slice of the stored bars with ``start <= date <= end``."""
+        records = self.records(symbol)
+        lo = 0 if start is None else np.searchsorted(records["date"], _to_ns(start), side="left")
+        hi = len(records) if end is None else np.searchsorted(records["date"], _to_ns(end), side="right")
+        return records[lo:hi]
+
+    def frame(self, symbol: str, start=None, end=None, refresh: bool = True) -> pd.DataFrame:
+        """OHLCV frame in the shape yfinance returns, refreshing the file first if it is due."""
+        if refresh:
+            self.update(symbol)
+        records = self.window(symbol, start, end)
+        return pd.DataFrame(
+            {column: records[field] for column, field in COLUMNS.items()},
+            index=pd.DatetimeIndex(records["date"].astype("datetime64[ns]"), name="Date"),
+        )
+
+    def update(self, symbol: str, force: bool = False) -> int:
+        """Append the bars after the last stored date; returns how many were added."""
+        symbol = symbol.upper()
+        now = time.time()
+        if not force and now - self._checked_at.get(symbol, 0.0) < self.refresh_interval:
+            return 0
+
+        stored = self.records(symbol)
+        if len(stored) == 0:
+            fetched = market_data.get_history(symbol, period=INITIAL_PERIOD)
+        else:
+            fetched = market_data.get_history_since(symbol, pd.Timestamp(stored["date"][-1]))
+        added = self._store(symbol, stored, to_records(fetched))
+        self._checked_at[symbol] = now
+        return added
+
+    def update_many(self, symbols: Iterable[str], force: bool = False) -> Dict[str, int]:
+        """``update`` for many symbols, fetching their new bars in multi-ticker downloads.
+
+        New files get one download of ``INITIAL_PERIOD``; stored files one per distinct last date
+        (usually a single one). A symbol missing from its download is fetched on its own.
+        """
+        now = time.time()
+        added: Dict[str, int] = {}
+        stored: Dict[str, np.ndarray] = {}
+        for symbol in dict.fromkeys(symbol.upper() for symbol in symbols):
+            if not force and now - self._checked_at.get(symbol, 0.0) < self.refresh_interval:
+                added[symbol] = 0
+                continue
+            try:
+                stored[symbol] = self.records(symbol)
+            except Exception as e:
+                print(f"Error updating price history for {symbol}: {e}")
+
+        groups: Dict[Optional[int], List[str]] = {}
+        for symbol, records in stored.items():
+            groups.setdefault(int(records["date"][-1]) if len(records) else None, []).append(symbol)
+        fetched: Dict[str, pd.DataFrame] = {}
+        for last, group in groups.items():
+            try:
+                if last is None:
+                    fetched.update(market_data.get_history_many(group, period=INITIAL_PERIOD))
+                else:
+                    fetched.update(market_data.get_history_many(group, start=pd.Timestamp(last)))
+            except Exception as e:
+                print(f"Error downloading price history for {len(group)} symbols: {e}")
+                for symbol in group:
+                    del stored[symbol]
+
+        for symbol, records in stored.items():
+            try:
+                if symbol in fetched:
+                    added[symbol] = self._store(symbol, records, to_records(fetched[symbol]))
+                    self._checked_at[symbol] = now
+                else:
+                    added[symbol] = self.update(symbol, force=True)
+            except Exception as e:
+                print(f"Error updating price history for {symbol}: {e}")
+        return added
+
+    def _store(self, symbol: str, stored: np.ndarray, fetched: np.ndarray) -> int:
+        """Write freshly fetched bars: the whole history for a new file, else the bars after the last stored one."""
+        if len(stored) == 0:
+            return self._rewrite(symbol, fetched)
+        overlap = fetched[fetched["date"] == stored["date"][-1]]
+        if len(overlap) and abs(overlap["close"][0] - stored["close"][-1]) > RESTATEMENT_TOLERANCE * max(abs(stored["close"][-1]), 1.0):
+            market_data.get_cache().invalidate(symbol, "history")
+            return self._rewrite(symbol, to_records(market_data.get_history(symbol, period=INITIAL_PERIOD)))
+        return self._append(symbol, fetched[fetched["date"] > stored["date"][-1]])
+
+    def _append(self, symbol: str, records: np.ndarray) -> int:
+        if not len(records):
+            return 0
+        path = self.path(symbol)
+        with file_lock(path), open(path, "ab") as f:
+            size = os.fstat(f.fileno()).st_size
+            whole = size - size % RECORD.itemsize
+            if whole != size:
+                # Drop a partial record left behind by a writer that died mid-append.
+                f.truncate(whole)
+            # Another process may have appended since we read; only write what is still newer.
+            records = records[records["date"] > _last_date(path, whole)]
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return len(records)
+
+    def _rewrite(self, symbol: str, records: np.ndarray) -> int:
+        # Replace atomically; readers holding the old map keep the old inode until they reopen.
+        path = self.path(symbol)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with file_lock(path):
+            with open(tmp, "wb") as f:
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        return len(records)
+
+
+def _last_date(path: str, size: int) -> int:
+    if size == 0:
+        return np.iinfo(np.int64).min
+    with open(path, "rb") as f:
+        f.seek(size - RECORD.itemsize)
+        return int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)["date"][0])
+
+
+def _to_ns(value) -> int:
+    stamp = pd.Timestamp(value)
+    if stamp.tz is not None:
+        stamp = stamp.tz_localize(None)
+    return stamp.normalize().value
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive cross-process lock for writing one symbol's file."""
+    with open(path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+_store: Optional[PriceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PriceStore:
+    """Process-wide store; the directory can be overridden with FINNIE_PRICE_DIR."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore(root=os.environ.get("FINNIE_PRICE_DIR", DEFAULT_STORE_DIR))
+        return _store
@@ -0,0 +1,40 @@
+"""Process-wide tool instances, imported on first use.
+
+Agents refer to their tools by name. A tool's module, and with it crewai,
+pandas, yfinance and whatever else it needs, is only imported when an agent
+that uses the tool is built, and every agent shares the one instance.
+"""
+import importlib
+import threading
+from typing import Any, Dict, List
+
+
+# Name -> (module, class); relative modules are in this package.
+TOOLS = {
+    "competitor": (".competitor_analysis", "CompetitorTool"),
+    "earnings": (".earnings_report_tool", "EarningsCallTool"),
+    "risk": (".risk_analysis_tool", "RiskTool"),
+    "sentiment": (".sentiment_tools", "SentimentTool"),
+    "technical": (".technical_analysis_tool", "TechnicalAnalysis"),
+    "search": (".search", "SearchTool"),
+}
+
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def tool_class(name: str) -> type:
+    module, class_name = TOOLS[name]
+    return getattr(importlib.import_module(module, __package__), class_name)
+
+
+def get_tool(name: str) -> Any:
+    with _lock:
+        if name not in _instances:
+            _instances[name] = tool_class(name)()
+        return _instances[name]
+
+
+def loaded() -> List[str]:
+    with _lock:
+        return sorted(_instances)
@@ -1,9 +1,9 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type
-import yfinance as yf
+from typing import Dict, List, Type
 import numpy as np
-import pandas as pd
+from . import compaction, risk_engine, tracing
+from .risk_engine import TRADING_DAYS
 
 class RiskCallToolInput(BaseModel):
     """Input schema for EarningsCallTool."""
@@ -14,46 +14,50 @@ class Risk(BaseModel):
     ticker: str
     volatility: float
     beta: float
-    
 
 
-class RiskTool(BaseTool):
-    name: str = "Risk Analysis Tool"
-    description: str = "Fetches detailed metrics for assessing stock risk, such as volatility and beta."
-    args_schema: Type[BaseModel] = RiskCallToolInput
-
-    def _run(self, stock_symbol: str) -> dict:
-        stock_data = self.fetch_stock_data(stock_symbol)
-        market_data = self.fetch_market_data()
-
-        volatility = self.calculate_volatility(stock_data)
-        beta = self.calculate_beta(stock_data, market_data)
+def annualized_volatility(returns: np.ndarray) -> np.ndarray:
+    """Column-wise annualized volatility of a (dates x symbols) matrix of daily returns, ignoring NaNs."""
+    return np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
 
-        result = Risk(ticker=stock_symbol, volatility=volatility, beta=beta)
-        return result
 
-    def fetch_stock_data(self, stock_symbol: str) -> pd.DataFrame:
-        """Fetch historical stock data."""
-        stock_data = yf.download(stock_symbol, period="1y", interval="1d")
-        stock_data['Daily Return'] = stock_data['Close'].pct_change()
-        return stock_data
+def beta_vector(returns: np.ndarray, market_returns: np.ndarray) -> np.ndarray:
+    """Column-wise beta of a (dates x symbols) return matrix against a market return vector on the same dates.
 
-    def fetch_market_data(self) -> pd.DataFrame:
-        """Fetch market data (S&P 500 as the benchmark)."""
-        market_data = yf.download('^GSPC', period="1y", interval="1d")
-        market_data['Daily Return'] = market_data['Close'].pct_change()
-        return market_data
+    Each column only uses the dates where both it and the market have a return.
+    """
+    valid = ~np.isnan(returns) & ~np.isnan(market_returns)[:, None]
+    count = valid.sum(axis=0)
+    stock = np.where(valid, returns, 0.0)
+    market = np.where(valid, market_returns[:, None], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stock_dev = np.where(valid, stock - stock.sum(axis=0) / count, 0.0)
+        market_dev = np.where(valid, market - market.sum(axis=0) / count, 0.0)
+        beta = (stock_dev * market_dev).sum(axis=0) / (market_dev ** 2).sum(axis=0)
+    return np.where(count > 1, beta, np.nan)
 
-    def calculate_volatility(self, stock_data: pd.DataFrame) -> float:
-        """Calculate the annualized volatility of the stock."""
-        volatility = stock_data['Daily Return'].std() * np.sqrt(252)  
-        return volatility
-
-    def calculate_beta(self, stock_data: pd.DataFrame, market_data: pd.DataFrame) -> float:
-        """Calculate the stock's beta against the market (S&P 500)."""
-        covariance = np.cov(stock_data['Daily Return'].dropna(), market_data['Daily Return'].dropna())[0][1]
-        market_variance = market_data['Daily Return'].var()
-        beta = covariance / market_variance
-        return beta
 
+class RiskTool(BaseTool):
+    name: str = "Risk Analysis Tool"
+    description: str = "Fetches detailed metrics for assessing stock risk, such as volatility and beta."
+    args_schema: Type[BaseModel] = RiskCallToolInput
 
+    @tracing.tool_span
+    @compaction.compact_output
+    def _run(self, stock_symbol: str) -> dict:
+        return self.run_batch([stock_symbol])[0]
+
+    def run_batch(self, stock_symbols: List[str]) -> List[Risk]:
+        """Volatility and beta over the last year, from the shared risk engine's covariance sums."""
+        engine = risk_engine.get_engine()
+        engine.track(stock_symbols)
+        volatility = engine.volatility(stock_symbols)
+        beta = engine.beta(stock_symbols)
+        return [
+            Risk(ticker=symbol, volatility=volatility[i], beta=beta[i])
+            for i, symbol in enumerate(stock_symbols)
+        ]
+
+    def run_portfolio(self, weights: Dict[str, float]) -> risk_engine.PortfolioRisk:
+        """Volatility, beta, value at risk and risk contributions of a portfolio (weights as fractions of its value)."""
+        return risk_engine.get_engine().portfolio(weights)
@@ -0,0 +1,366 @@
+"""Portfolio risk from one incrementally updated covariance matrix.
+
+The engine keeps the last ``window`` daily returns of every tracked symbol,
+aligned on the benchmark's trading dates (the benchmark itself is column 0),
+together with running sums of their cross products. A new day's returns are
+a rank-one update of those sums and the day leaving the window a rank-one
+downdate. Adding or refreshing k symbols recomputes only their k rows and
+columns from the window, O(window * n * k), instead of the whole O(window * n^2)
+matrix; the least recently used symbols are evicted past ``max_symbols``.
+
+Store updates and benchmark refreshes (which may hit the network) run
+outside the engine lock, and only the requested symbols are refreshed. A
+tracked symbol that is not requested keeps the returns it had when it was
+last refreshed; the days after that are missing until it is requested again.
+
+Missing returns (a symbol that was not yet listed, a gap in its history) are
+left out pairwise: each covariance uses the days on which both symbols have
+a return, which matches ``risk_analysis_tool.beta_vector``. The matrix used
+for portfolios is shrunk towards its diagonal with a Ledoit-Wolf estimate of
+the shrinkage intensity, which keeps it well conditioned across hundreds of
+holdings.
+"""
+import threading
+import time
+from collections import OrderedDict
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from . import benchmarks, indicators, market_data, price_store
+
+
+TRADING_DAYS = 252
+CORRELATION_WINDOW = 63
+VAR_CONFIDENCE = 0.95
+# Tracked symbols (besides the benchmark) before the least recently used ones are evicted.
+MAX_SYMBOLS = 512
+# A restated benchmark close (e.g. after a revision) invalidates the benchmark's column.
+RESTATEMENT_TOLERANCE = 1e-6
+
+
+class PortfolioRisk(BaseModel):
+    volatility: float
+    beta: float
+    value_at_risk: float
+    confidence: float
+    horizon_days: int
+    benchmark_correlation: float
+    # Share of the portfolio variance coming from each holding; sums to 1.
+    risk_contributions: Dict[str, float]
+    # d(volatility)/d(weight) for each holding.
+    marginal_risk: Dict[str, float]
+
+
+class RiskEngine:
+    """Rolling, aligned daily returns for a set of symbols plus the benchmark, updated a day or a column at a time."""
+
+    def __init__(self, window: int = TRADING_DAYS, benchmark: str = benchmarks.SP500, refresh_interval: Optional[int] = None,
+                 max_symbols: int = MAX_SYMBOLS):
+        self.window = window
+        self.benchmark = benchmark
+        self.refresh_interval = refresh_interval if refresh_interval is not None else market_data.DATASET_TTLS["history"]
+        self.max_symbols = max_symbols
+        self.symbols: List[str] = [benchmark]
+        self._index: Dict[str, int] = {benchmark: 0}
+        self._lock = threading.RLock()
+        # Symbol -> when its column was last refreshed, least recently requested first.
+        self._checked_at: "OrderedDict[str, float]" = OrderedDict()
+        # Ring buffer of returns, oldest row at ``_head`` once full.
+        self._returns = np.full((window, 1), np.nan)
+        self._dates: List[pd.Timestamp] = []
+        self._head = 0
+        self._market_close = np.nan
+        # Over the days in the window, with missing returns as 0 and ``valid`` marking the others:
+        # products[i, j] = sum r_i r_j, sums[i, j] = sum r_i valid_j, counts[i, j] = sum valid_i valid_j,
+        # squares[i, j] = sum (r_i r_j)^2 (for the shrinkage intensity).
+        self._products = np.zeros((1, 1))
+        self._sums = np.zeros((1, 1))
+        self._counts = np.zeros((1, 1))
+        self._squares = np.zeros((1, 1))
+        self._covariance: Optional[np.ndarray] = None
+
+    def track(self, symbols: Iterable[str]) -> None:
+        """Add the symbols to the engine if needed and bring their columns up to date."""
+        wanted = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        now = time.time()
+        with self._lock:
+            for symbol in wanted:
+                if symbol in self._checked_at:
+                    self._checked_at.move_to_end(symbol)
+            due = [s for s in wanted if s != self.benchmark and now - self._checked_at.get(s, 0.0) >= self.refresh_interval]
+            if not due and self._dates:
+                return
+
+        # Network and disk I/O happen outside the lock; only the in-memory update below holds it.
+        price_store.get_store().update_many(due)
+        market = benchmarks.get_benchmark(self.benchmark).close(self._start())
+        closes = self._closes(market, due)
+
+        with self._lock:
+            self._advance(market)
+            self._evict(keep=set(wanted), room=len([s for s in due if s not in self._index]))
+            self._sync(market, closes)
+            for symbol in due:
+                self._checked_at[symbol] = now
+                self._checked_at.move_to_end(symbol)
+
+    def refresh(self, symbols: Optional[Iterable[str]] = None, force: bool = False) -> None:
+        """Bring the given tracked symbols (or all of them) up to date; ``force`` ignores ``refresh_interval``."""
+        with self._lock:
+            symbols = list(self.symbols[1:] if symbols is None else symbols)
+            if force:
+                for symbol in symbols:
+                    self._checked_at.pop(symbol.upper(), None)
+        self.track(symbols)
+
+    def _start(self) -> pd.Timestamp:
+        # Calendar days covering the window plus the close before it, with slack for holidays.
+        return pd.Timestamp.today().normalize() - pd.DateOffset(days=int((self.window + 1) * 365 / TRADING_DAYS) + 30)
+
+    def _closes(self, market: pd.Series, symbols: List[str]) -> pd.DataFrame:
+        """Stored closes of the symbols on the benchmark's trading dates."""
+        store = price_store.get_store()
+        start = market.index[0] if len(market) else None
+        columns = {}
+        for symbol in symbols:
+            try:
+                records = store.window(symbol, start=start)
+                columns[symbol] = pd.Series(records["close"], index=records["date"].astype("datetime64[ns]"))
+            except Exception as e:
+                print(f"Error reading stored closes for {symbol}: {e}")
+                columns[symbol] = pd.Series(dtype=float)
+        return pd.DataFrame(columns, index=market.index, columns=symbols, dtype=float)
+
+    def _advance(self, market: pd.Series) -> None:
+        """Push the benchmark's days after the window's last date; other columns are filled in by ``_sync``."""
+        if self._dates:
+            last = self._dates[-1]
+            if last in market.index and abs(market[last] - self._market_close) > RESTATEMENT_TOLERANCE * max(abs(self._market_close), 1.0):
+                self._set_columns([0], self._window_returns(market.to_frame()))
+                self._market_close = float(market[last])
+            new = market.loc[market.index > last]
+            previous = self._market_close
+        else:
+            new = market.iloc[-self.window:]
+            before = market.iloc[:-self.window]
+            previous = before.iloc[-1] if len(before) else np.nan
+
+        for date, close in new.items():
+            row = np.full(len(self.symbols), np.nan)
+            row[0] = close / previous - 1
+            self._push(date, row)
+            previous = close
+        if len(new):
+            self._market_close = float(new.iloc[-1])
+
+    def _window_returns(self, closes: pd.DataFrame) -> np.ndarray:
+        """(window days x columns) returns of the given closes on the window's dates, oldest first."""
+        if not self._dates:
+            return np.zeros((0, closes.shape[1]))
+        position = closes.index.get_indexer([self._dates[0]])[0]
+        dates = ([closes.index[position - 1]] if position > 0 else []) + self._dates
+        values = closes.reindex(dates).to_numpy(dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = values[1:] / values[:-1] - 1
+        return returns if position > 0 else np.vstack([np.full((1, closes.shape[1]), np.nan), returns])
+
+    def _sync(self, market: pd.Series, closes: pd.DataFrame) -> None:
+        """Recompute the columns of the refreshed symbols, adding the ones not tracked yet."""
+        if not len(closes.columns):
+            return
+        new = [symbol for symbol in closes.columns if symbol not in self._index]
+        if new:
+            k = len(new)
+            self._returns = np.hstack([self._returns, np.full((self.window, k), np.nan)])
+            for name in ("_products", "_sums", "_counts", "_squares"):
+                setattr(self, name, np.pad(getattr(self, name), ((0, k), (0, k))))
+            self.symbols.extend(new)
+            self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._set_columns([self._index[symbol] for symbol in closes.columns], self._window_returns(closes))
+
+    def _set_columns(self, columns: List[int], returns: np.ndarray) -> None:
+        """Replace the window's returns in ``columns`` and recompute their rows and columns of the running sums."""
+        count = len(self._dates)
+        order = (self._head - count + np.arange(count)) % self.window
+        self._returns[np.ix_(order, columns)] = returns
+        rows = self._returns[order]
+        valid = (~np.isnan(rows)).astype(float)
+        filled = np.nan_to_num(rows)
+        own, own_valid = filled[:, columns], valid[:, columns]
+
+        self._products[columns, :] = own.T @ filled
+        self._products[:, columns] = self._products[columns, :].T
+        self._sums[columns, :] = own.T @ valid
+        self._sums[:, columns] = filled.T @ own_valid
+        self._counts[columns, :] = own_valid.T @ valid
+        self._counts[:, columns] = self._counts[columns, :].T
+        self._squares[columns, :] = (own ** 2).T @ (filled ** 2)
+        self._squares[:, columns] = self._squares[columns, :].T
+        self._covariance = None
+
+    def _evict(self, keep: set, room: int) -> None:
+        """Drop the least recently requested symbols so that ``room`` more fit within ``max_symbols``."""
+        excess = len(self.symbols) - 1 + room - self.max_symbols
+        if excess <= 0:
+            return
+        evicted = [symbol for symbol in self._checked_at if symbol not in keep and symbol in self._index][:excess]
+        if not evicted:
+            return
+        columns = [self._index[symbol] for symbol in evicted]
+        self._returns = np.delete(self._returns, columns, axis=1)
+        for name in ("_products", "_sums", "_counts", "_squares"):
+            setattr(self, name, np.delete(np.delete(getattr(self, name), columns, axis=0), columns, axis=1))
+        for symbol in evicted:
+            del self._checked_at[symbol]
+        self.symbols = [symbol for symbol in self.symbols if symbol not in set(evicted)]
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._covariance = None
+
+    def _push(self, date: pd.Timestamp, returns: np.ndarray) -> None:
+        if len(self._dates) == self.window:
+            self._update(self._returns[self._head], -1.0)
+            self._dates.pop(0)
+        self._returns[self._head] = returns
+        self._head = (self._head + 1) % self.window
+        self._dates.append(date)
+        self._update(returns, 1.0)
+
+    def _update(self, returns: np.ndarray, sign: float) -> None:
+        # Only the block of columns with a return that day changes.
+        columns = np.flatnonzero(~np.isnan(returns))
+        block = np.ix_(columns, columns)
+        values = returns[columns]
+        self._products[block] += sign * np.outer(values, values)
+        self._sums[block] += sign * np.outer(values, np.ones(len(columns)))
+        self._counts[block] += sign
+        self._squares[block] += sign * np.outer(values ** 2, values ** 2)
+        self._covariance = None
+
+    def sample_covariance(self) -> np.ndarray:
+        """Pairwise-complete daily covariance of every tracked column (benchmark first)."""
+        with self._lock:
+            return self._sample(slice(None), slice(None))
+
+    def _sample(self, rows, columns) -> np.ndarray:
+        # The (rows x columns) block of the sample covariance, without computing the rest.
+        products, counts = self._products[rows][:, columns], self._counts[rows][:, columns]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (products - self._sums[rows][:, columns] * self._sums[columns][:, rows].T / counts) / (counts - 1)
+
+    def shrinkage(self) -> float:
+        """Ledoit-Wolf intensity for shrinking the sample covariance towards its diagonal."""
+        with self._lock, np.errstate(invalid="ignore", divide="ignore"):
+            sample = self.sample_covariance()
+            second_moment = self._products / self._counts
+            # Estimated variance of each sample covariance entry.
+            noise = (self._squares / self._counts - second_moment ** 2) / self._counts
+            off_diagonal = ~np.eye(len(sample), dtype=bool) & np.isfinite(sample) & np.isfinite(noise)
+            signal = (sample[off_diagonal] ** 2).sum()
+            return float(np.clip(noise[off_diagonal].sum() / signal, 0.0, 1.0)) if signal > 0 else 1.0
+
+    def covariance(self) -> np.ndarray:
+        """Shrunk daily covariance of every tracked column (benchmark first); pairs with no overlap are 0."""
+        with self._lock:
+            if self._covariance is None:
+                sample = np.nan_to_num(self.sample_covariance())
+                off_diagonal = ~np.eye(len(sample), dtype=bool)
+                self._covariance = np.where(off_diagonal, sample * (1 - self.shrinkage()), sample)
+            return self._covariance
+
+    def volatility(self, symbols: Iterable[str]) -> np.ndarray:
+        """Annualized volatility of each symbol over the window."""
+        with self._lock:
+            columns = [self._index[symbol.upper()] for symbol in symbols]
+            return np.sqrt(np.diag(self._sample(columns, columns)) * TRADING_DAYS)
+
+    def beta(self, symbols: Iterable[str]) -> np.ndarray:
+        """Beta of each symbol against the benchmark, over the days both have a return."""
+        with self._lock, np.errstate(invalid="ignore", divide="ignore"):
+            columns = [self._index[symbol.upper()] for symbol in symbols]
+            counts = self._counts[columns, 0]
+            market_sum = self._sums[0, columns]
+            # The benchmark's variance over the same days as each symbol.
+            market_squares = self._market_squares(columns)
+            market_variance = (market_squares - market_sum ** 2 / counts) / (counts - 1)
+            beta = self._sample(columns, [0])[:, 0] / market_variance
+            return np.where(counts > 1, beta, np.nan)
+
+    def _market_squares(self, columns: List[int]) -> np.ndarray:
+        # sum over the window of r_market^2 on the days each column has a return.
+        rows = self._returns[:len(self._dates)]
+        valid = ~np.isnan(rows[:, columns])
+        return (np.nan_to_num(rows[:, 0]) ** 2) @ valid
+
+    def portfolio(self, weights: Dict[str, float], confidence: float = VAR_CONFIDENCE, horizon_days: int = 1,
+                  correlation_window: int = CORRELATION_WINDOW) -> PortfolioRisk:
+        """Risk of a portfolio whose weights are fractions of its value (negative for short positions).
+
+        Value at risk is parametric (normal returns, scaled by the square root
+        of the horizon) and, like the volatility, a fraction of the portfolio value.
+        """
+        self.track(weights)
+        with self._lock:
+            symbols = [symbol.upper() for symbol in weights]
+            columns = [self._index[symbol] for symbol in symbols]
+            w = np.array(list(weights.values()), dtype=float)
+            covariance = self.covariance()
+            block = covariance[np.ix_(columns, columns)]
+
+            variance = float(w @ block @ w)
+            daily_volatility = np.sqrt(variance)
+            marginal = block @ w / daily_volatility if daily_volatility > 0 else np.zeros(len(w))
+            # Beta comes from the unshrunk covariances: shrinking towards the diagonal would bias it towards 0.
+            sample = np.nan_to_num(self._sample(columns + [0], [0])[:, 0])
+            beta = float(sample[:-1] @ w / sample[-1]) if sample[-1] > 0 else float("nan")
+            means = np.diag(self._sums)[columns] / np.maximum(np.diag(self._counts)[columns], 1)
+            z = NormalDist().inv_cdf(confidence)
+            value_at_risk = z * daily_volatility * np.sqrt(horizon_days) - float(means @ w) * horizon_days
+            correlation = self._rolling_correlation(weights, correlation_window)
+
+            return PortfolioRisk(
+                volatility=daily_volatility * np.sqrt(TRADING_DAYS),
+                beta=beta,
+                value_at_risk=value_at_risk,
+                confidence=confidence,
+                horizon_days=horizon_days,
+                benchmark_correlation=float(correlation.iloc[-1]) if len(correlation) else float("nan"),
+                risk_contributions=dict(zip(symbols, (w * (block @ w) / variance).tolist() if variance > 0 else [0.0] * len(w))),
+                marginal_risk=dict(zip(symbols, (marginal * np.sqrt(TRADING_DAYS)).tolist())),
+            )
+
+    def rolling_correlation(self, weights: Dict[str, float], window: int = CORRELATION_WINDOW) -> pd.Series:
+        """Correlation of the portfolio's daily returns with the benchmark's, over a trailing ``window`` days."""
+        self.track(weights)
+        return self._rolling_correlation(weights, window)
+
+    def _rolling_correlation(self, weights: Dict[str, float], window: int) -> pd.Series:
+        with self._lock:
+            count = len(self._dates)
+            order = (self._head - count + np.arange(count)) % self.window
+            rows = self._returns[order]
+            columns = [self._index[symbol.upper()] for symbol in weights]
+            portfolio = np.nan_to_num(rows[:, columns]) @ np.array(list(weights.values()), dtype=float)
+            market = rows[:, 0]
+            dates = list(self._dates)
+
+        pairs = np.column_stack([portfolio, market, portfolio * market, portfolio ** 2, market ** 2])
+        sums = indicators.rolling_sum(pairs, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = sums[:, 2] - sums[:, 0] * sums[:, 1] / window
+            correlation = covariance / np.sqrt((sums[:, 3] - sums[:, 0] ** 2 / window) * (sums[:, 4] - sums[:, 1] ** 2 / window))
+        return pd.Series(correlation, index=pd.DatetimeIndex(dates), name="benchmark_correlation").dropna()
+
+
+_engine: Optional[RiskEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RiskEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RiskEngine()
+        return _engine
@@ -0,0 +1,10 @@
+from crewai_tools import SerperDevTool
+from . import fetch_client, tracing
+
+
+class SearchTool(SerperDevTool):
+    """``SerperDevTool`` whose requests go through the shared "serper" upstream (rate limit, retries, circuit breaker)."""
+
+    @tracing.tool_span
+    def _run(self, **kwargs):
+        return fetch_client.get_upstream("serper").call(super()._run, **kwargs)
@@ -0,0 +1,302 @@
+"""Batched sentiment scoring for news summaries and research report titles.
+
+``SentimentEngine.score(texts)`` returns one polarity in [-1, 1] per text.
+Scores are memoized by content hash, so a headline shared by many tickers is
+scored once per process. Two backends are provided:
+
+* ``LexiconSentimentEngine`` (default): a vectorized lexicon scorer over a
+  precompiled token dictionary (TextBlob's polarity lexicon, with its
+  intensifiers and negation).
+* ``ModelSentimentEngine``: wraps a local model, e.g. a ``transformers``
+  sentiment pipeline, for callers that want a model backend.
+"""
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from . import tracing
+
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+NEGATIONS = frozenset({
+    "not", "no", "never", "neither", "nor", "without", "hardly",
+    "don't", "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't",
+    "won't", "wouldn't", "can't", "cannot", "couldn't", "shouldn't",
+})
+# Same damping TextBlob applies to a negated word.
+NEGATION_FACTOR = -0.5
+# TextBlob carries an intensifier over unknown words this short ("very much a good") and a negation over
+# single letters ("not a good"); any longer word in between cancels it.
+MODIFIER_GAP = 2
+NEGATION_GAP = 1
+MEMO_SIZE = 100_000
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class SentimentEngine(ABC):
+    """Scores texts in batches and memoizes the result per distinct text; backends implement ``_score_batch``."""
+
+    def __init__(self, memo_size: int = MEMO_SIZE):
+        self.memo_size = memo_size
+        self.hits = 0
+        self.misses = 0
+        self._memo: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """Polarity in [-1, 1] for each text, in order."""
+        texts = [text or "" for text in texts]
+        keys = [text_hash(text) for text in texts]
+        scores = np.empty(len(texts))
+
+        missing: Dict[bytes, List[int]] = defaultdict(list)
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._memo.get(key)
+                if cached is None:
+                    missing[key].append(i)
+                else:
+                    self._memo.move_to_end(key)
+                    scores[i] = cached
+            self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+            self.misses += len(missing)
+
+        if missing:
+            with tracing.span("sentiment score", **{"sentiment.backend": type(self).__name__, "sentiment.texts": len(missing), "cache.hit": False}):
+                fresh = self._score_batch([texts[positions[0]] for positions in missing.values()])
+            with self._lock:
+                for (key, positions), value in zip(missing.items(), fresh):
+                    scores[positions] = value
+                    self._memo[key] = float(value)
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return scores
+
+    def mean_score(self, texts: Sequence[str]) -> float:
+        return float(self.score(texts).mean()) if len(texts) else 0.0
+
+    @abstractmethod
+    def _score_batch(self, texts: List[str]) -> np.ndarray:
+        """Polarity in [-1, 1] for each of ``texts``, none of which is memoized yet."""
+
+
+def _textblob_lexicon_path() -> Optional[str]:
+    # Resolve the data file without importing textblob (which pulls in nltk).
+    spec = importlib.util.find_spec("textblob")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.join(spec.submodule_search_locations[0], "en", "en-sentiment.xml")
+
+
+def load_textblob_lexicon(path: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Word -> polarity, and intensifier (adverb) -> intensity, averaged over senses as TextBlob does.
+
+    Senses are averaged per part of speech and then across parts of speech, and each adjective
+    also yields its "-ly" adverb ("terrible" -> "terribly") with the adjective's scores.
+    """
+    path = path or _textblob_lexicon_path()
+    if path is None or not os.path.exists(path):
+        raise FileNotFoundError("TextBlob's en-sentiment.xml lexicon was not found; pass a lexicon explicitly.")
+    senses: Dict[str, Dict[Optional[str], List[Tuple[float, float]]]] = defaultdict(lambda: defaultdict(list))
+    for word in ElementTree.parse(path).getroot().iter("word"):
+        senses[word.get("form")][word.get("pos")].append((float(word.get("polarity", 0.0)), float(word.get("intensity", 1.0))))
+
+    words = {}
+    for form, by_pos in senses.items():
+        pos_means = {pos: tuple(np.mean(values, axis=0)) for pos, values in by_pos.items()}
+        pos_means[None] = tuple(np.mean(list(pos_means.values()), axis=0))
+        words[form] = pos_means
+    for form, by_pos in list(words.items()):
+        if "JJ" in by_pos:
+            stem = form[:-1] + "i" if form.endswith("y") else form
+            stem = stem[:-2] if stem.endswith("le") else stem
+            adverb = words.setdefault(stem + "ly", {})
+            adverb["RB"] = adverb[None] = by_pos["JJ"]
+
+    polarity = {form: float(by_pos[None][0]) for form, by_pos in words.items()}
+    intensity = {form: float(by_pos[None][1]) for form, by_pos in words.items() if "RB" in by_pos}
+    return polarity, intensity
+
+
+class TokenBatch:
+    """Per-token arrays for a batch of texts, flattened in order; ``text_ids`` maps each token to its text.
+
+    ``strength`` and ``adverb`` carry one extra trailing entry (0.0 / False) for the "no such token"
+    index that ``LexiconSentimentEngine._previous`` returns.
+    """
+
+    def __init__(self, texts: List[str], index: Dict[str, int], intensity: np.ndarray):
+        """``index`` maps known tokens to rows of ``intensity``, whose extra last row is for unknown tokens."""
+        token_lists = [TOKEN_RE.findall(text.lower()) for text in texts]
+        tokens = list(chain.from_iterable(token_lists))
+        count = len(tokens)
+        unknown = len(index)
+        self.texts = len(texts)
+        self.text_ids = np.repeat(np.arange(len(texts)), np.fromiter(map(len, token_lists), dtype=np.int64, count=len(texts)))
+        self.ids = np.fromiter((index.get(token, unknown) for token in tokens), dtype=np.int64, count=count)
+        self.known = self.ids != unknown
+        self.negator = np.fromiter((token in NEGATIONS for token in tokens), dtype=bool, count=count)
+        self.lengths = np.fromiter((len(token.strip("'")) for token in tokens), dtype=np.int64, count=count)
+        self.adverb = np.append(np.fromiter((token.endswith("ly") for token in tokens), dtype=bool, count=count), False)
+        self.strength = np.append(intensity[self.ids], 0.0)
+
+
+class LexiconSentimentEngine(SentimentEngine):
+    """Mean lexicon polarity of the known tokens in each text, scored the way TextBlob's default analyzer does.
+
+    An intensifier ("very") multiplies the next known word by its intensity and is not counted on its own
+    ("very bad" is one assessment, -0.7 * 1.3); a negated assessment is damped and flipped. Only words are
+    tokenized: unlike TextBlob, exclamation marks do not boost the previous word and emoticons are not scored.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None, intensifiers: Optional[Dict[str, float]] = None, memo_size: int = MEMO_SIZE):
+        super().__init__(memo_size)
+        if lexicon is None:
+            lexicon, intensifiers = load_textblob_lexicon()
+        intensifiers = intensifiers or {}
+        # Token -> row in the polarity array; one shared sentinel row (0.0) for unknown tokens.
+        self._index = {token: i for i, token in enumerate(lexicon)}
+        self._polarity = np.append(np.fromiter(lexicon.values(), dtype=float, count=len(lexicon)), 0.0)
+        # Intensity of each row; 0.0 marks rows that do not modify the next word.
+        self._intensity = np.append(np.fromiter((intensifiers.get(token, 0.0) for token in lexicon), dtype=float, count=len(lexicon)), 0.0)
+        self._unknown = len(lexicon)
+
+    def _score_batch(self, texts: List[str]) -> np.ndarray:
+        batch = TokenBatch(texts, self._index, self._intensity)
+        absorbed = self._absorbed_negators(batch)
+        negated = self._negated(batch, absorbed)
+        before, modified = self._modifiers(batch, absorbed)
+        flips = self._flips(negated, before, absorbed)
+        polarity = self._token_polarity(batch, negated, before, modified)
+        return self._mean_assessments(batch, polarity, modified, flips)
+
+    def _absorbed_negators(self, batch: TokenBatch) -> np.ndarray:
+        """Unknown negators right after an "-ly" intensifier ("really not good").
+
+        Such a negator negates the intensifier's assessment and, unlike other longer words, keeps the
+        intensifier in effect.
+        """
+        before = self._previous(batch.known | ((batch.lengths > MODIFIER_GAP) & ~batch.negator), batch.text_ids)
+        return batch.negator & ~batch.known & (batch.strength[before] > 0) & batch.adverb[before]
+
+    def _negated(self, batch: TokenBatch, absorbed: np.ndarray) -> np.ndarray:
+        """Known tokens negated by the last negator before them, with nothing but single letters in between ("not a good")."""
+        negators = np.append(batch.negator & ~absorbed, False)
+        return batch.known & negators[self._previous(batch.known | (batch.lengths > NEGATION_GAP), batch.text_ids)]
+
+    def _modifiers(self, batch: TokenBatch, absorbed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """The candidate intensifier before each token (index ``count`` for none), and which known tokens it modifies.
+
+        An intensifier carries over unknown words of up to ``MODIFIER_GAP`` letters and absorbed negators;
+        any other known word or longer word in between cancels it.
+        """
+        before = self._previous(batch.known | ((batch.lengths > MODIFIER_GAP) & ~absorbed), batch.text_ids)
+        return before, batch.known & (batch.strength[before] > 0)
+
+    @staticmethod
+    def _flips(negated: np.ndarray, before: np.ndarray, absorbed: np.ndarray) -> np.ndarray:
+        """Tokens whose assessment is flipped: negated tokens, and intensifiers followed by an absorbed negator."""
+        flips = negated.copy()
+        flips[before[absorbed]] = True
+        return flips
+
+    def _token_polarity(self, batch: TokenBatch, negated: np.ndarray, before: np.ndarray, modified: np.ndarray) -> np.ndarray:
+        """Polarity of each token, times its intensifier's intensity; a negated intensifier weakens instead ("not very good")."""
+        strength = batch.strength.copy()
+        own = strength[:-1]
+        strength[:-1] = np.where(negated & (own > 0), 1.0 / np.maximum(own, 1e-12), own)
+        return np.clip(self._polarity[batch.ids] * np.where(modified, strength[before], 1.0), -1.0, 1.0)
+
+    @staticmethod
+    def _mean_assessments(batch: TokenBatch, polarity: np.ndarray, modified: np.ndarray, flips: np.ndarray) -> np.ndarray:
+        """Mean assessment per text (0.0 for texts with none).
+
+        A modified token joins its intensifier's assessment, which takes the last joined token's polarity;
+        an assessment with any flipped token is damped by ``NEGATION_FACTOR``.
+        """
+        rows = np.flatnonzero(batch.known)
+        assessment = np.cumsum(~modified[rows]) - 1
+        last = rows[np.append(assessment[1:] != assessment[:-1], True)] if len(rows) else rows
+        flipped = np.zeros(len(last), dtype=bool)
+        np.logical_or.at(flipped, assessment, flips[rows])
+        values = polarity[last] * np.where(flipped, NEGATION_FACTOR, 1.0)
+
+        owners = batch.text_ids[rows[~modified[rows]]]
+        sums = np.bincount(owners, weights=values, minlength=batch.texts)
+        counts = np.bincount(owners, minlength=batch.texts)
+        scores = np.divide(sums, counts, out=np.zeros(batch.texts), where=counts > 0)
+        return np.clip(scores, -1.0, 1.0)
+
+    @staticmethod
+    def _previous(marks: np.ndarray, text_ids: np.ndarray) -> np.ndarray:
+        """Index of the last marked token before each token in the same text, or ``len(marks)`` if there is none."""
+        count = len(marks)
+        last = np.maximum.accumulate(np.where(marks, np.arange(count), -1))
+        previous = np.full(count, -1)
+        previous[1:] = last[:-1]
+        valid = previous >= 0
+        valid[valid] = text_ids[previous[valid]] == text_ids[valid]
+        return np.where(valid, previous, count)
+
+
+class ModelSentimentEngine(SentimentEngine):
+    """Wraps a local model.
+
+    ``predict`` takes a list of texts and returns one polarity in [-1, 1] per text.
+    When it is omitted, a ``transformers`` sentiment pipeline for ``model_name`` is loaded.
+    """
+
+    def __init__(self, predict: Optional[Callable[[List[str]], Sequence[float]]] = None, model_name: str = "ProsusAI/finbert", batch_size: int = 32, memo_size: int = MEMO_SIZE):
+        super().__init__(memo_size)
+        self.batch_size = batch_size
+        self._predict = predict or self._load_pipeline(model_name)
+
+    def _load_pipeline(self, model_name: str) -> Callable[[List[str]], List[float]]:
+        try:
+            from transformers import pipeline
+        except ImportError as e:
+            raise ImportError("The model sentiment backend needs the 'transformers' package.") from e
+
+        classifier = pipeline("sentiment-analysis", model=model_name, truncation=True)
+        signs = {"positive": 1.0, "negative": -1.0}
+
+        def predict(texts: List[str]) -> List[float]:
+            return [signs.get(result["label"].lower(), 0.0) * result["score"] for result in classifier(texts, batch_size=self.batch_size)]
+
+        return predict
+
+    def _score_batch(self, texts: List[str]) -> np.ndarray:
+        return np.clip(np.asarray(self._predict(texts), dtype=float), -1.0, 1.0)
+
+
+_engine: Optional[SentimentEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SentimentEngine:
+    """Process-wide engine; set FINNIE_SENTIMENT_BACKEND=model to use the local model backend."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if os.getenv("FINNIE_SENTIMENT_BACKEND", "lexicon") == "model":
+                _engine = ModelSentimentEngine()
+            else:
+                _engine = LexiconSentimentEngine()
+        return _engine
+
+
+def set_engine(engine: SentimentEngine) -> None:
+    global _engine
+    with _engine_lock:
+        _engine = engine
@@ -1,8 +1,8 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type, List
-import yfinance as yf
-from textblob import TextBlob
+from typing import Type, List, Optional, Tuple
+import numpy as np
+from . import categories, compaction, market_data, news_index, sentiment_engine, tracing
 
 
 class SentimentToolInput(BaseModel):
@@ -14,6 +14,13 @@ class Info(BaseModel):
     id: str
     sentiment_score: float
     context: List[str]
+    # Why the data behind the score could not be fetched; the score is 0.0 then.
+    error: Optional[str] = None
+
+
+# Snippets kept per group in the compacted output, and their length.
+EVIDENCE_SNIPPETS = 2
+SNIPPET_CHARS = 200
 
 
 class SentimentToolOutput(BaseModel):
@@ -29,26 +36,21 @@ class SentimentTool(BaseTool):
     )
     args_schema: Type[BaseModel] = SentimentToolInput
 
+    @tracing.tool_span
+    @compaction.compact_output
     def _run(self, stock_symbol: str) -> SentimentToolOutput:
         try:
-            main_stock_news = self.get_context_stock(stock_symbol)
-            main_stock_sentiment = self.get_sentiment_score(main_stock_news)
-            main_stock_info = Info(id=stock_symbol, sentiment_score=main_stock_sentiment, context=main_stock_news)
+            # Stock news is scored once at ingestion; this reads the window's aggregate from the local index
+            main_stock_info = self.get_stock_info(stock_symbol)
 
             # Fetch industry and sector information
-            stock_info = yf.Ticker(stock_symbol).info
+            stock_info = market_data.get_info(stock_symbol)
             industry = stock_info.get('industry', 'Unknown Industry')
             sector = stock_info.get('sector', 'Unknown Sector')
 
-            # Industry sentiment
-            industry_context = self.get_context_industry(industry)
-            industry_sentiment = self.get_sentiment_score(industry_context)
-            industry_info = Info(id=industry, sentiment_score=industry_sentiment, context=industry_context)
-
-            # Sector sentiment
-            sector_context = self.get_context_sector(sector)
-            sector_sentiment = self.get_sentiment_score(sector_context)
-            sector_info = Info(id=sector, sentiment_score=sector_sentiment, context=sector_context)
+            # Industry and sector sentiment are precomputed once per category and shared across tickers
+            industry_info = self.get_category_info(categories.INDUSTRY, industry)
+            sector_info = self.get_category_info(categories.SECTOR, sector)
 
             return dict(SentimentToolOutput(
                 main_stock_info=main_stock_info,
@@ -57,29 +59,70 @@ class SentimentTool(BaseTool):
             ))
         except Exception as e:
             print(f"Error in running SentimentTool: {e}")
+            error = f"{type(e).__name__}: {e}"
             return SentimentToolOutput(
-                main_stock_info=Info(id=stock_symbol, sentiment_score=0.0, context=[]),
-                sector_stock_info=Info(id="Unknown", sentiment_score=0.0, context=[]),
-                industry_stock_info=Info(id="Unknown", sentiment_score=0.0, context=[]),
+                main_stock_info=Info(id=stock_symbol, sentiment_score=0.0, context=[], error=error),
+                sector_stock_info=Info(id="Unknown", sentiment_score=0.0, context=[], error=error),
+                industry_stock_info=Info(id="Unknown", sentiment_score=0.0, context=[], error=error),
             )
 
+    def digest(self, output) -> dict:
+        """Scores plus the most opinionated snippets, instead of every article summary."""
+        engine = sentiment_engine.get_engine()
+        digest = {}
+        for group, info in dict(output).items():
+            scores = engine.score(info.context) if info.context else np.zeros(0)
+            strongest = sorted(np.argsort(-np.abs(scores))[:EVIDENCE_SNIPPETS])
+            digest[group] = {
+                "id": info.id,
+                "sentiment_score": info.sentiment_score,
+                "items": len(info.context),
+                "evidence": [info.context[i][:SNIPPET_CHARS] for i in strongest],
+            }
+            if info.error:
+                digest[group]["error"] = info.error
+        return digest
+
     def get_sentiment_score(self, news: List[str]) -> float:
         try:
             if not news:
                 return 0.0
-            return sum(TextBlob(content).sentiment.polarity for content in news) / len(news)
+            return sentiment_engine.get_engine().mean_score(news)
         except Exception as e:
             print(f"Error in sentiment analysis: {e}")
             return 0.0
 
     def get_context_stock(self, stock_symbol: str) -> List[str]:
+        return self.fetch_context_stock(stock_symbol)[0]
+
+    def fetch_context_stock(self, stock_symbol: str) -> Tuple[List[str], Optional[str]]:
+        """News summaries for the stock, and why they could not be brought up to date (if so)."""
+        info = self.get_stock_info(stock_symbol)
+        return info.context, info.error
+
+    def get_stock_info(self, stock_symbol: str) -> Info:
+        """Sentiment of the stock's indexed news over the last week, polling first if the index is stale."""
+        error = None
+        try:
+            news_index.ensure_fresh(stock_symbol)
+        except Exception as e:
+            # Whatever the index already holds is still served, with the reason it may be stale
+            print(f"Error polling stock news: {e}")
+            error = f"{type(e).__name__}: {e}"
         try:
-            stock = yf.Ticker(stock_symbol)
-            news = stock.get_news()
-            return [item["content"].get("summary", "") for item in news[:5]] if news else []
+            aggregate = news_index.get_index().aggregate(news_index.TICKER, stock_symbol.upper())
+            return Info(id=stock_symbol, sentiment_score=aggregate.sentiment_score, context=aggregate.context, error=error)
         except Exception as e:
-            print(f"Error fetching stock news: {e}")
-            return []
+            print(f"Error reading stock news: {e}")
+            return Info(id=stock_symbol, sentiment_score=0.0, context=[], error=f"{type(e).__name__}: {e}")
+
+    def get_category_info(self, kind: str, name: str) -> Info:
+        try:
+            context = categories.get_registry().get(kind, name)
+            return Info(id=name, sentiment_score=context.sentiment_score, context=context.report_titles)
+        except Exception as e:
+            print(f"Error fetching {kind} reports for {name}: {e}")
+            return Info(id=name, sentiment_score=0.0, context=[], error=f"{type(e).__name__}: {e}")
 
     def get_context_industry(self, industry: str) -> List[str]:
         return self.get_industry_reports(industry)
@@ -88,33 +131,11 @@ class SentimentTool(BaseTool):
         return self.get_sector_reports(sector)
 
     def get_industry_reports(self, industry: str) -> List[str]:
-        try:
-            formatted_industry = self.format_category(industry)
-            reports = yf.Industry(formatted_industry).research_reports
-            return [report.get('reportTitle', "") for report in reports] if reports else []
-        except Exception as e:
-            print(f"Error fetching industry reports for {industry}: {e}")
-            return []
+        return self.get_category_info(categories.INDUSTRY, industry).context
 
     def get_sector_reports(self, sector: str) -> List[str]:
-        try:
-            formatted_sector = self.format_category(sector)
-            reports = yf.Sector(formatted_sector).research_reports
-            return [report.get('reportTitle', "") for report in reports] if reports else []
-        except Exception as e:
-            print(f"Error fetching sector reports for {sector}: {e}")
-            return []
+        return self.get_category_info(categories.SECTOR, sector).context
 
     def format_category(self, text: str) -> str:
-        if "-" not in text:
-            try:
-                res = []
-                for word in text.split():
-                    if word != "-" and word != "&":
-                        res.append(word.lower())
-                return "-".join(res)
-            except Exception as e:
-                print(f"Error formatting category: {e}")
-                return "unknown"
-        return text
+        return categories.format_category(text)
 
@@ -0,0 +1,230 @@
+"""Columnar store of annual financial statements for many symbols.
+
+All statements live in one table with a row per (symbol, period end) and one
+float64 column per field, including derived fields such as free cash flow
+and FCF margin. The table is persisted as NumPy arrays, so cross-sectional
+screens run against local data without refetching. Per-date pydantic models
+are built only at the edge, by the EarningsCallTool.
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from . import market_data, tracing
+from .price_store import file_lock
+
+
+# Store column -> yfinance row label, per statement.
+INCOME_FIELDS = {
+    "total_revenue": "Total Revenue",
+    "gross_profit": "Gross Profit",
+    "operating_income": "Operating Income",
+    "net_income": "Net Income",
+    "cost_of_revenue": "Cost Of Revenue",
+}
+BALANCE_FIELDS = {
+    "total_assets": "Total Assets",
+    "total_liabilities": "Total Liabilities Net Minority Interest",
+    "total_equity": "Total Equity Gross Minority Interest",
+    "current_assets": "Current Assets",
+    "current_liabilities": "Current Liabilities",
+}
+CASH_FLOW_FIELDS = {
+    "operating_cash_flow": "Operating Cash Flow",
+    "investing_cash_flow": "Investing Cash Flow",
+    "financing_cash_flow": "Financing Cash Flow",
+    "capital_expenditures": "Capital Expenditure",
+    "repurchase_of_stock": "Repurchase Of Capital Stock",
+    "long_term_debt_issuance": "Issuance Of Debt",
+    "long_term_debt_repayment": "Repayment Of Debt",
+    "end_cash_position": "End Cash Position",
+}
+DERIVED_FIELDS = ["free_cash_flow", "fcf_margin", "gross_margin", "operating_margin", "net_margin", "current_ratio"]
+
+STATEMENTS = {
+    "financials": INCOME_FIELDS,
+    "balance_sheet": BALANCE_FIELDS,
+    "cash_flow": CASH_FLOW_FIELDS,
+}
+COLUMNS = list(INCOME_FIELDS) + list(BALANCE_FIELDS) + list(CASH_FLOW_FIELDS) + DERIVED_FIELDS
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(market_data.DEFAULT_CACHE_PATH), "statements.npz")
+LOAD_WORKERS = 8
+
+
+def add_derived_fields(frame: pd.DataFrame) -> pd.DataFrame:
+    """Compute the derived columns for every row at once."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame["free_cash_flow"] = frame["operating_cash_flow"] + frame["capital_expenditures"]
+        revenue = frame["total_revenue"].replace(0, np.nan)
+        frame["fcf_margin"] = frame["free_cash_flow"] / revenue
+        frame["gross_margin"] = frame["gross_profit"] / revenue
+        frame["operating_margin"] = frame["operating_income"] / revenue
+        frame["net_margin"] = frame["net_income"] / revenue
+        frame["current_ratio"] = frame["current_assets"] / frame["current_liabilities"].replace(0, np.nan)
+    return frame
+
+
+def empty_table() -> pd.DataFrame:
+    return pd.DataFrame(columns=COLUMNS, dtype=float, index=pd.MultiIndex.from_arrays([[], []], names=["symbol", "period_end"]))
+
+
+def fetch_statements(symbol: str) -> pd.DataFrame:
+    """One symbol's statements as store rows, indexed by period end."""
+    parts = []
+    for dataset, fields in STATEMENTS.items():
+        raw = getattr(market_data, f"get_{dataset}")(symbol)
+        if raw is None or raw.empty:
+            continue
+        # yfinance frames are (line item x period end); transpose once and pick the labelled rows.
+        part = raw.T.reindex(columns=list(fields.values()))
+        part.columns = list(fields)
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=COLUMNS, dtype=float)
+
+    frame = pd.concat(parts, axis=1).apply(pd.to_numeric, errors="coerce")
+    frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+    frame = frame.groupby(level=0).first().sort_index()
+    return frame.reindex(columns=COLUMNS)
+
+
+class StatementStore:
+    """Statements for many symbols in one (symbol, period_end) x field float64 table."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_STORE_PATH, ttl: Optional[int] = None):
+        self.path = path
+        self.ttl = ttl if ttl is not None else market_data.DATASET_TTLS["financials"]
+        self._lock = threading.Lock()
+        self._frame = empty_table()
+        self._loaded_at: Dict[str, float] = {}
+        # Why the last fetch of a symbol failed, so tools can report it instead of an empty table.
+        self.errors: Dict[str, str] = {}
+        if path and os.path.exists(path):
+            self._frame, self._loaded_at = self._read()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._frame
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._loaded_at)
+
+    def load(self, symbols: Iterable[str], refresh: bool = False) -> pd.DataFrame:
+        """Make sure every symbol is in the store, fetching the missing or stale ones concurrently."""
+        now = time.time()
+        wanted = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        with self._lock:
+            stale = [s for s in wanted if refresh or now - self._loaded_at.get(s, 0.0) >= self.ttl]
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(stale))) as pool:
+                futures = [pool.submit(tracing.bind(self._fetch), symbol) for symbol in stale]
+                results = dict(zip(stale, (future.result() for future in futures)))
+            fetched = {symbol: frame for symbol, frame in results.items() if frame is not None}
+            if fetched:
+                self._replace(fetched, now)
+
+        return self._frame.loc[self._frame.index.get_level_values("symbol").isin(wanted)]
+
+    def statements(self, symbol: str) -> pd.DataFrame:
+        """All periods for one symbol, oldest first, loading it if needed."""
+        symbol = symbol.upper()
+        self.load([symbol])
+        if symbol not in self._frame.index.get_level_values("symbol"):
+            return pd.DataFrame(columns=COLUMNS, dtype=float)
+        return self._frame.xs(symbol, level="symbol")
+
+    def latest(self, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """The most recent period per symbol, for cross-sectional screens."""
+        frame = self._frame if symbols is None else self.load(symbols)
+        return frame.groupby(level="symbol").tail(1).droplevel("period_end")
+
+    def _fetch(self, symbol: str) -> Optional[pd.DataFrame]:
+        try:
+            frame = fetch_statements(symbol)
+        except Exception as e:
+            print(f"Error fetching statements for {symbol}: {e}")
+            self.errors[symbol] = f"{type(e).__name__}: {e}"
+            return None
+        self.errors.pop(symbol, None)
+        return frame
+
+    def _replace(self, fetched: Dict[str, pd.DataFrame], loaded_at: float) -> None:
+        new = pd.concat(fetched, names=["symbol", "period_end"]) if fetched else None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Other processes (API, workers, screener) share the file: merge with what is on disk under its lock,
+        # keeping whichever copy of each symbol was loaded last, so no writer drops another's symbols.
+        with self._lock, (file_lock(self.path) if self.path else nullcontext()):
+            frame, loaded = self._frame, dict(self._loaded_at)
+            if self.path and os.path.exists(self.path):
+                disk_frame, disk_loaded = self._read()
+                newer = [s for s, at in disk_loaded.items() if s not in fetched and at > loaded.get(s, float("-inf"))]
+                if newer:
+                    frame = pd.concat([
+                        frame.loc[~frame.index.get_level_values("symbol").isin(newer)],
+                        disk_frame.loc[disk_frame.index.get_level_values("symbol").isin(newer)],
+                    ])
+                    loaded.update({s: disk_loaded[s] for s in newer})
+            keep = frame.loc[~frame.index.get_level_values("symbol").isin(list(fetched))]
+            frame = pd.concat([keep, new]) if len(keep) else new
+            self._frame = add_derived_fields(frame.astype(float)).sort_index()
+            self._loaded_at = dict(loaded, **{symbol: loaded_at for symbol in fetched})
+            self._write()
+
+    def _write(self) -> None:
+        if not self.path:
+            return
+        try:
+            symbols = list(self._loaded_at)
+            # A unique temp name per writer; the caller holds the file lock, so the replace is the only commit point.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(
+                        f,
+                        symbol=self._frame.index.get_level_values("symbol").to_numpy(dtype=str),
+                        period_end=self._frame.index.get_level_values("period_end").to_numpy(dtype="datetime64[ns]"),
+                        values=self._frame[COLUMNS].to_numpy(dtype=np.float64),
+                        columns=np.array(COLUMNS),
+                        loaded_symbols=np.array(symbols, dtype=str),
+                        loaded_at=np.array([self._loaded_at[s] for s in symbols], dtype=np.float64),
+                    )
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except Exception as e:
+            print(f"Error writing statement store to {self.path}: {e}")
+
+    def _read(self) -> Tuple[pd.DataFrame, Dict[str, float]]:
+        """The table and per-symbol load times on disk; empty if the file cannot be read."""
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                index = pd.MultiIndex.from_arrays([data["symbol"].astype(object), pd.DatetimeIndex(data["period_end"])], names=["symbol", "period_end"])
+                frame = pd.DataFrame(data["values"], index=index, columns=list(data["columns"]))
+                return frame.reindex(columns=COLUMNS), dict(zip(data["loaded_symbols"].tolist(), data["loaded_at"].tolist()))
+        except Exception as e:
+            print(f"Error reading statement store at {self.path}: {e}")
+            return empty_table(), {}
+
+
+_store: Optional[StatementStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> StatementStore:
+    """Process-wide store; the file can be overridden with FINNIE_STATEMENTS_PATH."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StatementStore(path=os.environ.get("FINNIE_STATEMENTS_PATH", DEFAULT_STORE_PATH) or None)
+        return _store
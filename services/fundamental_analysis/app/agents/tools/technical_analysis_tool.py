@@ -1,9 +1,9 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 from typing import Type
-import yfinance as yf
 import numpy as np
 import pandas as pd
+from . import benchmarks, compaction, indicators, price_store, tracing
 
 class TechnicalAnalysisCallToolInput(BaseModel):
     """Input schema for TechnicalAnalysis tool."""
@@ -23,18 +23,23 @@ class TechnicalAnalysis(BaseTool):
     description: str = "Fetches detailed metrics for assessing stock risk and long-term investment potential, such as historical performance, beta, long-term moving averages, RSI, and Bollinger Bands."
     args_schema: Type[BaseModel] = TechnicalAnalysisCallToolInput
 
+    @tracing.tool_span
+    @compaction.compact_output
     def _run(self, stock_symbol: str) -> TechnicalAnalysisOutput:
-        stock = yf.Ticker(stock_symbol)
-        data = stock.history(period="10y")
+        start = pd.Timestamp.today().normalize() - pd.DateOffset(years=10)
+        data = price_store.get_store().frame(stock_symbol, start=start)
         if data.empty:
             return {"error": "Invalid stock symbol or no data available."}
-        
+
+        # Indicators only consume the bars added since the symbol's last run.
+        state = indicators.get_engine().update(stock_symbol, benchmarks.daily_close(data))
+
         return TechnicalAnalysisOutput(
             historical_performance=self.calculate_historical_performance(data),
-            beta=self.calculate_beta(stock_symbol),
-            moving_averages=self.calculate_long_term_moving_averages(data),
-            rsi=self.calculate_rsi(data),
-            bollinger_bands=self.calculate_bollinger_bands(data)
+            beta=self.calculate_beta(data),
+            moving_averages=self.calculate_long_term_moving_averages(state),
+            rsi=self.calculate_rsi(state),
+            bollinger_bands=self.calculate_bollinger_bands(state)
         )
     
     def calculate_historical_performance(self, data):
@@ -43,41 +48,27 @@ class TechnicalAnalysis(BaseTool):
         annual_return = ((end_price / start_price) ** (1 / 10)) - 1
         return round(annual_return * 100, 2)
 
-    def calculate_beta(self, stock_symbol):
-        market = yf.Ticker("^GSPC").history(period="10y")
-        stock = yf.Ticker(stock_symbol).history(period="10y")
-        if market.empty or stock.empty:
+    def calculate_beta(self, data):
+        stock_close = benchmarks.daily_close(data)
+        market_close = benchmarks.get_benchmark(benchmarks.SP500).close(stock_close.index[0])
+        if market_close.empty or stock_close.empty:
+            return None
+
+        # Align on trading dates before differencing so both return series cover the same days.
+        returns = pd.concat([stock_close, market_close], axis=1, join="inner").pct_change().dropna()
+        if len(returns) < 2:
             return None
-        
-        market_returns = market['Close'].pct_change().dropna()
-        stock_returns = stock['Close'].pct_change().dropna()
-        
-        cov_matrix = np.cov(stock_returns, market_returns)
+
+        cov_matrix = np.cov(returns.iloc[:, 0], returns.iloc[:, 1])
         beta = cov_matrix[0, 1] / cov_matrix[1, 1]
         return round(beta, 4)
     
-    def calculate_long_term_moving_averages(self, data):
-        return {
-            "200-day": round(data['Close'].rolling(window=200).mean().iloc[-1], 2),
-            "500-day": round(data['Close'].rolling(window=500).mean().iloc[-1], 2),
-            "1000-day": round(data['Close'].rolling(window=1000).mean().iloc[-1], 2)
-        }
+    def calculate_long_term_moving_averages(self, state: indicators.IndicatorState):
+        return {f"{window}-day": round(state.sma(window), 2) for window in state.sma_windows}
 
-    def calculate_rsi(self, data, period=14):
-        delta = data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return round(rsi.iloc[-1], 2)
-    
-    def calculate_bollinger_bands(self, data, window=200):
-        rolling_mean = data['Close'].rolling(window=window).mean()
-        rolling_std = data['Close'].rolling(window=window).std()
-        upper_band = rolling_mean + (rolling_std * 2)
-        lower_band = rolling_mean - (rolling_std * 2)
-        return {
-            "upper_band": round(upper_band.iloc[-1], 2),
-            "lower_band": round(lower_band.iloc[-1], 2)
-        }
+    def calculate_rsi(self, state: indicators.IndicatorState):
+        return round(state.rsi(), 2)
+
+    def calculate_bollinger_bands(self, state: indicators.IndicatorState):
+        return {band: round(value, 2) for band, value in state.bollinger_bands().items()}
 
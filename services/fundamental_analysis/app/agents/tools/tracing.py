@@ -0,0 +1,262 @@
+"""Lightweight tracing for the tools, data fetches and LLM calls.
+
+``span`` times a block as a child of the current span. The current span is a
+context variable, so nesting follows the call stack; work handed to a thread
+pool keeps its parent when the callable is wrapped with ``bind``. A span
+opened with no parent starts a new trace, and finished traces can be exported
+as OpenTelemetry JSON (OTLP/JSON, loadable by any OTLP collector) or
+summarized as a flame-style table of total and self time per call path.
+
+Set FINNIE_TRACING=0 to turn spans off, and FINNIE_TRACE_DIR to write every
+finished trace there as ``{trace_id}.json``.
+"""
+import contextvars
+import functools
+import json
+import os
+import pickle
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+ENABLED = os.getenv("FINNIE_TRACING", "1") != "0"
+TRACE_DIR = os.getenv("FINNIE_TRACE_DIR")
+SERVICE_NAME = "finnie-fundamental-analysis"
+RECENT_TRACES = 32
+# OTLP SpanKind values.
+KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_started")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._started = time.perf_counter_ns()
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        # Wall-clock start plus a monotonic duration, so clock adjustments cannot skew spans.
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1e9
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def root(self) -> Optional[Span]:
+        return next((span for span in self.spans if span.parent_id is None), None)
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("finnie_span", default=None)
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("finnie_trace", default=None)
+_recent: "deque[Trace]" = deque(maxlen=RECENT_TRACES)
+_recent_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any):
+    """Time the block as a span; yields it so attributes can be added as they become known."""
+    if not ENABLED:
+        yield _NOOP
+        return
+
+    trace = _current_trace.get()
+    trace_token = None
+    if trace is None:
+        trace = Trace()
+        trace_token = _current_trace.set(trace)
+    parent = _current_span.get()
+    current = Span(name, kind, trace.trace_id, parent.span_id if parent is not None else None, attributes)
+    span_token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(span_token)
+        trace.add(current)
+        if trace_token is not None:
+            _current_trace.reset(trace_token)
+            _finish_trace(trace)
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal"):
+    """Decorator: run the function inside a span (named after the function by default)."""
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(label, kind):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def tool_span(run):
+    """Decorator for ``BaseTool._run``: one span per tool call, named after the tool."""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        arguments = ", ".join([str(arg) for arg in args] + [f"{key}={value}" for key, value in kwargs.items()])
+        with span(f"tool {self.name}", **{"tool.name": self.name, "tool.arguments": arguments[:200]}):
+            return run(self, *args, **kwargs)
+    return wrapper
+
+
+def bind(function: Callable) -> Callable:
+    """Wrap ``function`` so it runs in the caller's tracing context, e.g. on a thread pool.
+
+    A context can only be entered by one thread at a time, so bind once per submitted call.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return context.run(function, *args, **kwargs)
+    return wrapper
+
+
+def payload_bytes(value: Any) -> int:
+    """Approximate size of fetched data: in-memory size for frames, pickled size otherwise."""
+    # pandas is only looked up, never imported here: if it is not loaded, the value is not a frame.
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if pd is not None and isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def recent_traces() -> List[Trace]:
+    with _recent_lock:
+        return list(_recent)
+
+
+def last_trace() -> Optional[Trace]:
+    with _recent_lock:
+        return _recent[-1] if _recent else None
+
+
+def _finish_trace(trace: Trace) -> None:
+    with _recent_lock:
+        _recent.append(trace)
+    if TRACE_DIR:
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            with open(os.path.join(TRACE_DIR, f"{trace.trace_id}.json"), "w") as f:
+                json.dump(to_otlp([trace]), f)
+        except Exception as e:
+            print(f"Error writing trace {trace.trace_id}: {e}")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces: Iterable[Trace]) -> Dict[str, Any]:
+    """Spans in the OTLP/JSON ``ExportTraceServiceRequest`` shape."""
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            spans.append({
+                "traceId": item.trace_id,
+                "spanId": item.span_id,
+                **({"parentSpanId": item.parent_id} if item.parent_id else {}),
+                "name": item.name,
+                "kind": KINDS.get(item.kind, 1),
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.end_ns or item.start_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items() if value is not None],
+                "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "finnie.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def summary(trace: Trace) -> str:
+    """Flame-style table: spans merged by call path, with count, total and self time.
+
+    Self time is a span's duration minus its children's; children that ran in
+    parallel can add up to more than their parent, in which case it is zero.
+    """
+    children: Dict[Optional[str], List[Span]] = {}
+    for item in trace.spans:
+        children.setdefault(item.parent_id, []).append(item)
+    root_total = sum(item.duration for item in children.get(None, [])) or 1.0
+
+    rows = []
+
+    def visit(spans: List[Span], depth: int) -> None:
+        groups: Dict[str, List[Span]] = {}
+        for item in spans:
+            groups.setdefault(item.name, []).append(item)
+        for name, group in sorted(groups.items(), key=lambda entry: -sum(item.duration for item in entry[1])):
+            nested = [child for item in group for child in children.get(item.span_id, [])]
+            total = sum(item.duration for item in group)
+            own = max(total - sum(child.duration for child in nested), 0.0)
+            hits = sum(1 for item in group if item.attributes.get("cache.hit") is True)
+            cache = f"{hits}/{len(group)}" if any("cache.hit" in item.attributes for item in group) else ""
+            rows.append(("  " * depth + name, len(group), total, own, total / root_total, cache))
+            visit(nested, depth + 1)
+
+    visit(children.get(None, []), 0)
+    width = max([len(row[0]) for row in rows] + [4])
+    lines = [f"{'span':<{width}} {'calls':>6} {'total s':>9} {'self s':>9} {'share':>6} {'cached':>7}"]
+    for name, calls, total, own, share, cache in rows:
+        lines.append(f"{name:<{width}} {calls:>6} {total:>9.3f} {own:>9.3f} {share:>6.1%} {cache:>7}")
+    return "\n".join(lines)
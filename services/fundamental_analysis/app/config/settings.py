@@ -0,0 +1,15 @@
+"""Service settings, read from the environment."""
+import os
+
+
+# Crews analysed at once; each crew also runs up to FINNIE_MAX_CONCURRENCY tasks in parallel.
+API_WORKERS = int(os.getenv("FINNIE_API_WORKERS", "2"))
+# Jobs waiting for a worker; submissions beyond this are rejected with 503 until the queue drains.
+API_MAX_QUEUE_DEPTH = int(os.getenv("FINNIE_API_MAX_QUEUE_DEPTH", "32"))
+# Seconds a finished job stays available for polling.
+API_JOB_TTL = int(os.getenv("FINNIE_API_JOB_TTL", str(6 * 60 * 60)))
+# Seconds between keep-alive comments on an idle event stream.
+API_EVENT_KEEPALIVE = float(os.getenv("FINNIE_API_EVENT_KEEPALIVE", "15"))
+# Load the crew, tools and stores (and these symbols' data) in the background at boot.
+API_PREWARM = os.getenv("FINNIE_PREWARM", "0") == "1"
+API_PREWARM_SYMBOLS = [symbol for symbol in os.getenv("FINNIE_PREWARM_SYMBOLS", "").split(",") if symbol]
@@ -0,0 +1,118 @@
+"""Runs analysis jobs on a bounded worker pool.
+
+Submissions go onto a bounded queue drained by a fixed number of workers;
+each worker runs one crew at a time on a thread, so the event loop stays free
+to serve status polls and event streams. A submission for a symbol that
+already has a queued or running job joins that job instead of starting another.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from config import settings
+from repository.jobs import JobRepository
+from schemas.analysis import FINISHED, Job
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its depth limit."""
+
+
+def run_crew(symbol: str, progress: Callable) -> str:
+    # Imported on first use: crewai and the tool stack are slow to import.
+    from crew import run_analysis
+    result = run_analysis(symbol, concurrent=True, progress=progress)
+    return getattr(result, "raw", str(result))
+
+
+def task_label(task) -> str:
+    return getattr(task, "name", None) or task.description[:60]
+
+
+class AnalysisController:
+    def __init__(self, repository: JobRepository, run: Callable[[str, Callable], str] = run_crew, workers: int = settings.API_WORKERS, max_queue_depth: int = settings.API_MAX_QUEUE_DEPTH):
+        self.repository = repository
+        self.run = run
+        self.workers = max(1, workers)
+        self.max_queue_depth = max_queue_depth
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, symbol: str) -> Tuple[Job, bool]:
+        """Queue an analysis of ``symbol``; returns the job and whether it was already in flight."""
+        existing = self.repository.in_flight(symbol)
+        if existing is not None:
+            return existing, True
+        if self._queue.full():
+            raise QueueFullError(f"{self._queue.qsize()} analyses are already waiting")
+        job = self.repository.create(symbol)
+        self._queue.put_nowait(job.id)
+        return job, False
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str) -> None:
+        job = self.repository.get(job_id)
+        self.repository.mark_running(job_id)
+
+        def progress(task, status):
+            self._loop.call_soon_threadsafe(self.repository.add_progress, job_id, task_label(task), status)
+
+        try:
+            result = await self._loop.run_in_executor(self._executor, partial(self.run, job.symbol, progress))
+        except Exception as e:
+            print(f"Error analysing {job.symbol}: {e}")
+            self.repository.finish(job_id, error=str(e))
+        else:
+            self.repository.finish(job_id, result=result)
+
+    async def events(self, job_id: str, keepalive: float = settings.API_EVENT_KEEPALIVE) -> AsyncIterator[str]:
+        """Server-sent events for a job: a snapshot, then progress and status updates until it finishes."""
+        job = self.repository.get(job_id)
+        queue = self.repository.subscribe(job_id)
+        try:
+            yield _sse("snapshot", job.model_dump(mode="json", exclude={"result"}))
+            if job.status in FINISHED:
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line; keeps proxies from closing an idle stream.
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event, data)
+                if event == "status" and data["status"] in {status.value for status in FINISHED}:
+                    return
+        finally:
+            self.repository.unsubscribe(job_id, queue)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
@@ -0,0 +1,79 @@
+"""HTTP API for the fundamental analysis crew.
+
+Run from the repository root with:
+    uvicorn main:app --app-dir services/fundamental_analysis/app
+"""
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import Body, FastAPI, Request
+
+# The crew and its tools import each other by plain module name.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents"))
+
+from config import settings
+from controller.analysis import AnalysisController
+from repository.jobs import JobRepository
+from router import analysis
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    controller = AnalysisController(JobRepository(ttl=settings.API_JOB_TTL))
+    await controller.start()
+    app.state.analysis = controller
+    app.state.prewarm = None
+    app.state.prewarm_timings = None
+    app.state.prewarm_error = None
+    if settings.API_PREWARM:
+        start_prewarm(app, settings.API_PREWARM_SYMBOLS)
+    try:
+        yield
+    finally:
+        await controller.stop()
+
+
+def start_prewarm(app: FastAPI, symbols: List[str]) -> asyncio.Task:
+    """Run ``startup.prewarm`` on a thread; the service keeps answering while it loads."""
+    from startup import prewarm
+
+    async def run():
+        app.state.prewarm_error = None
+        try:
+            app.state.prewarm_timings = await asyncio.to_thread(prewarm, symbols)
+        except Exception as e:
+            print(f"Error pre-warming: {e}")
+            app.state.prewarm_error = f"{type(e).__name__}: {e}"
+
+    app.state.prewarm = asyncio.create_task(run())
+    return app.state.prewarm
+
+
+app = FastAPI(title="Finnie fundamental analysis", lifespan=lifespan)
+app.include_router(analysis.router)
+
+
+@app.get("/health")
+async def health(request: Request):
+    controller: AnalysisController = request.app.state.analysis
+    state = request.app.state
+    return {
+        "status": "ok",
+        "queue_depth": controller.queue_depth,
+        "jobs": controller.repository.counts(),
+        # A pre-warm that raised is done but left nothing warm; its error is reported instead.
+        "warm": state.prewarm_timings is not None,
+        "prewarm_error": state.prewarm_error,
+    }
+
+
+@app.post("/prewarm", status_code=202)
+async def prewarm(request: Request, symbols: List[str] = Body(default=[], embed=True)):
+    """Load the crew, tools and stores (and the symbols' data) ahead of the first job."""
+    current = request.app.state.prewarm
+    if current is None or current.done():
+        start_prewarm(request.app, [symbol.upper() for symbol in symbols])
+    return {"status": "warming"}
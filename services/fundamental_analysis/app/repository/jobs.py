@@ -0,0 +1,88 @@
+"""In-memory job store with per-job event fan-out.
+
+Every method is called on the event loop thread; worker threads hand updates
+over with ``loop.call_soon_threadsafe``, so no locking is needed.
+"""
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+from schemas.analysis import FINISHED, Job, JobStatus, TaskProgress
+
+
+class JobRepository:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, str] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def create(self, symbol: str) -> Job:
+        self.prune()
+        job = Job(id=uuid.uuid4().hex, symbol=symbol, created_at=time.time())
+        self._jobs[job.id] = job
+        self._in_flight[symbol] = job.id
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def in_flight(self, symbol: str) -> Optional[Job]:
+        """The queued or running job for ``symbol``, if any."""
+        job_id = self._in_flight.get(symbol)
+        return self._jobs.get(job_id) if job_id else None
+
+    def mark_running(self, job_id: str) -> None:
+        job = self._jobs[job_id]
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        self._publish(job, "status", {"status": job.status.value})
+
+    def add_progress(self, job_id: str, task: str, status: str) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        progress = TaskProgress(task=task, status=status, at=time.time())
+        job.progress.append(progress)
+        self._publish(job, "progress", progress.model_dump())
+
+    def finish(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        job = self._jobs[job_id]
+        job.status = JobStatus.FAILED if error is not None else JobStatus.SUCCEEDED
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if self._in_flight.get(job.symbol) == job_id:
+            del self._in_flight[job.symbol]
+        self._publish(job, "status", {"status": job.status.value, "error": error})
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.status.value] += 1
+        return counts
+
+    def prune(self) -> List[str]:
+        """Forget finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return expired
+
+    def _publish(self, job: Job, event: str, data: dict) -> None:
+        for queue in self._subscribers.get(job.id, ()):
+            queue.put_nowait((event, data))
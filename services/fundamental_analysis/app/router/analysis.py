@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from config import settings
+from controller.analysis import AnalysisController, QueueFullError
+from schemas.analysis import AnalysisRequest, Job, JobAccepted
+
+
+router = APIRouter(prefix="/analyses", tags=["analysis"])
+
+
+def get_controller(request: Request) -> AnalysisController:
+    return request.app.state.analysis
+
+
+def _job(controller: AnalysisController, job_id: str) -> Job:
+    job = controller.repository.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No analysis job {job_id}")
+    return job
+
+
+@router.post("", status_code=202, response_model=JobAccepted)
+async def submit_analysis(body: AnalysisRequest, request: Request, response: Response, controller: AnalysisController = Depends(get_controller)):
+    """Queue an analysis and return immediately; poll the status URL or follow the events URL."""
+    try:
+        job, coalesced = controller.submit(body.symbol)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Analysis queue is full: {e}", headers={"Retry-After": "30"})
+
+    status_url = str(request.url_for("get_analysis", job_id=job.id))
+    response.headers["Location"] = status_url
+    return JobAccepted(
+        id=job.id,
+        symbol=job.symbol,
+        status=job.status,
+        coalesced=coalesced,
+        status_url=status_url,
+        events_url=str(request.url_for("analysis_events", job_id=job.id)),
+    )
+
+
+@router.get("/{job_id}", response_model=Job, name="get_analysis")
+async def get_analysis(job_id: str, controller: AnalysisController = Depends(get_controller)):
+    return _job(controller, job_id)
+
+
+@router.get("/{job_id}/events", name="analysis_events")
+async def analysis_events(job_id: str, controller: AnalysisController = Depends(get_controller)):
+    """Per-task progress as server-sent events; the stream ends when the job finishes."""
+    _job(controller, job_id)
+    return StreamingResponse(
+        controller.events(job_id, keepalive=settings.API_EVENT_KEEPALIVE),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
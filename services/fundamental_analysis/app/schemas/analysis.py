@@ -0,0 +1,51 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class AnalysisRequest(BaseModel):
+    symbol: str = Field(..., min_length=1, max_length=12, pattern=r"^[A-Za-z0-9.^=-]+$")
+
+    @field_validator("symbol")
+    @classmethod
+    def upper(cls, value: str) -> str:
+        return value.upper()
+
+
+class TaskProgress(BaseModel):
+    task: str
+    status: str
+    at: float
+
+
+class Job(BaseModel):
+    id: str
+    symbol: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: List[TaskProgress] = []
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobAccepted(BaseModel):
+    id: str
+    symbol: str
+    status: JobStatus
+    # True when the request joined a job already queued or running for the symbol.
+    coalesced: bool
+    status_url: str
+    events_url: str
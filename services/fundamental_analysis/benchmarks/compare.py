@@ -0,0 +1,55 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage:
+    python compare.py baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 if any timing got slower (or throughput lower) by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Tuple
+
+
+def headline(result: dict) -> Tuple[Optional[float], bool]:
+    """The value compared for a result and whether higher is better."""
+    if "symbols_per_second" in result:
+        return result["symbols_per_second"], True
+    return result.get("median"), False
+
+
+def compare(baseline: Dict[str, dict], candidate: Dict[str, dict], threshold: float) -> Dict[str, dict]:
+    rows = {}
+    for name in sorted(set(baseline) & set(candidate)):
+        before, higher_is_better = headline(baseline[name])
+        after, _ = headline(candidate[name])
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regression = -change > threshold if higher_is_better else change > threshold
+        rows[name] = {"before": before, "after": after, "change": change, "regression": regression}
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['meta']['commit']} -> {candidate['meta']['commit']}")
+    rows = compare(baseline["results"], candidate["results"], args.threshold)
+    for name, row in rows.items():
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{name:32} {row['before']:>12.4f} {row['after']:>12.4f} {row['change']:>+8.1%} {flag}")
+    sys.exit(1 if any(row["regression"] for row in rows.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Recorded yfinance responses for the offline benchmarks.
+
+Each response is pickled to ``{root}/{dataset}/{key}.pkl``. Histories are
+recorded once at the longest period the tools use and sliced on replay.
+
+Usage (needs network access):
+    python fixtures.py AAPL MSFT NVDA --output fixtures
+"""
+import argparse
+import os
+import pickle
+import sys
+from typing import Any, Iterable, List
+from urllib.parse import quote
+
+import yfinance as yf
+
+AGENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "agents")
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
+
+from tools.categories import format_category
+
+
+RECORD_PERIOD = "10y"
+BENCHMARK_SYMBOLS = ["^GSPC"]
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SYMBOL_DATASETS = {
+    "info": lambda ticker: ticker.info,
+    "history": lambda ticker: ticker.history(period=RECORD_PERIOD, interval="1d"),
+    "financials": lambda ticker: ticker.financials,
+    "balance_sheet": lambda ticker: ticker.balance_sheet,
+    "cash_flow": lambda ticker: ticker.cash_flow,
+    "news": lambda ticker: ticker.get_news(),
+}
+CATEGORY_DATASETS = {
+    "top_companies": lambda category: category.top_companies,
+    "research_reports": lambda category: category.research_reports,
+}
+
+
+def fixture_path(root: str, dataset: str, key: str) -> str:
+    return os.path.join(root, dataset, quote(key, safe="") + ".pkl")
+
+
+def save(root: str, dataset: str, key: str, value: Any) -> None:
+    path = fixture_path(root, dataset, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(value, f)
+
+
+def read_bytes(root: str, dataset: str, key: str) -> bytes:
+    with open(fixture_path(root, dataset, key), "rb") as f:
+        return f.read()
+
+
+def record_symbol(root: str, symbol: str, datasets: Iterable[str] = SYMBOL_DATASETS) -> dict:
+    ticker = yf.Ticker(symbol)
+    info = {}
+    for dataset in datasets:
+        try:
+            value = SYMBOL_DATASETS[dataset](ticker)
+        except Exception as e:
+            print(f"Error recording {dataset} for {symbol}: {e}")
+            continue
+        save(root, dataset, symbol, value)
+        if dataset == "info":
+            info = value or {}
+    return info
+
+
+def record(symbols: List[str], root: str = DEFAULT_FIXTURES_DIR, peers: int = 5) -> None:
+    """Record every dataset the tools read for ``symbols``, their sector/industry and the info of their top peers."""
+    peer_symbols = set()
+    for symbol in dict.fromkeys(s.upper() for s in symbols):
+        info = record_symbol(root, symbol)
+        for kind, category_class in (("sector", yf.Sector), ("industry", yf.Industry)):
+            name = info.get(kind)
+            if not name:
+                continue
+            key = format_category(name)
+            category = category_class(key)
+            for dataset, fetch in CATEGORY_DATASETS.items():
+                try:
+                    value = fetch(category)
+                except Exception as e:
+                    print(f"Error recording {kind} {dataset} for {key}: {e}")
+                    continue
+                save(root, f"{kind}_{dataset}", key, value)
+                if dataset == "top_companies" and value is not None:
+                    peer_symbols.update(list(value.index)[:peers])
+
+    for symbol in BENCHMARK_SYMBOLS:
+        record_symbol(root, symbol, ["history"])
+    for symbol in sorted(peer_symbols - {s.upper() for s in symbols}):
+        record_symbol(root, symbol, ["info"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record yfinance responses for the offline benchmarks.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--output", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--peers", type=int, default=5, help="Top companies per sector/industry whose info is recorded")
+    args = parser.parse_args()
+    record(args.symbols, args.output, args.peers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Drop-in for the parts of ``yfinance`` the tools use, served from the stand-in server."""
+import pickle
+import threading
+from http.client import HTTPConnection
+from typing import List, Optional, Union
+from urllib.parse import quote, urlparse
+
+import pandas as pd
+
+
+PERIODS = {"d": "days", "mo": "months", "y": "years"}
+DOWNLOAD_COLUMNS = ["Close", "High", "Low", "Open", "Volume"]
+
+
+def period_start(period: str, end: pd.Timestamp) -> Optional[pd.Timestamp]:
+    if period in (None, "", "max"):
+        return None
+    for suffix, unit in PERIODS.items():
+        if period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            return end - pd.DateOffset(**{unit: int(period[: -len(suffix)])})
+    raise ValueError(f"Unsupported period {period}")
+
+
+class ReplayClient:
+    """Fixture fetches over one keep-alive connection per thread."""
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self._local = threading.local()
+
+    def get(self, dataset: str, key: str):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request("GET", f"/data/{dataset}/{quote(key, safe='')}")
+            response = connection.getresponse()
+            body = response.read()
+        except OSError:
+            self._local.connection = None
+            raise
+        if response.status == 404:
+            raise KeyError(f"No {dataset} fixture for {key}")
+        return pickle.loads(body)
+
+
+class ReplayTicker:
+    def __init__(self, client: ReplayClient, symbol: str):
+        self.client = client
+        self.ticker = symbol.upper()
+
+    @property
+    def info(self) -> dict:
+        return self.client.get("info", self.ticker)
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return self.client.get("financials", self.ticker)
+
+    @property
+    def balance_sheet(self) -> pd.DataFrame:
+        return self.client.get("balance_sheet", self.ticker)
+
+    @property
+    def cash_flow(self) -> pd.DataFrame:
+        return self.client.get("cash_flow", self.ticker)
+
+    def get_news(self, *args, **kwargs) -> list:
+        return self.client.get("news", self.ticker)
+
+    def history(self, period: Optional[str] = "1mo", interval: str = "1d", start=None, end=None, **kwargs) -> pd.DataFrame:
+        frame = self.client.get("history", self.ticker)
+        if frame.empty:
+            return frame
+        index = frame.index
+        if start is not None:
+            frame = frame[index >= pd.Timestamp(start).tz_localize(index.tz)]
+        elif period is not None:
+            first = period_start(period, index[-1])
+            if first is not None:
+                frame = frame[index > first]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end).tz_localize(index.tz)]
+        return frame
+
+
+class ReplayCategory:
+    def __init__(self, client: ReplayClient, kind: str, key: str):
+        self.client = client
+        self.kind = kind
+        self.key = key
+
+    @property
+    def top_companies(self) -> pd.DataFrame:
+        return self.client.get(f"{self.kind}_top_companies", self.key)
+
+    @property
+    def research_reports(self) -> list:
+        return self.client.get(f"{self.kind}_research_reports", self.key)
+
+
+class ReplayYFinance:
+    """Stands in for the ``yfinance`` module: ``market_data.yf = ReplayYFinance(url)``."""
+
+    def __init__(self, url: str):
+        self.client = ReplayClient(url)
+
+    def Ticker(self, symbol: str) -> ReplayTicker:
+        return ReplayTicker(self.client, symbol)
+
+    def Sector(self, key: str) -> ReplayCategory:
+        return ReplayCategory(self.client, "sector", key)
+
+    def Industry(self, key: str) -> ReplayCategory:
+        return ReplayCategory(self.client, "industry", key)
+
+    def download(self, tickers: Union[str, List[str]], period: Optional[str] = "1mo", interval: str = "1d", start=None, **kwargs) -> pd.DataFrame:
+        """Like ``yf.download``: (Price, Ticker) columns and a tz-naive date index, missing symbols dropped."""
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        frames = {}
+        for symbol in symbols:
+            try:
+                frame = self.Ticker(symbol).history(period=period, interval=interval, start=start)
+            except KeyError as e:
+                print(f"Error downloading {symbol}: {e}")
+                continue
+            frame = frame.reindex(columns=DOWNLOAD_COLUMNS)
+            frame.index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+            frames[symbol.upper()] = frame
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1, level=0)
@@ -0,0 +1,196 @@
+"""Offline benchmarks for the tools, a full analysis and batch throughput.
+
+Recorded fixtures (see fixtures.py) are replayed through the stand-in server
+with injected latency, and the crew talks to its stub Ollama endpoint, so runs
+are reproducible without network access or a model. Every cache and store
+lives in a scratch directory; "cold" samples start from empty ones.
+
+Usage:
+    python run.py --symbols AAPL MSFT --latency-ms 50 --llm-latency-ms 200 --output results.json
+    python compare.py baseline.json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from fixtures import AGENTS_DIR, DEFAULT_FIXTURES_DIR
+from standin import StandInServer
+
+
+# Registry names of the tools whose _run is timed.
+TOOLS = ["competitor", "earnings", "risk", "sentiment", "technical"]
+DEFAULT_CONCURRENCY = [1, 2, 4, 8]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples)
+    return {
+        "runs": len(values),
+        "median": round(float(np.median(values)), 6),
+        "mean": round(float(values.mean()), 6),
+        "p95": round(float(np.percentile(values, 95)), 6),
+        "min": round(float(values.min()), 6),
+        "max": round(float(values.max()), 6),
+    }
+
+
+def timed(call: Callable) -> float:
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def configure_environment(scratch: str, server: StandInServer) -> None:
+    """Point every store, cache and the LLM at the scratch directory and the stand-in server; must run before the imports."""
+    os.environ["FINNIE_CACHE_PATH"] = os.path.join(scratch, "market_data.sqlite")
+    os.environ["FINNIE_PRICE_DIR"] = os.path.join(scratch, "prices")
+    os.environ["FINNIE_STATEMENTS_PATH"] = os.path.join(scratch, "statements.npz")
+    os.environ["FINNIE_INDICATOR_PATH"] = os.path.join(scratch, "indicators.sqlite")
+    os.environ["FINNIE_LLM_CACHE_PATH"] = os.path.join(scratch, "llm_cache.sqlite")
+    os.environ["FINNIE_OLLAMA_URL"] = server.url
+    os.environ.setdefault("SERPER_API_KEY", "benchmark")
+    # The stand-in server does not rate-limit; keep the client's throttle out of the timings.
+    os.environ.setdefault("FINNIE_YAHOO_RATE", "1000")
+    os.environ.setdefault("FINNIE_YAHOO_BURST", "1000")
+    if AGENTS_DIR not in sys.path:
+        sys.path.insert(0, AGENTS_DIR)
+
+    from tools import market_data
+    from replay import ReplayYFinance
+    market_data.yf = ReplayYFinance(server.url)
+
+
+def reset_state(scratch: str) -> None:
+    """Fresh, empty caches and stores for the next cold sample."""
+    from tools import benchmarks, fetch_client, indicators, market_data, news_index, price_store, risk_engine, statements
+
+    state = tempfile.mkdtemp(dir=scratch)
+    market_data.set_cache(market_data.MarketDataCache(path=os.path.join(state, "market_data.sqlite")))
+    market_data._tickers.clear()
+    fetch_client._upstreams.clear()
+    benchmarks._benchmarks.clear()
+    price_store._store = price_store.PriceStore(root=os.path.join(state, "prices"))
+    statements._store = statements.StatementStore(path=os.path.join(state, "statements.npz"))
+    indicators._engine = indicators.IndicatorEngine(path=os.path.join(state, "indicators.sqlite"))
+    risk_engine._engine = None
+    news_index._index = news_index.NewsIndex(path=os.path.join(state, "news.sqlite"))
+    if "crew" in sys.modules:
+        from llm_cache import ResponseCache
+        sys.modules["crew"].get_llm().response_cache = ResponseCache(path=os.path.join(state, "llm_cache.sqlite"))
+
+
+def bench_tools(symbols: List[str], repeat: int, scratch: str) -> Dict[str, dict]:
+    from tools import registry
+
+    results = {}
+    for name in TOOLS:
+        tool = registry.get_tool(name)
+        cold, warm = [], []
+        for _ in range(repeat):
+            for symbol in symbols:
+                reset_state(scratch)
+                cold.append(timed(lambda: tool._run(symbol)))
+                warm.append(timed(lambda: tool._run(symbol)))
+        results[f"tool.{name}.cold"] = summarize(cold)
+        results[f"tool.{name}.warm"] = summarize(warm)
+    return results
+
+
+def bench_analysis(symbols: List[str], repeat: int, scratch: str) -> Dict[str, dict]:
+    from crew import run_analysis
+
+    results = {}
+    for label, concurrent in (("concurrent", True), ("sequential", False)):
+        samples = []
+        for _ in range(repeat):
+            for symbol in symbols:
+                reset_state(scratch)
+                samples.append(timed(lambda: run_analysis(symbol, concurrent=concurrent)))
+        results[f"analysis.{label}"] = summarize(samples)
+    return results
+
+
+def bench_batch(symbols: List[str], levels: List[int], scratch: str) -> Dict[str, dict]:
+    from batch import run_batch
+
+    results = {}
+    for workers in levels:
+        reset_state(scratch)
+        output = os.path.join(scratch, f"batch_{workers}.jsonl")
+        start = time.perf_counter()
+        records = list(run_batch(symbols, output, workers=workers, resume=False))
+        elapsed = time.perf_counter() - start
+        results[f"batch.workers_{workers}"] = {
+            "symbols": len(records),
+            "errors": sum(record["status"] != "ok" for record in records),
+            "seconds": round(elapsed, 6),
+            "symbols_per_second": round(len(records) / elapsed, 6),
+        }
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks against recorded fixtures.")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Symbols with recorded fixtures")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Injected delay per data request")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="Injected delay per LLM call")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="Batch worker counts to measure")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["tools", "analysis", "batch"])
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    server = StandInServer(args.fixtures, latency=args.latency_ms / 1000, llm_latency=args.llm_latency_ms / 1000).start()
+    scratch = tempfile.mkdtemp(prefix="finnie-bench-")
+    symbols = [symbol.upper() for symbol in args.symbols]
+    try:
+        configure_environment(scratch, server)
+        results = {}
+        if "tools" not in args.skip:
+            results.update(bench_tools(symbols, args.repeat, scratch))
+        if "analysis" not in args.skip:
+            results.update(bench_analysis(symbols, args.repeat, scratch))
+        if "batch" not in args.skip:
+            results.update(bench_batch(symbols, args.concurrency, scratch))
+    finally:
+        server.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "symbols": symbols,
+            "latency_ms": args.latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "repeat": args.repeat,
+            "standin_requests": server.requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, result in results.items():
+        print(f"{name:32} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
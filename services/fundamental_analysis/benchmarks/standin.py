@@ -0,0 +1,99 @@
+"""Local stand-in for Yahoo Finance and Ollama.
+
+``GET /data/{dataset}/{key}`` returns a recorded fixture after the injected
+data latency. ``/api/generate`` and ``/api/chat`` answer like Ollama with a
+fixed final answer after the injected LLM latency, so crew runs complete
+without a model.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from fixtures import read_bytes
+
+
+DEFAULT_ANSWER = "Thought: I now can give a great answer\nFinal Answer: Hold. Benchmark stand-in response."
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real services.
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "data":
+            time.sleep(self.server.latency)
+            try:
+                body = read_bytes(self.server.fixtures, parts[1], unquote(parts[2]))
+            except FileNotFoundError:
+                return self._send(404, b"", "application/octet-stream")
+            self.server.count("data")
+            return self._send(200, body, "application/octet-stream")
+        if self.path == "/api/tags":
+            return self._json({"models": [{"name": self.server.model, "model": self.server.model}]})
+        self._send(404, b"", "text/plain")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/show":
+            return self._json({"modelfile": "", "parameters": "", "template": "{{ .Prompt }}", "details": {}, "model_info": {}})
+        if self.path not in ("/api/generate", "/api/chat"):
+            return self._send(404, b"", "text/plain")
+
+        time.sleep(self.server.llm_latency)
+        self.server.count("llm")
+        response = {
+            "model": request.get("model", self.server.model),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": len(json.dumps(request)) // 4,
+            "eval_count": len(self.server.answer) // 4,
+        }
+        if self.path == "/api/chat":
+            response["message"] = {"role": "assistant", "content": self.server.answer}
+        else:
+            response["response"] = self.server.answer
+        self._json(response)
+
+    def _json(self, payload):
+        self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures: str, latency: float = 0.0, llm_latency: float = 0.0, answer: str = DEFAULT_ANSWER, model: str = "gemma2:2b", port: int = 0):
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.llm_latency = llm_latency
+        self.answer = answer
+        self.model = model
+        self.requests = {"data": 0, "llm": 0}
+        self._counter_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, kind: str) -> None:
+        with self._counter_lock:
+            self.requests[kind] += 1
+
+    def start(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, name="standin", daemon=True).start()
+        return self
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The agents and their tools import each other by plain module name.
+AGENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "agents")
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
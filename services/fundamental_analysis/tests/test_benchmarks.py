@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from tools import benchmarks
+
+
+@pytest.mark.parametrize("now, session", [
+    ("2024-04-02 12:00", "2024-04-02"),
+    # Before the open the latest bar is the previous session's.
+    ("2024-04-02 09:00", "2024-04-01"),
+    ("2024-04-06 12:00", "2024-04-05"),
+    ("2024-04-08 08:00", "2024-04-05"),
+    # Good Friday.
+    ("2024-03-29 12:00", "2024-03-28"),
+    # Independence Day on a Saturday is observed the Friday before.
+    ("2026-07-03 12:00", "2026-07-02"),
+    # A Saturday New Year's Day is not observed on the Friday.
+    ("2021-12-31 12:00", "2021-12-31"),
+    ("2024-06-19 12:00", "2024-06-18"),
+    ("2021-06-18 12:00", "2021-06-18"),
+])
+def test_last_session_date(now, session):
+    assert benchmarks.last_session_date(pd.Timestamp(now)) == session
+
+
+def test_last_session_date_uses_exchange_time():
+    # 01:00 UTC on Tuesday is still Monday evening in New York.
+    assert benchmarks.last_session_date(pd.Timestamp("2024-04-02 01:00", tz="UTC")) == "2024-04-01"
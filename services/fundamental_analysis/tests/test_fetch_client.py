@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from tools import fetch_client
+
+
+class Unavailable(Exception):
+    def __init__(self):
+        super().__init__("Service Unavailable")
+        self.response = type("Response", (), {"status_code": 503})()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # Backoff long enough that an unbounded retry loop would outlive the test's timeout.
+    monkeypatch.setattr(fetch_client, "backoff_delay", lambda attempt: 5.0)
+    return fetch_client.Upstream("test", rate=100, burst=10, max_retries=4)
+
+
+def test_gather_stops_retrying_at_its_deadline(upstream):
+    attempts = []
+
+    def failing():
+        attempts.append(time.monotonic())
+        raise Unavailable()
+
+    started = time.monotonic()
+    results = fetch_client.gather({"slow": lambda: upstream.call(failing)}, timeout=0.3)
+    assert results == {}
+    # The abandoned call gives up instead of sleeping through its backoff on a pool thread.
+    deadline = time.monotonic() + 2
+    while upstream.counts["failures"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert upstream.counts["failures"] == 1
+    assert upstream.counts["retries"] == 0
+    assert len(attempts) == 1
+    assert time.monotonic() - started < 1
+
+
+def test_token_wait_respects_deadline():
+    bucket = fetch_client.TokenBucket(rate=1, burst=1)
+    assert bucket.acquire() == 0
+    assert bucket.acquire(deadline=time.monotonic() + 0.1) is None
+    bucket.pause(10)
+    assert bucket.acquire(deadline=time.monotonic() + 5) is None
+
+
+def test_calls_without_deadline_retry_as_before(upstream, monkeypatch):
+    monkeypatch.setattr(fetch_client, "backoff_delay", lambda attempt: 0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Unavailable()
+        return "ok"
+
+    assert upstream.call(flaky) == "ok"
+    assert upstream.counts["retries"] == 2
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools import indicators
+
+DATES = pd.bdate_range("2024-01-02", periods=260)
+CLOSES = pd.Series(100 + np.cumsum(np.random.default_rng(0).normal(0, 1, len(DATES))), index=DATES)
+
+
+def assert_same_state(actual, expected):
+    assert actual.last_date == expected.last_date
+    assert actual.count == expected.count
+    assert actual.head == expected.head
+    np.testing.assert_allclose(actual.closes, expected.closes)
+    for window in expected.sma_windows:
+        assert np.isclose(actual.sma_sums[window], expected.sma_sums[window])
+    assert np.isclose(actual.bollinger_mean, expected.bollinger_mean)
+    assert np.isclose(actual.gain_sum, expected.gain_sum)
+
+
+def test_concurrent_updates_apply_each_bar_once(monkeypatch):
+    expected = indicators.IndicatorEngine(path=None)
+    expected.update("AAPL", CLOSES.iloc[:200])
+    expected.update("AAPL", CLOSES)
+
+    engine = indicators.IndicatorEngine(path=None)
+    engine.update("AAPL", CLOSES.iloc[:200])
+    push = indicators.IndicatorState.push
+
+    def slow_push(self, date, close):
+        # Widen the window between reading the state and storing it.
+        time.sleep(0.001)
+        push(self, date, close)
+
+    monkeypatch.setattr(indicators.IndicatorState, "push", slow_push)
+    start = threading.Barrier(4)
+
+    def update():
+        start.wait()
+        engine.update("aapl", CLOSES)
+
+    threads = [threading.Thread(target=update) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_same_state(engine.get_state("AAPL"), expected.get_state("AAPL"))
+
+
+def test_update_does_not_mutate_state_readers_hold():
+    engine = indicators.IndicatorEngine(path=None)
+    before = engine.update("AAPL", CLOSES.iloc[:200])
+    last_date = before.last_date
+    after = engine.update("AAPL", CLOSES)
+    assert before.last_date == last_date
+    assert after.last_date == DATES[-1]
+    assert engine.get_state("AAPL") is after
@@ -0,0 +1,20 @@
+import time
+
+from tools.market_data import MarketDataCache
+
+
+def test_resident_lists_fresh_in_memory_symbols_most_recent_first(tmp_path):
+    path = str(tmp_path / "market_data.sqlite")
+    cache = MarketDataCache(path=path)
+    now = time.time()
+    cache.put(("OLD", "info", "", ""), {}, fetched_at=now - cache.ttl("info") - 1)
+    cache.put(("MSFT", "info", "", ""), {})
+    cache.put(("AAPL", "history", "1y", "1d"), {})
+    cache.put(("AAPL", "info", "", ""), {})
+    cache.put(("GOOG", "info", "", ""), {})
+
+    assert cache.resident("info") == ["GOOG", "AAPL", "MSFT"]
+    assert cache.resident("info", limit=2) == ["GOOG", "AAPL"]
+    # Another process's memory starts empty, whatever the shared file holds.
+    assert MarketDataCache(path=path).resident("info") == []
+    assert "OLD" in MarketDataCache(path=path).symbols("info")
@@ -0,0 +1,68 @@
+import pytest
+
+from tools import news_index, sentiment_engine
+from tools.news_index import NewsIndex, parse_article
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def engine(monkeypatch):
+    monkeypatch.setattr(sentiment_engine, "_engine", sentiment_engine.LexiconSentimentEngine({"good": 0.7, "bad": -0.7}))
+
+
+def item(id, title, published_at=None):
+    content = {"id": id, "title": title, "summary": title}
+    if published_at is not None:
+        content["providerPublishTime"] = published_at
+    return {"content": content}
+
+
+def test_undated_articles_are_skipped():
+    assert parse_article(item("a", "Good quarter")) is None
+    assert parse_article(item("a", "Good quarter", NOW)).published_at == NOW
+
+
+def test_late_and_out_of_order_articles_are_ingested_once():
+    index = NewsIndex(path=None)
+    articles = [parse_article(item(id, title, at)) for id, title, at in [
+        ("new", "Orders look good for the chip maker", NOW),
+        ("old", "Bad weather hurts retail foot traffic", NOW - 3600),
+    ]]
+    assert index.ingest("ACME", articles) == {"new": 2, "linked": 0, "duplicate": 0}
+    assert index.watermark("ACME")[0] == NOW
+
+    # A story published before the mark that the feed only lists now, next to ones already ingested.
+    late = parse_article(item("late", "Regulator clears the merger after long review", NOW - 7200))
+    assert index.ingest("ACME", [articles[0], late, articles[1]]) == {"new": 1, "linked": 0, "duplicate": 0}
+    assert index.watermark("ACME")[0] == NOW
+    assert index.aggregate(news_index.TICKER, "ACME", now=NOW).articles == 3
+
+    # Already indexed under another ticker: linked, not rescored.
+    assert index.ingest("OTHER", [late, late]) == {"new": 0, "linked": 1, "duplicate": 0}
+    assert index.stats()["articles"] == 3
+
+
+def test_articles_are_scored_outside_the_lock_and_rechecked(monkeypatch):
+    index = NewsIndex(path=None)
+    story = parse_article(item("story", "Good results lift the chip maker", NOW))
+    lexicon = sentiment_engine.LexiconSentimentEngine({"good": 0.7, "bad": -0.7})
+
+    class Racing(sentiment_engine.SentimentEngine):
+        calls = 0
+
+        def _score_batch(self, texts):
+            assert not index._lock.locked()
+            Racing.calls += 1
+            if Racing.calls == 1:
+                # Another ticker indexes the same story while this one is being scored.
+                monkeypatch.setattr(sentiment_engine, "_engine", lexicon)
+                assert index.ingest("OTHER", [story]) == {"new": 1, "linked": 0, "duplicate": 0}
+                monkeypatch.setattr(sentiment_engine, "_engine", self)
+            return lexicon._score_batch(texts)
+
+    monkeypatch.setattr(sentiment_engine, "_engine", Racing())
+    assert index.ingest("ACME", [story]) == {"new": 0, "linked": 1, "duplicate": 0}
+    assert Racing.calls == 1
+    assert index.stats()["articles"] == 1
+    assert index.aggregate(news_index.TICKER, "ACME", now=NOW).sentiment_score == pytest.approx(0.7)
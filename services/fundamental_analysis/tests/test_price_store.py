@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from tools import market_data, price_store
+from tools.price_store import PriceStore
+
+
+@pytest.mark.parametrize("symbol", ["AAPL", "brk.b", "^GSPC", "EURUSD=X", "RDS-A"])
+def test_path_accepts_tickers(tmp_path, symbol):
+    store = PriceStore(root=str(tmp_path))
+    assert store.path(symbol) == str(tmp_path / f"{symbol.upper()}.prices")
+
+
+@pytest.mark.parametrize("symbol", ["", "../etc/passwd", "AAPL/../../x", "..", "C:\\x", "AAPL\x00", "A" * 13])
+def test_path_rejects_other_names(tmp_path, symbol):
+    store = PriceStore(root=str(tmp_path))
+    with pytest.raises(ValueError):
+        store.path(symbol)
+    assert store.update_many([symbol]) == {}
+
+
+def bars(dates, closes) -> pd.DataFrame:
+    index = pd.DatetimeIndex(pd.to_datetime(dates))
+    return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 100}, index=index)
+
+
+def test_update_many_batches_downloads(tmp_path, monkeypatch):
+    calls = []
+    history = {
+        "AAPL": bars(["2024-01-02", "2024-01-03", "2024-01-04"], [10.0, 11.0, 12.0]),
+        "MSFT": bars(["2024-01-02", "2024-01-03", "2024-01-04"], [20.0, 21.0, 22.0]),
+        "GOOG": bars(["2024-01-02", "2024-01-04"], [30.0, 31.0]),
+    }
+
+    def get_history_many(symbols, period=None, start=None):
+        calls.append((sorted(symbols), period, start))
+        return {symbol: frame[frame.index >= start] if start is not None else frame.iloc[:-1] for symbol, frame in history.items() if symbol in symbols}
+
+    monkeypatch.setattr(market_data, "get_history_many", get_history_many)
+    store = PriceStore(root=str(tmp_path), refresh_interval=0)
+    assert store.update_many(["aapl", "MSFT", "GOOG"]) == {"AAPL": 2, "MSFT": 2, "GOOG": 1}
+    assert calls == [(["AAPL", "GOOG", "MSFT"], price_store.INITIAL_PERIOD, None)]
+
+    # AAPL and MSFT share a last date, so they share a download; a restated bar rewrites the file.
+    calls.clear()
+    history["MSFT"] = bars(["2024-01-02", "2024-01-03", "2024-01-04"], [10.0, 10.5, 11.0])
+    monkeypatch.setattr(market_data, "get_history", lambda symbol, period: history[symbol])
+    monkeypatch.setattr(market_data, "get_cache", lambda: market_data.MarketDataCache(path=None))
+    assert store.update_many(["AAPL", "MSFT", "GOOG"]) == {"AAPL": 1, "MSFT": 3, "GOOG": 1}
+    assert calls == [(["AAPL", "MSFT"], None, pd.Timestamp("2024-01-03")), (["GOOG"], None, pd.Timestamp("2024-01-02"))]
+    assert store.records("AAPL")["close"].tolist() == [10.0, 11.0, 12.0]
+    assert store.records("MSFT")["close"].tolist() == [10.0, 10.5, 11.0]
+
+
+def test_update_many_fetches_symbols_left_out_of_the_download_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_data, "get_history_many", lambda symbols, period=None, start=None: {})
+    monkeypatch.setattr(market_data, "get_history", lambda symbol, period: bars(["2024-01-02"], [5.0]))
+    store = PriceStore(root=str(tmp_path), refresh_interval=0)
+    assert store.update_many(["AAPL"]) == {"AAPL": 1}
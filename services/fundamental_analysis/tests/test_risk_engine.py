@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import benchmarks, price_store, risk_engine
+
+WINDOW = 30
+DATES = pd.bdate_range("2024-01-02", periods=90)
+
+
+class FakeBenchmark:
+    def __init__(self, closes: pd.Series):
+        self.closes = closes
+
+    def close(self, start=None) -> pd.Series:
+        return self.closes
+
+
+class FakeStore:
+    def __init__(self, closes: pd.DataFrame):
+        self.closes = closes
+        self.on_update = None
+
+    def update_many(self, symbols, force=False):
+        if self.on_update:
+            self.on_update()
+        return {}
+
+    def window(self, symbol, start=None, end=None):
+        series = self.closes[symbol].dropna()
+        records = np.zeros(len(series), dtype=price_store.RECORD)
+        records["date"] = series.index.values.astype("datetime64[ns]").astype(np.int64)
+        records["close"] = series.to_numpy()
+        return records
+
+
+@pytest.fixture
+def market(monkeypatch):
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.01, (len(DATES), 6))
+    returns[:, 1:] += 0.8 * returns[:, :1]
+    closes = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=DATES, columns=["^GSPC", "A", "B", "C", "D", "E"])
+    # Gaps and a late listing, so the covariances are pairwise.
+    closes.loc[DATES[50:53], "B"] = np.nan
+    closes.loc[:DATES[60], "D"] = np.nan
+
+    benchmark = FakeBenchmark(closes["^GSPC"].iloc[:40])
+    store = FakeStore(closes)
+    monkeypatch.setattr(benchmarks, "get_benchmark", lambda symbol=benchmarks.SP500: benchmark)
+    monkeypatch.setattr(price_store, "get_store", lambda: store)
+    return closes, benchmark, store
+
+
+def expected_covariance(closes: pd.DataFrame, last: int, symbols) -> pd.DataFrame:
+    returns = closes[["^GSPC"] + symbols].iloc[:last].pct_change(fill_method=None)
+    return returns.iloc[-WINDOW:].cov()
+
+
+def assert_matches(engine, closes, last, symbols):
+    expected = expected_covariance(closes, last, symbols)
+    columns = [engine.symbols.index(symbol) for symbol in ["^GSPC"] + symbols]
+    actual = engine.sample_covariance()[np.ix_(columns, columns)]
+    np.testing.assert_allclose(actual, expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_matches_np_cov_after_push_and_downdate(market):
+    closes, benchmark, _ = market
+    engine = risk_engine.RiskEngine(window=WINDOW, refresh_interval=0)
+    engine.track(["A", "C"])
+    rows = closes[["^GSPC", "A", "C"]].iloc[:40].pct_change().iloc[-WINDOW:].to_numpy()
+    np.testing.assert_allclose(engine.sample_covariance(), np.cov(rows.T), rtol=1e-9)
+
+    # Twenty new days: each is pushed and the oldest day downdated.
+    benchmark.closes = closes["^GSPC"].iloc[:60]
+    engine.track(["A", "C"])
+    rows = closes[["^GSPC", "A", "C"]].iloc[:60].pct_change().iloc[-WINDOW:].to_numpy()
+    np.testing.assert_allclose(engine.sample_covariance(), np.cov(rows.T), rtol=1e-9)
+
+
+def test_new_columns_match_a_full_recompute(market):
+    closes, benchmark, _ = market
+    engine = risk_engine.RiskEngine(window=WINDOW, refresh_interval=0)
+    engine.track(["A"])
+    benchmark.closes = closes["^GSPC"].iloc[:75]
+    engine.track(["A", "B", "D"])
+    assert_matches(engine, closes, 75, ["A", "B", "D"])
+    returns = closes[["^GSPC", "B"]].iloc[:75].pct_change(fill_method=None).iloc[-WINDOW:].dropna()
+    assert engine.beta(["B"])[0] == pytest.approx(returns.cov().iloc[1, 0] / returns["^GSPC"].var())
+
+
+def test_evicts_least_recently_requested(market):
+    closes, _, _ = market
+    engine = risk_engine.RiskEngine(window=WINDOW, refresh_interval=0, max_symbols=2)
+    engine.track(["A", "B"])
+    engine.track(["A"])
+    engine.track(["C"])
+    assert engine.symbols == ["^GSPC", "A", "C"]
+    assert engine.sample_covariance().shape == (3, 3)
+    assert_matches(engine, closes, 40, ["A", "C"])
+
+
+def test_restated_history_replaces_the_column(market):
+    closes, _, store = market
+    engine = risk_engine.RiskEngine(window=WINDOW, refresh_interval=0)
+    engine.track(["A", "C"])
+    store.closes = closes.copy()
+    store.closes.loc[DATES[:25], "A"] /= 2
+    engine.track(["A"])
+    assert_matches(engine, store.closes, 40, ["A", "C"])
+
+
+def test_store_updates_run_outside_the_lock(market):
+    _, _, store = market
+    engine = risk_engine.RiskEngine(window=WINDOW, refresh_interval=0)
+    acquired = []
+
+    def try_lock():
+        thread = threading.Thread(target=lambda: acquired.append(engine._lock.acquire(timeout=1) and engine._lock.release() is None))
+        thread.start()
+        thread.join()
+
+    store.on_update = try_lock
+    engine.track(["A"])
+    assert acquired == [True]
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from tools.sentiment_engine import LexiconSentimentEngine, SentimentEngine, TokenBatch
+
+# TextBlob(text).sentiment.polarity for each headline.
+TEXTBLOB_SCORES = {
+    "Shares fall sharply after very bad earnings miss": -0.5175,
+    "Apple posts extremely strong results as services revenue hits a record": 0.433333,
+    "Analysts say the outlook is not very good": -0.269231,
+    "Tesla stock slides on really weak deliveries": -0.375,
+    "Investors cheer surprisingly good guidance": 0.7,
+    "Regulators say the merger is really not good for consumers": -0.35,
+    "A bad quarter": -0.7,
+    "Results were not a good sign": -0.35,
+    "Results were not the good sign": 0.7,
+    "Guidance is very much a good surprise": 0.7,
+    "Outlook is not bad": 0.35,
+    "Truly not terrible quarter": 0.5,
+    "Extremely weak demand and a strong dollar": 0.029167,
+    "Analysts never expected such great results": 0.283333,
+}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return LexiconSentimentEngine()
+
+
+def test_matches_textblob(engine):
+    headlines = list(TEXTBLOB_SCORES)
+    scores = engine.score(headlines)
+    for headline, score in zip(headlines, scores):
+        assert score == pytest.approx(TEXTBLOB_SCORES[headline], abs=1e-6), headline
+
+
+def rules(engine, text):
+    batch = TokenBatch([text], engine._index, engine._intensity)
+    absorbed = engine._absorbed_negators(batch)
+    negated = engine._negated(batch, absorbed)
+    before, modified = engine._modifiers(batch, absorbed)
+    return batch, absorbed, negated, before, modified, engine._flips(negated, before, absorbed)
+
+
+def test_negator_after_ly_intensifier_is_absorbed(engine):
+    _, absorbed, negated, before, modified, flips = rules(engine, "really not good")
+    assert list(absorbed) == [False, True, False]
+    # "really" still modifies "good", and the whole assessment is flipped through it.
+    assert list(negated) == [False, False, False]
+    assert list(modified) == [False, False, True]
+    assert list(flips) == [True, False, False]
+    assert not rules(engine, "not really good")[1].any()
+
+
+@pytest.mark.parametrize("text, negated", [
+    ("not good", [False, True]),
+    ("not a good", [False, False, True]),
+    ("not the good", [False, False, False]),
+    ("not really good", [False, True, False]),
+])
+def test_negation_reaches_next_known_word_over_single_letters(engine, text, negated):
+    assert list(rules(engine, text)[2]) == negated
+
+
+@pytest.mark.parametrize("text, modified", [
+    ("very good", [False, True]),
+    ("very is good", [False, False, True]),
+    ("very much good", [False, True, True]),
+    ("very good bad", [False, True, False]),
+    ("very nvidia good", [False, False, False]),
+])
+def test_intensifier_modifies_next_known_word_over_short_words(engine, text, modified):
+    assert list(rules(engine, text)[4]) == modified
+
+
+def test_negated_intensifier_weakens(engine):
+    batch, _, negated, before, modified, _ = rules(engine, "not very good")
+    polarity = engine._token_polarity(batch, negated, before, modified)
+    assert polarity[2] == pytest.approx(0.7 / 1.3)
+
+
+def test_mean_assessments_counts_modified_words_once(engine):
+    batch, _, negated, before, modified, flips = rules(engine, "really not good bad")
+    polarity = engine._token_polarity(batch, negated, before, modified)
+    # ("really not good" -> -0.35, "bad" -> -0.7) averaged over two assessments.
+    assert engine._mean_assessments(batch, polarity, modified, flips) == pytest.approx([-0.525])
+
+
+def test_punctuation_and_emoticons_are_ignored(engine):
+    # TextBlob boosts "Good results!" to 0.875 and scores ":)" as an assessment of its own; words alone are scored here.
+    assert list(engine.score(["Good results!", "Good results :)", "Good results"])) == pytest.approx([0.7, 0.7, 0.7])
+
+
+def test_intensifier_strengthens_next_word(engine):
+    very_bad, bad = engine.score(["very bad", "bad"])
+    assert very_bad == pytest.approx(-0.91)
+    assert very_bad < bad
+
+
+def test_batch_matches_single_texts(engine):
+    headlines = list(TEXTBLOB_SCORES) + ["", "very", "not"]
+    batch = engine._score_batch(headlines)
+    single = [engine._score_batch([headline])[0] for headline in headlines]
+    assert batch == pytest.approx(single)
+
+
+def test_engine_requires_a_backend():
+    with pytest.raises(TypeError):
+        SentimentEngine()
+
+    class Constant(SentimentEngine):
+        def _score_batch(self, texts):
+            return np.full(len(texts), 0.5)
+
+    assert list(Constant().score(["a", "b", "a"])) == [0.5, 0.5, 0.5]
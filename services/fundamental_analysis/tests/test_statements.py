@@ -0,0 +1,40 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tools import statements
+
+
+def fake_statements(symbol: str) -> pd.DataFrame:
+    index = pd.DatetimeIndex(["2023-12-31", "2024-12-31"])
+    frame = pd.DataFrame(np.nan, index=index, columns=statements.COLUMNS)
+    frame["total_revenue"] = [100.0, 110.0 + len(symbol)]
+    return frame
+
+
+def test_writers_merge_with_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(statements, "fetch_statements", fake_statements)
+    path = str(tmp_path / "statements.npz")
+    first, second = statements.StatementStore(path=path), statements.StatementStore(path=path)
+    first.load(["AAPL"])
+    second.load(["MSFT"])
+    first.load(["GOOG"])
+
+    assert statements.StatementStore(path=path).symbols() == ["AAPL", "GOOG", "MSFT"]
+    assert first.symbols() == ["AAPL", "GOOG", "MSFT"]
+
+
+def test_concurrent_writers_leave_a_complete_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(statements, "fetch_statements", fake_statements)
+    path = str(tmp_path / "statements.npz")
+    symbols = [f"S{i}" for i in range(16)]
+    stores = [statements.StatementStore(path=path) for _ in symbols]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda pair: pair[0].load([pair[1]]), zip(stores, symbols)))
+
+    reopened = statements.StatementStore(path=path)
+    assert reopened.symbols() == sorted(symbols)
+    assert len(reopened.frame) == 2 * len(symbols)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,197 @@
+"""Vectorized backtests of the technical analysis signals over a whole universe.
+
+Indicators come from the ``rolling_*`` functions in ``tools.indicators``, the
+array forms of what the Technical Analysis tool reports, computed for every
+(date, symbol) cell at once. A strategy turns them into entry and exit
+signals; positions are held from the close after an entry signal to the
+close after an exit signal, so no bar trades on its own close. Each change
+of position pays ``cost_bps`` of the position value.
+
+Parameter sweeps evaluate each combination in a separate process; the close
+panel is sent to every worker once, not with every task.
+
+Usage:
+    python backtest.py sp500.txt --strategy rsi --cost-bps 5
+    python backtest.py sp500.txt --strategy bollinger --sweep window=50,100,200 width=1.5,2,2.5
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Importing the screener also puts the fundamental_analysis agents (and ``tools``) on sys.path.
+from screener import close_panel
+
+from tools.indicators import BOLLINGER_WIDTH, BOLLINGER_WINDOW, RSI_PERIOD, SMA_WINDOWS, rolling_bollinger, rolling_rsi, rolling_sma
+from tools.risk_analysis_tool import TRADING_DAYS
+
+
+YEARS = 10
+COST_BPS = 5.0
+RSI_OVERSOLD = 30.0
+RSI_OVERBOUGHT = 70.0
+TREND_WINDOW = min(SMA_WINDOWS)
+
+Signals = Tuple[np.ndarray, np.ndarray]
+
+
+def rsi_signals(closes: np.ndarray, period: int = RSI_PERIOD, oversold: float = RSI_OVERSOLD, overbought: float = RSI_OVERBOUGHT) -> Signals:
+    """Mean reversion: enter when the RSI drops below ``oversold``, exit when it rises above ``overbought``."""
+    rsi = rolling_rsi(closes, int(period))
+    return rsi < oversold, rsi > overbought
+
+
+def bollinger_signals(closes: np.ndarray, window: int = BOLLINGER_WINDOW, width: float = BOLLINGER_WIDTH) -> Signals:
+    """Mean reversion: enter below the lower band, exit back above the middle band."""
+    bands = rolling_bollinger(closes, int(window), width)
+    return closes < bands["lower_band"], closes > bands["middle_band"]
+
+
+def trend_signals(closes: np.ndarray, window: int = TREND_WINDOW) -> Signals:
+    """Trend following: hold while the close is above its moving average."""
+    sma = rolling_sma(closes, int(window))
+    return closes > sma, closes < sma
+
+
+STRATEGIES: Dict[str, Callable[..., Signals]] = {
+    "rsi": rsi_signals,
+    "bollinger": bollinger_signals,
+    "trend": trend_signals,
+}
+
+
+def positions(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """1 from each entry signal until the next exit signal, else 0; an exit wins when both fire on a bar."""
+    state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    # Carry the last signal forward down each column.
+    rows = np.where(np.isnan(state), 0, np.arange(len(state))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    held = np.take_along_axis(state, rows, axis=0)
+    return np.nan_to_num(held, nan=0.0)
+
+
+def evaluate(closes: np.ndarray, entries: np.ndarray, exits: np.ndarray, cost_bps: float = COST_BPS) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """Per-symbol metrics (arrays over the columns) and metrics of the equal-weighted portfolio of all symbols."""
+    returns = np.zeros(closes.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = closes[1:] / closes[:-1] - 1
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # The position decided on bar t's close earns bar t+1's return.
+    held = np.zeros(closes.shape)
+    held[1:] = positions(entries, exits)[:-1]
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    strategy = held * returns - turnover * cost_bps / 1e4
+
+    log_returns = np.log1p(strategy)
+    cumulative = np.concatenate([np.zeros((1, closes.shape[1])), np.cumsum(log_returns, axis=0)])
+
+    # Trades: runs of held bars; each starts where the position goes 0 -> 1 and ends where it goes back.
+    change = np.diff(held, axis=0, prepend=0.0, append=0.0).T
+    start_symbols, start_rows = np.nonzero(change > 0)
+    _, end_rows = np.nonzero(change < 0)
+    trade_returns = cumulative[end_rows, start_symbols] - cumulative[start_rows, start_symbols]
+    trades = np.bincount(start_symbols, minlength=closes.shape[1])
+    wins = np.bincount(start_symbols, weights=trade_returns > 0, minlength=closes.shape[1])
+
+    listed = (~np.isnan(closes)).sum(axis=0)
+    years = np.maximum(listed, 1) / TRADING_DAYS
+    equity = np.exp(cumulative[1:])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        per_symbol = {
+            "total_return": equity[-1] - 1,
+            "annual_return": equity[-1] ** (1 / years) - 1,
+            "volatility": strategy.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS),
+            "sharpe": strategy.mean(axis=0) / strategy.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS),
+            "max_drawdown": (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0),
+            "trades": trades,
+            "hit_rate": np.where(trades > 0, wins / trades, np.nan),
+            "exposure": held.sum(axis=0) / np.maximum(listed, 1),
+        }
+
+    portfolio = strategy.mean(axis=1)
+    portfolio_equity = np.cumprod(1 + portfolio)
+    summary = {
+        "total_return": float(portfolio_equity[-1] - 1),
+        "annual_return": float(portfolio_equity[-1] ** (TRADING_DAYS / len(portfolio)) - 1),
+        "volatility": float(portfolio.std(ddof=1) * np.sqrt(TRADING_DAYS)),
+        "sharpe": float(portfolio.mean() / portfolio.std(ddof=1) * np.sqrt(TRADING_DAYS)) if portfolio.std() > 0 else float("nan"),
+        "max_drawdown": float((portfolio_equity / np.maximum.accumulate(portfolio_equity) - 1).min()),
+        "trades": int(trades.sum()),
+        "hit_rate": float((trade_returns > 0).mean()) if len(trade_returns) else float("nan"),
+    }
+    return per_symbol, summary
+
+
+def backtest(panel: pd.DataFrame, strategy: str = "rsi", cost_bps: float = COST_BPS, **params) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """Run a strategy over a (dates x symbols) close panel; returns per-symbol metrics and the portfolio summary."""
+    closes = panel.ffill().to_numpy(dtype=float)
+    entries, exits = STRATEGIES[strategy](closes, **params)
+    per_symbol, summary = evaluate(closes, entries, exits, cost_bps)
+    return pd.DataFrame(per_symbol, index=panel.columns), summary
+
+
+_closes: Optional[np.ndarray] = None
+
+
+def _init_worker(closes: np.ndarray) -> None:
+    global _closes
+    _closes = closes
+
+
+def _evaluate_params(strategy: str, cost_bps: float, params: Dict[str, float]) -> Dict[str, float]:
+    entries, exits = STRATEGIES[strategy](_closes, **params)
+    return {**params, **evaluate(_closes, entries, exits, cost_bps)[1]}
+
+
+def sweep(panel: pd.DataFrame, strategy: str, grid: Dict[str, Iterable[float]], cost_bps: float = COST_BPS, workers: Optional[int] = None) -> pd.DataFrame:
+    """Portfolio summary for every combination of the grid's parameters, one row each, best Sharpe first."""
+    closes = panel.ffill().to_numpy(dtype=float)
+    combinations = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(closes,)) as pool:
+        rows = list(pool.map(_evaluate_params, itertools.repeat(strategy), itertools.repeat(cost_bps), combinations))
+    return pd.DataFrame(rows).sort_values("sharpe", ascending=False, na_position="last").reset_index(drop=True)
+
+
+def parse_grid(items: List[str]) -> Dict[str, List[float]]:
+    """``["period=7,14,21", "oversold=20,30"]`` -> ``{"period": [7.0, 14.0, 21.0], "oversold": [20.0, 30.0]}``."""
+    grid = {}
+    for item in items:
+        name, values = item.split("=", 1)
+        grid[name] = [float(value) for value in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the technical analysis signals over a universe.")
+    parser.add_argument("universe", help="File with one ticker per line")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="rsi")
+    parser.add_argument("--cost-bps", type=float, default=COST_BPS, help="Cost of each position change, in basis points")
+    parser.add_argument("--years", type=int, default=YEARS)
+    parser.add_argument("--sweep", nargs="+", metavar="NAME=V1,V2", help="Parameter grid to evaluate in parallel")
+    parser.add_argument("--workers", type=int, help="Sweep processes (default: one per core)")
+    parser.add_argument("--refresh", action="store_true", help="Bring the price store up to date first")
+    args = parser.parse_args()
+
+    from batch import read_watchlist
+
+    panel = close_panel(read_watchlist(args.universe), date.today() - timedelta(days=365 * args.years), refresh=args.refresh)
+    print(f"Loaded {panel.shape[1]} symbols x {panel.shape[0]} days")
+    start = time.perf_counter()
+    if args.sweep:
+        print(sweep(panel, args.strategy, parse_grid(args.sweep), args.cost_bps, args.workers).to_string())
+    else:
+        per_symbol, summary = backtest(panel, args.strategy, args.cost_bps)
+        print(per_symbol.sort_values("sharpe", ascending=False).to_string())
+        print(pd.Series(summary).to_string())
+    print(f"Backtested in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Vectorized screening of a whole stock universe.
+
+The universe is one (symbol x field) float frame built from the local stores:
+statement ratios from the statement store, volatility, beta, RSI and moving
+average distances from the memory-mapped price store, and a few valuation
+fields from the cached ``info`` payloads. Filters and rankings are pandas
+expressions over its columns, evaluated for every symbol in one pass, so only
+the top of the ranking is sent to the (slow) analysis crew.
+
+Usage:
+    python screener.py sp500.txt --filter "roe > 0.15 and debt_to_equity < 1 and rsi < 70" \
+        --rank "fcf_margin - volatility" --top 10 --analyse reports.jsonl
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# The screener reads the fundamental_analysis stores, which import each other by plain module name.
+AGENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fundamental_analysis", "app", "agents")
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
+
+from tools import benchmarks, market_data, price_store, statements
+from tools.indicators import RSI_PERIOD, SMA_WINDOWS
+from tools.risk_analysis_tool import TRADING_DAYS, annualized_volatility, beta_vector
+
+
+INFO_COLUMNS = {
+    "market_cap": "marketCap",
+    "trailing_pe": "trailingPE",
+    "forward_pe": "forwardPE",
+    "dividend_yield": "dividendYield",
+}
+# Enough calendar days for the longest moving average.
+PRICE_LOOKBACK_DAYS = int(max(SMA_WINDOWS) * 365 / TRADING_DAYS) + 30
+
+
+def fundamental_features(frame: pd.DataFrame) -> pd.DataFrame:
+    """Latest-period ratios per symbol from a (symbol, period_end) statement frame."""
+    if frame.empty:
+        return pd.DataFrame()
+    revenue_growth = frame["total_revenue"].groupby(level="symbol").pct_change(fill_method=None)
+    latest = frame.assign(revenue_growth=revenue_growth).groupby(level="symbol").tail(1).droplevel("period_end")
+    equity = latest["total_equity"].where(latest["total_equity"] > 0)
+    return pd.DataFrame({
+        "revenue": latest["total_revenue"],
+        "revenue_growth": latest["revenue_growth"],
+        "gross_margin": latest["gross_margin"],
+        "operating_margin": latest["operating_margin"],
+        "net_margin": latest["net_margin"],
+        "fcf_margin": latest["fcf_margin"],
+        "current_ratio": latest["current_ratio"],
+        "roe": latest["net_income"] / equity,
+        "debt_to_equity": latest["total_liabilities"] / equity,
+    })
+
+
+def price_features(closes: pd.DataFrame, market_close: pd.Series) -> pd.DataFrame:
+    """Risk and technical fields for every column of a (dates x symbols) close panel at once.
+
+    Definitions match the per-symbol tools: volatility and beta over the last
+    year of daily returns, simple-average RSI and simple moving averages.
+    """
+    filled = closes.ffill().to_numpy()
+    last = filled[-1]
+    features = {}
+
+    returns = closes.pct_change(fill_method=None).to_numpy()[-TRADING_DAYS:]
+    market_returns = market_close.reindex(closes.index).pct_change(fill_method=None).to_numpy()[-TRADING_DAYS:]
+    features["volatility"] = annualized_volatility(returns)
+    features["beta"] = beta_vector(returns, market_returns)
+    features["return_1y"] = last / filled[-TRADING_DAYS - 1] - 1 if len(filled) > TRADING_DAYS else np.full(len(last), np.nan)
+
+    changes = np.diff(filled[-(RSI_PERIOD + 1):], axis=0)
+    gains = np.clip(changes, 0, None).sum(axis=0)
+    losses = -np.clip(changes, None, 0).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(losses > 0, 100 - 100 / (1 + gains / losses), 100.0)
+    features["rsi"] = np.where(np.isnan(changes).any(axis=0) | (len(changes) < RSI_PERIOD), np.nan, rsi)
+
+    for window in SMA_WINDOWS:
+        # NaN unless the symbol has a full window (leading NaNs propagate through the mean).
+        sma = filled[-window:].mean(axis=0) if len(filled) >= window else np.full(len(last), np.nan)
+        features[f"ma{window}_distance"] = last / sma - 1
+
+    return pd.DataFrame(features, index=closes.columns)
+
+
+def close_panel(symbols: Iterable[str], start, refresh: bool = False) -> pd.DataFrame:
+    """Daily closes from the price store, one column per symbol."""
+    store = price_store.get_store()
+    columns = {}
+    for symbol in symbols:
+        try:
+            if refresh:
+                store.update(symbol)
+            records = store.window(symbol, start=start)
+        except Exception as e:
+            print(f"Error reading prices for {symbol}: {e}")
+            continue
+        if len(records):
+            columns[symbol] = pd.Series(records["close"], index=records["date"].astype("datetime64[ns]"))
+    if not columns:
+        return pd.DataFrame()
+    return pd.DataFrame(columns).sort_index()
+
+
+def info_features(symbols: List[str]) -> pd.DataFrame:
+    infos = market_data.get_info_many(symbols)
+    frame = pd.DataFrame.from_dict(
+        {symbol: {field: info.get(key) for field, key in INFO_COLUMNS.items()} for symbol, info in infos.items()},
+        orient="index",
+        columns=list(INFO_COLUMNS),
+    )
+    return frame.apply(pd.to_numeric, errors="coerce")
+
+
+class Universe:
+    """A (symbol x field) frame that screens are evaluated against."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    @classmethod
+    def load(cls, symbols: Iterable[str], refresh: bool = False, with_info: bool = True) -> "Universe":
+        """Build the universe from the local stores, fetching only what is missing or stale (or everything with ``refresh``)."""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        start = date.today() - timedelta(days=PRICE_LOOKBACK_DAYS)
+
+        parts = [fundamental_features(statements.get_store().load(symbols, refresh=refresh))]
+        closes = close_panel(symbols, start, refresh=refresh)
+        if not closes.empty:
+            market_close = benchmarks.get_benchmark().close(start=closes.index[0])
+            parts.append(price_features(closes, market_close))
+        if with_info:
+            parts.append(info_features(symbols))
+
+        frame = pd.concat([part for part in parts if not part.empty], axis=1)
+        return cls(frame.reindex(symbols).astype(float))
+
+    def screen(self, filter: Optional[str] = None, rank: Optional[str] = None, ascending: bool = False, top: Optional[int] = None) -> pd.DataFrame:
+        """Rows passing ``filter``, ordered by the ``rank`` expression (as column ``score``), limited to ``top``.
+
+        Expressions use ``DataFrame.eval`` syntax over the universe's columns; a
+        comparison against a missing value is false, so incomplete rows drop out.
+        """
+        frame = self.frame
+        if filter:
+            frame = frame[frame.eval(filter).fillna(False).astype(bool)]
+        if rank:
+            frame = frame.assign(score=frame.eval(rank)).sort_values("score", ascending=ascending, na_position="last")
+        if top is not None:
+            frame = frame.head(top)
+        return frame
+
+    def shortlist(self, filter: Optional[str] = None, rank: Optional[str] = None, ascending: bool = False, top: int = 10) -> List[str]:
+        return self.screen(filter, rank, ascending, top).index.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a universe and send the best candidates to the analysis crew.")
+    parser.add_argument("universe", help="File with one ticker per line")
+    parser.add_argument("--filter", help="Boolean expression over the universe columns")
+    parser.add_argument("--rank", help="Expression to sort by (descending unless --ascending)")
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--refresh", action="store_true", help="Refetch statements and prices before screening")
+    parser.add_argument("--analyse", metavar="OUTPUT", help="Run the crew on the shortlist, appending reports to this JSONL file")
+    args = parser.parse_args()
+
+    from batch import read_watchlist, run_batch
+
+    universe = Universe.load(read_watchlist(args.universe), refresh=args.refresh)
+    start = time.perf_counter()
+    shortlist = universe.screen(args.filter, args.rank, args.ascending, args.top)
+    print(f"Screened {len(universe.frame)} symbols in {time.perf_counter() - start:.3f}s")
+    print(shortlist.to_string())
+
+    if args.analyse:
+        for record in run_batch(shortlist.index.tolist(), args.analyse):
+            print(f"{record['symbol']}: {record['status']} ({record['elapsed_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()